@@ -0,0 +1,205 @@
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "defaulter task"))
+
+SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DATA_DIR = "bench_data"
+RESULTS_FILE = "benchmark_results.json"
+FEATURES = ["HC_DIFF", "LW_RATIO", "SPEED_ZSCORE", "ROT_ABS"]
+
+
+def prepare(n, data_dir=DATA_DIR, template_path=None):
+    """Synthetic CSV and station JSON with n rows, generated once and reused"""
+    import synthetic
+
+    os.makedirs(data_dir, exist_ok=True)
+    paths = {"csv": os.path.join(data_dir, f"synthetic_{n}.csv"),
+             "json": os.path.join(data_dir, f"synthetic_{n}.json")}
+    template = None
+    for kind, writer in (("csv", synthetic.write_csv), ("json", synthetic.write_json)):
+        if not os.path.exists(paths[kind]):
+            template = template if template is not None else synthetic.load_template(
+                template_path or os.path.join(ROOT, synthetic.TEMPLATE))
+            start = time.perf_counter()
+            writer(paths[kind], n, template)
+            print(f"Generated {paths[kind]} in {time.perf_counter() - start:.1f}s")
+    return paths
+
+
+def _json_ingest(paths, df, models):
+    import ingest
+    return ingest.ingest(paths["json"])
+
+
+def _csv_load(paths, df, models):
+    import pandas as pd
+    return pd.read_csv(paths["csv"])
+
+
+def _clean(paths, df, models):
+    import module2_data_handling
+    return module2_data_handling.clean(df, verbose=False)
+
+
+def _features(paths, df, models):
+    from features import add_features
+    return add_features(df, FEATURES)
+
+
+def _align(paths, df, models):
+    import dead_reckoning
+    return dead_reckoning.align(df)
+
+
+def _eda_stats(paths, df, models):
+    import module3_eda
+    return module3_eda.summary_stats(df), df[module3_eda.CORR_COLS].corr()
+
+
+def _fit(paths, df, models):
+    import module4_ml
+    return (module4_ml.fit_regression(*module4_ml.regression_data(df)),
+            module4_ml.fit_classifiers(*module4_ml.classification_data(df)))
+
+
+def _predict(paths, df, models):
+    import inference
+    return inference.predict_chunk(models, df)
+
+
+# name -> (needs the CSV loaded as a DataFrame first, stage function)
+STAGES = {
+    "json_ingest": (False, _json_ingest),
+    "csv_load": (False, _csv_load),
+    "clean": (True, _clean),
+    "features": (True, _features),
+    "align": (True, _align),
+    "eda_stats": (True, _eda_stats),
+    "fit": (True, _fit),
+    "predict": (True, _predict),
+}
+
+
+def current_rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def _child(stage, paths, models_path, queue):
+    try:
+        import pandas as pd
+        needs_frame, fn = STAGES[stage]
+        df = pd.read_csv(paths["csv"]) if needs_frame else None
+        models = None
+        if stage == "predict":
+            import inference
+            models = inference.load(models_path)[0]
+        input_rss = current_rss_mb()
+
+        cpu = time.process_time()
+        start = time.perf_counter()
+        fn(paths, df, models)
+        wall = time.perf_counter() - start
+        cpu = time.process_time() - cpu
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        queue.put({"seconds": wall, "cpu_seconds": cpu, "input_rss_mb": input_rss,
+                   "peak_rss_mb": peak, "stage_rss_mb": max(peak - input_rss, 0.0)})
+    except BaseException as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def run_stage(stage, n, paths, models_path):
+    """Time one stage in a fresh process so peak memory belongs to that stage alone"""
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(stage, paths, models_path, queue))
+    proc.start()
+    proc.join()
+    result = queue.get() if not queue.empty() else {"error": f"exit code {proc.exitcode}"}
+    result = {"stage": stage, "rows": n, **result}
+    if "seconds" in result:
+        result["rows_per_s"] = n / result["seconds"] if result["seconds"] > 0 else None
+    return result
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def print_result(r):
+    if "error" in r:
+        print(f"{r['stage']:12s} {r['rows']:>10,d}  FAILED: {r['error']}")
+    else:
+        print(f"{r['stage']:12s} {r['rows']:>10,d} {r['seconds']:9.3f}s {r['rows_per_s']:>13,.0f} rows/s "
+              f"peak {r['peak_rss_mb']:7.0f} MB (+{r['stage_rss_mb']:.0f} MB)")
+
+
+def compare(results, baseline_path, threshold=1.2):
+    """Print time ratios against an earlier results file, flagging slowdowns past threshold"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    before = {(r["stage"], r["rows"]): r for r in baseline["results"] if "seconds" in r}
+    print(f"\nCompared with {baseline_path} ({(baseline.get('commit') or 'unknown')[:10]}):")
+    for r in results:
+        old = before.get((r["stage"], r["rows"]))
+        if old is None or "seconds" not in r:
+            continue
+        ratio = r["seconds"] / old["seconds"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{r['stage']:12s} {r['rows']:>10,d}  {old['seconds']:9.3f}s -> {r['seconds']:9.3f}s "
+              f"({ratio:.2f}x){flag}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time each pipeline stage on synthetic data of growing size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    commit, dirty = git_commit()
+    models_path = os.path.join(args.data_dir, "models.npz")
+    if "predict" in args.stages:
+        import pandas as pd
+        import inference
+        os.makedirs(args.data_dir, exist_ok=True)
+        inference.export(pd.read_csv(os.path.join(ROOT, "data", "data1.csv")), models_path)
+
+    results = []
+    for n in args.sizes:
+        paths = prepare(n, args.data_dir)
+        for stage in args.stages:
+            result = run_stage(stage, n, paths, models_path)
+            print_result(result)
+            results.append(result)
+
+    report = {"commit": commit, "dirty": dirty, "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "python": platform.python_version(), "machine": platform.machine(),
+              "cpus": os.cpu_count(), "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved {args.output}")
+    if args.compare:
+        compare(results, args.compare, args.threshold)
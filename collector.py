@@ -0,0 +1,303 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import crawl
+import fetcher
+
+COLLECT_DIR = "collect"
+LOG_FILE = "changes.jsonl"
+STATE_FILE = "state.json"
+
+# A vessel is re-logged only when one of these changes. Positions are compared
+# after rounding to POSITION_DECIMALS (4 places is ~11 m), so float noise in the
+# feed doesn't count as movement; ELAPSED changes on every poll and is ignored.
+TRACKED = ["LAT", "LON", "SPEED", "COURSE", "HEADING", "STATUS_NAME"]
+POSITION_DECIMALS = 4
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+class Throttle:
+    """Global limit shared by every request the collector sends.
+
+    `rate` caps requests per second (token bucket allowing `burst` back to
+    back); `budget` caps requests per `window` seconds, or over the whole run
+    when window is None, after which acquire() raises BudgetExhausted.
+    """
+
+    def __init__(self, rate=1.0, burst=4, budget=None, window=None):
+        self.rate = rate
+        self.burst = burst
+        self.budget = budget
+        self.window = window
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.sent = deque()
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        if self.budget is None:
+            return None
+        with self.lock:
+            self._expire(time.monotonic())
+            return self.budget - (len(self.sent) if self.window else self.total)
+
+    def _expire(self, now):
+        while self.window and self.sent and self.sent[0] <= now - self.window:
+            self.sent.popleft()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._expire(now)
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                wait = 0.0
+                if self.budget is not None:
+                    used = len(self.sent) if self.window else self.total
+                    if used >= self.budget:
+                        if not self.window:
+                            raise BudgetExhausted(f"request budget of {self.budget} used up")
+                        wait = self.sent[0] + self.window - now
+                if not wait and self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate
+                if not wait:
+                    self.tokens -= 1
+                    self.total += 1
+                    self.sent.append(now)
+                    return
+            time.sleep(wait)
+
+
+class ThrottledSession:
+    """Session wrapper that takes a throttle token per GET, retries included"""
+
+    def __init__(self, session, throttle):
+        self.session = session
+        self.throttle = throttle
+
+    def get(self, url, **kwargs):
+        self.throttle.acquire()
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def _number(value, decimals=None):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return round(value, decimals) if decimals is not None else value
+
+
+def signature(row):
+    """The tracked fields of a raw feed row in comparable form"""
+    return tuple(_number(row.get(f), POSITION_DECIMALS) if f in ("LAT", "LON")
+                 else row.get(f) if f == "STATUS_NAME" else _number(row.get(f))
+                 for f in TRACKED)
+
+
+def diff(rows, state, signatures):
+    """Log records for the rows that are new or changed since the last poll.
+
+    New vessels are logged whole; known ones only with the fields that differ
+    from their last logged row. state and signatures are updated in place.
+    """
+    records = []
+    for ship_id, row in rows.items():
+        sig = signature(row)
+        if signatures.get(ship_id) == sig:
+            continue
+        signatures[ship_id] = sig
+        previous = state.get(ship_id)
+        if previous is None:
+            changed = dict(row)
+        else:
+            changed = {k: v for k, v in row.items() if previous.get(k) != v}
+            changed.update({k: None for k in previous if k not in row})
+        state[ship_id] = dict(row)
+        records.append({"id": ship_id, "new": previous is None, "fields": changed})
+    return records
+
+
+class Collector:
+    """Polls tiles on a schedule and keeps an append-only change log.
+
+    Layout of `directory`:
+        state.json     every vessel's full row as of the last compaction
+        changes.jsonl  one line per new/changed vessel per poll since then
+        snapshots/     full CSV snapshots written by compaction
+    On start the state is rebuilt from state.json plus the log, so a restarted
+    collector only logs what changed while it was down.
+    """
+
+    def __init__(self, directory=COLLECT_DIR, tiles=None, base_url=fetcher.BASE_URL,
+                 throttle=None, concurrency=4, timeout=10.0, retries=3):
+        self.directory = directory
+        self.tiles = list(tiles or fetcher.DEFAULT_TILES)
+        self.base_url = base_url
+        self.throttle = throttle or Throttle()
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        # Created on the first poll and kept, so keep-alive connections last across polls
+        self.session = None
+        self.log_path = os.path.join(directory, LOG_FILE)
+        self.state_path = os.path.join(directory, STATE_FILE)
+        os.makedirs(directory, exist_ok=True)
+        self.state = self.replay()
+        self.signatures = {ship_id: signature(row) for ship_id, row in self.state.items()}
+        self.stats = {"polls": 0, "requests": 0, "rows": 0, "records": 0,
+                      "log_bytes": 0, "snapshot_bytes": 0}
+
+    def replay(self):
+        """Full state from the last compaction plus every logged change after it"""
+        state = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                state = json.load(f)["vessels"]
+        if os.path.exists(self.log_path):
+            with open(self.log_path) as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # a poll cut off mid-write; everything before it is intact
+                    state.setdefault(record["id"], {}).update(record["fields"])
+        return state
+
+    def poll(self):
+        """Fetch every tile once and append the changes; returns (rows seen, records logged)"""
+        if self.session is None:
+            self.session = ThrottledSession(fetcher.make_session(self.concurrency), self.throttle)
+        reports, wall = fetcher.fetch_tiles(self.tiles, base_url=self.base_url,
+                                            concurrency=self.concurrency, timeout=self.timeout,
+                                            retries=self.retries, session=self.session, verbose=False)
+        rows = crawl.merge_rows(r["rows"] for r in reports)
+        records = diff(rows, self.state, self.signatures)
+
+        now = datetime.now().replace(microsecond=0).isoformat()
+        text = "".join(json.dumps({"t": now, **r}, separators=(",", ":")) + "\n" for r in records)
+        with open(self.log_path, "a") as f:
+            f.write(text)
+
+        self.stats["polls"] += 1
+        self.stats["requests"] += sum(r["attempts"] for r in reports)
+        self.stats["rows"] += len(rows)
+        self.stats["records"] += len(records)
+        self.stats["log_bytes"] += len(text.encode())
+        # What the one-shot script would have written for the same poll
+        self.stats["snapshot_bytes"] += sum(r["bytes"] for r in reports)
+        errors = [r for r in reports if r["error"]]
+        for r in errors:
+            fetcher.print_report(r)
+        return len(rows), len(records)
+
+    def close(self):
+        """Close the HTTP session; the next poll opens a new one"""
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+
+    def compact(self, snapshot=True):
+        """Fold the log into state.json, optionally write a full CSV snapshot, and start a new log"""
+        path = None
+        if snapshot and self.state:
+            import pandas as pd
+            snap_dir = os.path.join(self.directory, "snapshots")
+            os.makedirs(snap_dir, exist_ok=True)
+            path = os.path.join(snap_dir, datetime.now().strftime("%Y%m%d_%H%M%S") + ".csv")
+            pd.DataFrame(list(self.state.values())).to_csv(path, index=False)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"compacted_at": datetime.now().isoformat(), "vessels": self.state}, f)
+        os.replace(tmp, self.state_path)
+        # Replaying the old log onto the new state would be harmless, so a crash
+        # between the two steps loses nothing
+        open(self.log_path, "w").close()
+        return path
+
+    def run(self, interval=60.0, polls=None, compact_every=60, verbose=True):
+        """Poll every `interval` seconds until `polls` are done or the budget runs out"""
+        done = 0
+        try:
+            while polls is None or done < polls:
+                remaining = self.throttle.remaining()
+                if remaining is not None and remaining < len(self.tiles) and not self.throttle.window:
+                    print(f"Stopping: {remaining} requests left in the budget, a poll needs {len(self.tiles)}")
+                    break
+                start = time.monotonic()
+                seen, logged = self.poll()
+                done += 1
+                if verbose:
+                    print(f"Poll {done}: {seen} vessels, {logged} new or changed "
+                          f"({len(self.state)} tracked)")
+                if compact_every and done % compact_every == 0:
+                    path = self.compact()
+                    if verbose:
+                        print(f"Compacted {len(self.state)} vessels" + (f" -> {path}" if path else ""))
+                if polls is None or done < polls:
+                    time.sleep(max(0.0, interval - (time.monotonic() - start)))
+        except BudgetExhausted as e:
+            print(f"Stopping: {e}")
+        except KeyboardInterrupt:
+            print("Stopped")
+        finally:
+            self.close()
+        if verbose:
+            self.print_summary()
+        return self.stats
+
+    def print_summary(self):
+        s = self.stats
+        ratio = s["snapshot_bytes"] / s["log_bytes"] if s["log_bytes"] else float("inf")
+        print(f"{s['polls']} polls, {s['requests']} requests, {s['rows']} rows seen, "
+              f"{s['records']} logged. Log {s['log_bytes'] / 1024:.1f} KiB vs "
+              f"{s['snapshot_bytes'] / 1024:.1f} KiB of full responses ({ratio:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import tiles as tiles_mod
+
+    parser = argparse.ArgumentParser(description="Continuously poll tiles and log only vessel changes")
+    parser.add_argument("--base-url", default=fetcher.BASE_URL)
+    parser.add_argument("--dir", default=COLLECT_DIR)
+    parser.add_argument("--zoom", type=int, help="poll every tile at this zoom instead of the default four")
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between polls")
+    parser.add_argument("--polls", type=int, help="stop after this many polls")
+    parser.add_argument("--rate", type=float, default=1.0, help="max requests per second")
+    parser.add_argument("--burst", type=int, default=4)
+    parser.add_argument("--budget", type=int, help="max requests per --window (or per run)")
+    parser.add_argument("--window", type=float, help="budget window in seconds, e.g. 3600")
+    parser.add_argument("--compact-every", type=int, default=60, help="polls between compactions")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fixture", type=float, metavar="CHURN",
+                        help="start a local fixture server where this fraction of vessels moves per request")
+    args = parser.parse_args()
+
+    base_url = args.base_url
+    if args.fixture is not None:
+        import fixture_server
+        server = fixture_server.FixtureServer(churn=args.fixture).start()
+        base_url = server.base_url
+        print(f"Polling fixture server on {base_url}")
+
+    collector = Collector(args.dir, tiles_mod.level_tiles(args.zoom) if args.zoom is not None else None,
+                          base_url, Throttle(args.rate, args.burst, args.budget, args.window),
+                          args.concurrency)
+    collector.run(args.interval, args.polls, args.compact_every)
+    collector.compact()
@@ -0,0 +1,258 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_NM = 3440.065
+
+HORIZON_MIN = 30.0    # only approaches within the next 30 minutes count
+DCPA_NM = 1.0         # closest approach that counts as a close-quarters situation
+MIN_SPEED = 10        # tenths of a knot; pairs where neither vessel is making way are skipped
+# Vessels reported faster than this are treated as sailing at it, so one bogus
+# 100-knot report doesn't blow the grid cells up to hundreds of miles
+PRUNE_SPEED = 300
+# Candidate pairs evaluated per NumPy batch, which bounds memory in crowded cells
+MAX_BATCH = 2_000_000
+
+# The 13 neighbour offsets "after" a cell plus the cell itself, so each
+# unordered pair of neighbouring cells is visited exactly once
+_OFFSETS = [(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1)
+            if (dx, dy, dz) > (0, 0, 0)]
+_BITS = 21
+_BIAS = 1 << (_BITS - 1)
+
+
+def _unit_xyz(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=1)
+
+
+def _cell_keys(xyz, size_nm):
+    """One int64 key per 3-D grid cell of edge size_nm over points on the sphere"""
+    ijk = np.floor(xyz * EARTH_RADIUS_NM / size_nm).astype(np.int64) + _BIAS
+    return (ijk[:, 0] << (2 * _BITS)) | (ijk[:, 1] << _BITS) | ijk[:, 2]
+
+
+def _shift(keys, offset):
+    dx, dy, dz = offset
+    return keys + (dx << (2 * _BITS)) + (dy << _BITS) + dz
+
+
+def cpa(lat1, lon1, speed1, course1, lat2, lon2, speed2, course2):
+    """(distance now, DCPA in nm, TCPA in minutes) for arrays of vessel pairs.
+
+    Positions go on a flat plane around each pair's mean latitude, which is
+    accurate to well under 1% at the few tens of miles a horizon covers.
+    TCPA is negative when the vessels are already separating.
+    """
+    mean_lat = np.radians((lat1 + lat2) / 2)
+    dlon = (lon2 - lon1 + 180.0) % 360.0 - 180.0
+    dx = np.radians(dlon) * np.cos(mean_lat) * EARTH_RADIUS_NM
+    dy = np.radians(lat2 - lat1) * EARTH_RADIUS_NM
+    # SPEED is tenths of a knot; velocities in nm per minute
+    v1 = speed1 / 600.0
+    v2 = speed2 / 600.0
+    c1, c2 = np.radians(course1), np.radians(course2)
+    dvx = v2 * np.sin(c2) - v1 * np.sin(c1)
+    dvy = v2 * np.cos(c2) - v1 * np.cos(c1)
+
+    dv2 = dvx * dvx + dvy * dvy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        tcpa = np.where(dv2 > 1e-12, -(dx * dvx + dy * dvy) / dv2, 0.0)
+    dcpa = np.hypot(dx + dvx * tcpa, dy + dvy * tcpa)
+    return np.hypot(dx, dy), dcpa, tcpa
+
+
+# Per-worker copies of the vessel arrays, set once by _init
+_vessels = {}
+
+
+def _init(vessels):
+    _vessels.clear()
+    _vessels.update(vessels)
+
+
+def _pairs(a_cells, b_cells, max_pairs=MAX_BATCH):
+    """Batches of (i, j) pairing every vessel in cell a with every vessel in cell b,
+    for matched cell index arrays, at most about max_pairs at a time"""
+    starts, counts = _vessels["starts"], _vessels["counts"]
+    ca, cb = counts[a_cells], counts[b_cells]
+    # One unit per vessel on the a side, paired with all of its b cell
+    unit_cell = np.repeat(np.arange(len(a_cells)), ca)
+    i_all = starts[a_cells][unit_cell] + np.arange(len(unit_cell)) - np.repeat(np.cumsum(ca) - ca, ca)
+    per = cb[unit_cell]
+    cum = np.cumsum(per)
+    if len(cum) == 0 or cum[-1] == 0:
+        return
+    edges = np.searchsorted(cum, np.arange(max_pairs, cum[-1], max_pairs), side="right")
+    for lo, hi in zip([0, *edges.tolist()], [*edges.tolist(), len(cum)]):
+        if hi <= lo:
+            continue
+        n = per[lo:hi]
+        i = np.repeat(i_all[lo:hi], n)
+        within = np.arange(len(i)) - np.repeat(np.cumsum(n) - n, n)
+        j = np.repeat(starts[b_cells][unit_cell[lo:hi]], n) + within
+        yield i, j
+
+
+def _evaluate(cell_range):
+    """Risky pairs whose first vessel lies in cells [lo, hi) of the sorted cell list"""
+    lo, hi = cell_range
+    v = _vessels
+    speed = v["SPEED"]
+    cells, keys = np.arange(lo, hi), v["cell_keys"][lo:hi]
+    out = []
+    for offset in [(0, 0, 0)] + _OFFSETS:
+        if offset == (0, 0, 0):
+            batches = _pairs(cells, cells)
+        else:
+            target = _shift(keys, offset)
+            pos = np.minimum(np.searchsorted(v["cell_keys"], target), len(v["cell_keys"]) - 1)
+            hit = v["cell_keys"][pos] == target
+            batches = _pairs(cells[hit], pos[hit])
+        for i, j in batches:
+            keep = (speed[i] >= v["min_speed"]) | (speed[j] >= v["min_speed"])
+            if offset == (0, 0, 0):
+                keep &= i < j
+            i, j = i[keep], j[keep]
+            dist, dcpa, tcpa = cpa(v["LAT"][i], v["LON"][i], speed[i], v["COURSE"][i],
+                                   v["LAT"][j], v["LON"][j], speed[j], v["COURSE"][j])
+            # Already past the closest point: the closest they get from now on is now
+            dcpa = np.where(tcpa < 0, dist, dcpa)
+            tcpa = np.maximum(tcpa, 0.0)
+            risky = (dcpa <= v["dcpa_nm"]) & (tcpa <= v["horizon"])
+            out.append(np.stack([v["order"][i[risky]], v["order"][j[risky]],
+                                 dist[risky], dcpa[risky], tcpa[risky]], axis=1))
+    return np.concatenate(out) if out else np.empty((0, 5))
+
+
+def _prepare(df, horizon, dcpa_nm, min_speed, prune_speed):
+    """Usable vessels sorted by grid cell, plus the per-cell index"""
+    lat = df["LAT"].to_numpy(dtype=np.float64, na_value=np.nan)
+    lon = df["LON"].to_numpy(dtype=np.float64, na_value=np.nan)
+    speed = pd.to_numeric(df["SPEED"], errors="coerce").to_numpy(dtype=np.float64)
+    course = pd.to_numeric(df["COURSE"], errors="coerce").to_numpy(dtype=np.float64)
+    # A stopped vessel needs no course; a moving one without a usable course is left out
+    course = np.where(speed == 0, 0.0, course)
+    usable = ~(np.isnan(lat) | np.isnan(lon) | np.isnan(speed) | np.isnan(course))
+    usable &= (speed < 1023) & (course < 360)
+    rows = np.flatnonzero(usable)
+
+    # Two vessels can meet within dcpa_nm inside the horizon only if they are
+    # now closer than both their runs plus dcpa_nm. With cells that wide,
+    # such pairs are always in the same or neighbouring cells.
+    reach = min(np.nanmax(speed[rows], initial=0), prune_speed) / 600.0 * horizon
+    size = max(2 * reach + dcpa_nm, 0.1)
+    keys = _cell_keys(_unit_xyz(lat[rows], lon[rows]), size)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    rows = rows[order]
+    cell_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    return {"LAT": lat[rows], "LON": lon[rows], "SPEED": np.minimum(speed[rows], prune_speed),
+            "COURSE": course[rows], "order": rows, "cell_keys": cell_keys,
+            "starts": starts, "counts": counts, "horizon": horizon, "dcpa_nm": dcpa_nm,
+            "min_speed": min_speed, "cell_nm": size}
+
+
+def risky_pairs(df, horizon=HORIZON_MIN, dcpa_nm=DCPA_NM, min_speed=MIN_SPEED,
+                prune_speed=PRUNE_SPEED, workers=None, blocks_per_worker=4):
+    """Vessel pairs that come within dcpa_nm in the next `horizon` minutes, riskiest first.
+
+    Candidates are pruned with a 3-D grid over positions on the sphere, so
+    only vessels in neighbouring cells are compared; the cells are split into
+    blocks evaluated in parallel. Returns one row per pair with both SHIP_IDs,
+    the current distance, DCPA (nm) and TCPA (minutes), sorted by DCPA then TCPA.
+    """
+    vessels = _prepare(df, horizon, dcpa_nm, min_speed, prune_speed)
+    workers = workers or os.cpu_count() or 1
+    n_cells = len(vessels["cell_keys"])
+    # Blocks of roughly equal vessel counts, not cell counts, since a port
+    # cell can hold thousands of vessels
+    cum = np.cumsum(vessels["counts"])
+    n_blocks = max(1, min(n_cells, workers * blocks_per_worker))
+    bounds = np.unique(np.concatenate([[0], np.searchsorted(cum, np.linspace(0, cum[-1] if n_cells else 0,
+                                                                             n_blocks + 1)[1:-1]), [n_cells]]))
+    blocks = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    if workers == 1 or len(blocks) <= 1:
+        _init(vessels)
+        parts = [_evaluate(block) for block in blocks]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init, initargs=(vessels,)) as pool:
+            parts = list(pool.map(_evaluate, blocks))
+    found = np.concatenate(parts) if parts else np.empty((0, 5))
+
+    i, j = found[:, 0].astype(np.int64), found[:, 1].astype(np.int64)
+    ids = df["SHIP_ID"].astype(str).to_numpy()
+    names = df["SHIPNAME"].to_numpy() if "SHIPNAME" in df.columns else np.full(len(df), None)
+    pairs = pd.DataFrame({"SHIP_ID_1": ids[i], "SHIPNAME_1": names[i],
+                          "SHIP_ID_2": ids[j], "SHIPNAME_2": names[j],
+                          "DIST_NM": found[:, 2], "DCPA_NM": found[:, 3], "TCPA_MIN": found[:, 4]})
+    return pairs.sort_values(["DCPA_NM", "TCPA_MIN"], kind="stable").reset_index(drop=True)
+
+
+def brute_force(df, horizon=HORIZON_MIN, dcpa_nm=DCPA_NM, min_speed=MIN_SPEED, prune_speed=PRUNE_SPEED):
+    """Positional index pairs found by checking every pair; for validating risky_pairs"""
+    v = _prepare(df, horizon, dcpa_nm, min_speed, prune_speed)
+    found = set()
+    n = len(v["order"])
+    for i in range(n - 1):
+        j = np.arange(i + 1, n)
+        j = j[(v["SPEED"][i] >= min_speed) | (v["SPEED"][j] >= min_speed)]
+        dist, dcpa, tcpa = cpa(v["LAT"][i], v["LON"][i], v["SPEED"][i], v["COURSE"][i],
+                               v["LAT"][j], v["LON"][j], v["SPEED"][j], v["COURSE"][j])
+        dcpa = np.where(tcpa < 0, dist, dcpa)
+        risky = (dcpa <= dcpa_nm) & (np.maximum(tcpa, 0.0) <= horizon)
+        found.update(frozenset((v["order"][i], k)) for k in v["order"][j[risky]].tolist())
+    return found
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Rank close-quarters vessel pairs by closest point of approach")
+    parser.add_argument("path", nargs="?", default="data/data1.csv")
+    parser.add_argument("--horizon", type=float, default=HORIZON_MIN, help="minutes ahead")
+    parser.add_argument("--dcpa", type=float, default=DCPA_NM, help="nautical miles")
+    parser.add_argument("--min-speed", type=float, default=MIN_SPEED, help="tenths of a knot")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--align", action="store_true", help="dead-reckon positions to capture time first")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--output", help="write every risky pair to this CSV")
+    parser.add_argument("--scaling", type=int, nargs="*", metavar="N",
+                        help="time synthetic snapshots of these vessel counts instead")
+    args = parser.parse_args()
+    options = dict(horizon=args.horizon, dcpa_nm=args.dcpa, min_speed=args.min_speed)
+
+    if args.scaling is not None:
+        import synthetic
+
+        template = synthetic.load_template(args.path)
+        for n in args.scaling or [1_000, 10_000, 100_000, 1_000_000]:
+            snapshot = synthetic.generate(n, template)
+            start = time.perf_counter()
+            pairs = risky_pairs(snapshot, workers=args.workers, **options)
+            seconds = time.perf_counter() - start
+            line = f"{n:>10,d} vessels: {len(pairs):>8,d} risky pairs in {seconds:7.2f}s"
+            if n <= 20_000:
+                start = time.perf_counter()
+                exact = brute_force(snapshot, **options)
+                brute = time.perf_counter() - start
+                found = {frozenset(p) for p in zip(pairs["SHIP_ID_1"], pairs["SHIP_ID_2"])}
+                ids = snapshot["SHIP_ID"].astype(str).to_numpy()
+                exact = {frozenset(ids[list(p)]) for p in exact}
+                line += f" (all pairs: {brute:.2f}s, {'same' if found == exact else 'DIFFERENT'} result)"
+            print(line)
+    else:
+        df = pd.read_csv(args.path)
+        if args.align:
+            import dead_reckoning
+            df = dead_reckoning.align(df)
+        start = time.perf_counter()
+        pairs = risky_pairs(df, workers=args.workers, **options)
+        print(f"{len(pairs)} risky pairs among {len(df)} vessels in {time.perf_counter() - start:.2f}s")
+        print(pairs.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+        if args.output:
+            pairs.to_csv(args.output, index=False)
+            print(f"Saved {args.output}")
@@ -0,0 +1,166 @@
+import json
+
+import fetcher
+import tiles
+
+# get_data_json_4 answers at most ~2.5k rows per tile, a full tile may be truncated
+ROW_CAP = 2500
+
+
+def elapsed_minutes(row):
+    """ELAPSED as a number, missing values sort as the stalest"""
+    try:
+        return float(row.get("ELAPSED"))
+    except (TypeError, ValueError):
+        return float("inf")
+
+
+def merge_rows(batches, merged=None):
+    """Merge row lists keyed by SHIP_ID, keeping the freshest (lowest ELAPSED) report"""
+    merged = {} if merged is None else merged
+    for rows in batches:
+        for row in rows:
+            ship_id = row.get("SHIP_ID")
+            if ship_id is None:
+                continue
+            current = merged.get(ship_id)
+            if current is None or elapsed_minutes(row) < elapsed_minutes(current):
+                merged[ship_id] = row
+    return merged
+
+
+def crawl(start_zoom=2, max_zoom=6, cap=ROW_CAP, base_url=fetcher.BASE_URL,
+          concurrency=4, timeout=10.0, retries=3, verbose=True):
+    """Fetch tiles level by level, splitting only the tiles that hit the row cap.
+
+    Returns (rows, tree) where rows are deduplicated by SHIP_ID and tree maps
+    "z/x/y" to {"rows": count, "children": [...]} for every requested tile.
+    """
+    tree = {}
+    merged = {}
+    level = tiles.level_tiles(start_zoom)
+    session = fetcher.make_session(concurrency)
+    try:
+        while level:
+            reports, wall = fetcher.fetch_tiles(level, base_url=base_url, concurrency=concurrency,
+                                                timeout=timeout, retries=retries,
+                                                session=session, verbose=False)
+            next_level = []
+            for report in reports:
+                tile = (report["z"], report["x"], report["y"])
+                count = len(report["rows"])
+                node = {"rows": count, "error": report["error"], "children": []}
+                tree[tiles.tile_key(*tile)] = node
+                merge_rows([report["rows"]], merged)
+                if count >= cap and tile[0] < max_zoom:
+                    kids = tiles.children(*tile)
+                    node["children"] = [tiles.tile_key(*kid) for kid in kids]
+                    next_level.extend(kids)
+            if verbose:
+                saturated = sum(1 for r in reports if len(r["rows"]) >= cap)
+                print(f"z:{level[0][0]}: {len(level)} tiles, {saturated} saturated, "
+                      f"{len(merged)} unique vessels so far ({wall:.2f}s)")
+            level = next_level
+    finally:
+        session.close()
+
+    return list(merged.values()), tree
+
+
+def plan(start_zoom=2, max_zoom=6, cap=ROW_CAP, counts=None):
+    """Dry-run the crawl from known per-tile row counts without any requests.
+
+    `counts` maps "z/x/y" to a row count, usually the manifest of a previous crawl.
+    Tiles with no known count are planned as leaves and marked unknown: the
+    endpoint caps every response, so nothing below a tile can be predicted
+    until it has been fetched. Without a manifest only the start level is
+    planned.
+    """
+    counts = counts or {}
+    tree = {}
+    level = tiles.level_tiles(start_zoom)
+    while level:
+        next_level = []
+        for tile in level:
+            key = tiles.tile_key(*tile)
+            count = counts.get(key)
+            node = {"rows": count, "error": None, "children": []}
+            tree[key] = node
+            if count is not None and count >= cap and tile[0] < max_zoom:
+                kids = tiles.children(*tile)
+                node["children"] = [tiles.tile_key(*kid) for kid in kids]
+                next_level.extend(kids)
+        level = next_level
+    return tree
+
+
+def print_tree(tree, start_zoom, cap=ROW_CAP):
+    """Print the tile tree with one indented line per request"""
+    def walk(key, depth):
+        node = tree[key]
+        count = "?" if node["rows"] is None else node["rows"]
+        mark = ""
+        if node["error"]:
+            mark = f"  [error: {node['error']}]"
+        elif node["children"]:
+            mark = "  [saturated, split]"
+        elif node["rows"] is not None and node["rows"] >= cap:
+            mark = "  [saturated, at max zoom]"
+        z, x, y = tiles.parse_tile_key(key)
+        print(f"{'  ' * depth}z:{z} X:{x} Y:{y}  rows={count}{mark}")
+        for child in node["children"]:
+            walk(child, depth + 1)
+
+    for tile in tiles.level_tiles(start_zoom):
+        walk(tiles.tile_key(*tile), 0)
+    unknown = sum(1 for node in tree.values() if node["rows"] is None)
+    if unknown:
+        print(f"Total requests: at least {len(tree)} ({unknown} tile(s) with no known row count "
+              f"may split further)")
+    else:
+        print(f"Total requests: {len(tree)}")
+
+
+def save_manifest(tree, path, cap=ROW_CAP):
+    """Save per-tile row counts so later dry runs can plan from them"""
+    with open(path, "w") as f:
+        json.dump({"cap": cap, "tiles": {key: node["rows"] for key, node in tree.items()}}, f, indent=2)
+
+
+def load_manifest(path):
+    with open(path) as f:
+        return json.load(f)["tiles"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Adaptive quadtree crawl of the tile endpoint")
+    parser.add_argument("--base-url", default=fetcher.BASE_URL)
+    parser.add_argument("--start-zoom", type=int, default=2, help="default: the four tiles script.py scrapes")
+    parser.add_argument("--max-zoom", type=int, default=6)
+    parser.add_argument("--cap", type=int, default=ROW_CAP, help="row count that marks a tile as saturated")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--manifest", default="crawl_manifest.json",
+                        help="per-tile row counts written by a crawl, read by --dry-run")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print the planned tile tree, send no requests. Plans from the --manifest of an "
+                             "earlier live crawl; without one only the start level can be shown")
+    args = parser.parse_args()
+
+    if args.dry_run:
+        try:
+            counts = load_manifest(args.manifest)
+        except FileNotFoundError:
+            counts = {}
+            print(f"No manifest at {args.manifest}: a dry run needs the row counts of an earlier live "
+                  f"crawl, so only the start level is planned and the request count is a lower bound")
+        tree = plan(args.start_zoom, args.max_zoom, args.cap, counts)
+        print_tree(tree, args.start_zoom, args.cap)
+    else:
+        from script import convertData
+
+        rows, tree = crawl(args.start_zoom, args.max_zoom, args.cap, args.base_url, args.concurrency)
+        print_tree(tree, args.start_zoom, args.cap)
+        save_manifest(tree, args.manifest, args.cap)
+        convertData(rows)
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from spatial_index import EARTH_RADIUS_KM, wrap_lon
+
+KM_PER_NM = 1.852
+# AIS sends SPEED in tenths of a knot with 1023 meaning "not available";
+# COURSE 360 is likewise "not available"
+SPEED_UNAVAILABLE = 1023
+COURSE_UNAVAILABLE = 360
+
+# Defaults for align(): reports older than STALE_MINUTES are dropped, and no
+# report is moved further than MAX_PROJECT_MINUTES along its course. Equal, so
+# by default every row that is kept is projected all the way.
+STALE_MINUTES = 60
+MAX_PROJECT_MINUTES = STALE_MINUTES
+
+
+def destination(lat, lon, course, km):
+    """Great-circle destination after km along initial bearing course (degrees); broadcasts"""
+    lat1 = np.radians(lat)
+    theta = np.radians(course)
+    d = np.asarray(km, dtype=np.float64) / EARTH_RADIUS_KM
+    sin_lat1, cos_lat1, sin_d, cos_d = np.sin(lat1), np.cos(lat1), np.sin(d), np.cos(d)
+    sin_lat2 = np.clip(sin_lat1 * cos_d + cos_lat1 * sin_d * np.cos(theta), -1.0, 1.0)
+    lat2 = np.arcsin(sin_lat2)
+    dlon = np.arctan2(np.sin(theta) * sin_d * cos_lat1, cos_d - sin_lat1 * sin_lat2)
+    return np.degrees(lat2), wrap_lon(np.asarray(lon, dtype=np.float64) + np.degrees(dlon))
+
+
+def project(lat, lon, speed, course, minutes):
+    """Move positions `minutes` ahead (negative: back) at SPEED tenths of a knot along COURSE.
+
+    Rows with an unknown or unavailable speed or course keep their position.
+    """
+    speed = np.asarray(speed, dtype=np.float64)
+    course = np.asarray(course, dtype=np.float64)
+    movable = (speed > 0) & (speed < SPEED_UNAVAILABLE) & (course >= 0) & (course < COURSE_UNAVAILABLE)
+    km = np.where(movable, speed / 10 * KM_PER_NM * np.asarray(minutes, dtype=np.float64) / 60, 0.0)
+    new_lat, new_lon = destination(lat, lon, np.where(movable, course, 0.0), km)
+    return np.where(movable, new_lat, lat), np.where(movable, new_lon, lon), movable
+
+
+def align(df, at=0.0, stale=STALE_MINUTES, max_project=MAX_PROJECT_MINUTES, drop_stale=True):
+    """Move every vessel to where it would be `at` minutes before capture.
+
+    Each row was reported ELAPSED minutes before the snapshot was captured, so
+    it is projected (ELAPSED - at) minutes along its course, capped at
+    max_project minutes. Rows older than `stale` minutes, or without ELAPSED,
+    are dropped, or kept in place with STALE set when drop_stale is False.
+    The reported position is kept in LAT_REPORTED/LON_REPORTED and the minutes
+    actually projected in DR_MINUTES, so later stages can use LAT/LON as usual.
+    CLAMPED marks rows that hit the max_project cap and so are only partly
+    aligned (only possible when max_project < stale).
+    """
+    elapsed = pd.to_numeric(df["ELAPSED"], errors="coerce").to_numpy(dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        stale_rows = ~(elapsed <= stale)
+    if drop_stale:
+        df = df[~stale_rows]
+        elapsed = elapsed[~stale_rows]
+        stale_rows = stale_rows[~stale_rows]
+    else:
+        df = df.copy()
+
+    lat = df["LAT"].to_numpy(dtype=np.float64, na_value=np.nan)
+    lon = df["LON"].to_numpy(dtype=np.float64, na_value=np.nan)
+    speed = pd.to_numeric(df["SPEED"], errors="coerce").to_numpy(dtype=np.float64)
+    course = pd.to_numeric(df["COURSE"], errors="coerce").to_numpy(dtype=np.float64)
+    minutes = np.where(stale_rows, 0.0, np.clip(elapsed - at, -max_project, max_project))
+
+    new_lat, new_lon, moved = project(lat, lon, speed, course, minutes)
+    df["LAT_REPORTED"] = lat
+    df["LON_REPORTED"] = lon
+    df["LAT"] = new_lat
+    df["LON"] = new_lon
+    df["DR_MINUTES"] = np.where(moved, minutes, 0.0)
+    with np.errstate(invalid="ignore"):
+        df["CLAMPED"] = moved & (np.abs(elapsed - at) > max_project)
+    if not drop_stale:
+        df["STALE"] = stale_rows
+    return df
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from spatial_index import haversine_km
+
+    parser = argparse.ArgumentParser(description="Project snapshot positions to a common time by dead reckoning")
+    parser.add_argument("path")
+    parser.add_argument("--at", type=float, default=0.0, help="reference time, minutes before capture")
+    parser.add_argument("--stale", type=float, default=STALE_MINUTES, help="drop reports older than this")
+    parser.add_argument("--max-project", type=float, default=MAX_PROJECT_MINUTES)
+    parser.add_argument("--keep-stale", action="store_true", help="keep stale rows in place, flagged STALE")
+    parser.add_argument("--output", help="write the aligned CSV here")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.path)
+    start = time.perf_counter()
+    aligned = align(df, args.at, args.stale, args.max_project, not args.keep_stale)
+    seconds = time.perf_counter() - start
+    shift = haversine_km(aligned["LAT_REPORTED"], aligned["LON_REPORTED"], aligned["LAT"], aligned["LON"])
+    moved = aligned["DR_MINUTES"] != 0
+    print(f"Aligned {len(aligned)} of {len(df)} rows in {seconds * 1000:.1f} ms "
+          f"({len(df) / seconds:,.0f} rows/s)")
+    print(f"{moved.sum()} moved ({aligned['CLAMPED'].sum()} clamped at {args.max_project:g} min), "
+          f"median shift {np.nanmedian(shift[moved]) if moved.any() else 0:.2f} km, "
+          f"max {np.nanmax(shift) if len(shift) else 0:.2f} km")
+    if args.output:
+        aligned.to_csv(args.output, index=False)
+        print(f"Saved {args.output}")
@@ -0,0 +1,209 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+import features
+import instrument
+
+# SPEED is in tenths of a knot throughout (143 = 14.3 kn)
+MOORED = ['At Anchor', 'Moored', 'Aground']
+UNDERWAY = ['Underway using Engine', 'Underway by Sail']
+DISABLED = ['Not Under Command', 'Aground', 'Restricted Manoeuvrability']
+
+# Per-SHIPTYPE thresholds fitted once from reference data:
+# name -> (column, quantile, multiplier)
+THRESHOLDS = {
+    'speed_limit': ('SPEED', 0.999, 1.25),
+    'lw_low': ('LW_RATIO', 0.001, 0.8),
+    'lw_high': ('LW_RATIO', 0.999, 1.25),
+}
+
+# rule name -> conditions that must all hold. A condition is (column, op, value):
+# 'in'/'notin' test a category column against a list; the comparison ops take a
+# number, or a THRESHOLDS name that is looked up per row by SHIPTYPE.
+RULES = {
+    'moving_while_moored': [('STATUS_NAME', 'in', MOORED), ('SPEED', '>', 10)],
+    'stationary_underway': [('STATUS_NAME', 'in', UNDERWAY), ('SPEED', '==', 0)],
+    'disabled_but_fast': [('STATUS_NAME', 'in', DISABLED), ('SPEED', '>', 50)],
+    'fishing_at_transit_speed': [('STATUS_NAME', 'in', ['Engaged in Fishing']), ('SPEED', '>', 150)],
+    'overspeed_for_type': [('SPEED', '>', 'speed_limit')],
+    'heading_course_mismatch': [('HC_DIFF', '>', 90), ('SPEED', '>', 50)],
+    'hard_turn_at_speed': [('ROT_ABS', '>', 60), ('SPEED', '>', 150)],
+    'implausible_proportions': [('LENGTH', '>', 0), ('WIDTH', '>', 0), ('LW_RATIO', 'outside', ('lw_low', 'lw_high'))],
+}
+
+OPS = {
+    '>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal,
+    '==': np.equal, '!=': np.not_equal,
+}
+N_TYPES = 10
+
+
+def fit_thresholds(df, spec=THRESHOLDS):
+    """{threshold: array indexed by SHIPTYPE 0-9, plus the all-types value at index 10}"""
+    df = _with_features(df, {c for c, _, _ in spec.values()})
+    shiptype = pd.to_numeric(df['SHIPTYPE'], errors='coerce')
+    table = {}
+    for name, (column, q, mult) in spec.items():
+        values = df[column].replace([np.inf, -np.inf], np.nan)
+        overall = values.quantile(q) * mult
+        per_type = values.groupby(shiptype).quantile(q) * mult
+        arr = np.full(N_TYPES + 1, overall)
+        for t, v in per_type.items():
+            if 0 <= t < N_TYPES and not np.isnan(v):
+                arr[int(t)] = v
+        table[name] = arr
+    return table
+
+
+def save_thresholds(table, path):
+    with open(path, 'w') as f:
+        json.dump({k: v.tolist() for k, v in table.items()}, f, indent=2)
+
+
+def load_thresholds(path):
+    with open(path) as f:
+        return {k: np.array(v) for k, v in json.load(f).items()}
+
+
+def _with_features(df, columns):
+    missing = [c for c in columns if c not in df.columns and c in features.REGISTRY]
+    if missing:
+        df = pd.concat([df, features.compute(df, missing)], axis=1)
+    return df
+
+
+class RuleEngine:
+    """Rules compiled to NumPy masks over a chunk's columns.
+
+    Each distinct condition is evaluated once per chunk and shared between the
+    rules that use it; a rule's mask is the AND of its conditions. NaN never
+    satisfies a comparison, so missing data doesn't raise flags.
+    """
+
+    def __init__(self, thresholds, rules=RULES):
+        self.rules = rules
+        self.names = list(rules)
+        self.thresholds = thresholds
+        self.conditions = list(dict.fromkeys(_key(c) for conds in rules.values() for c in conds))
+        self.columns = {c[0] for conds in rules.values() for c in conds} | {'SHIPTYPE'}
+        referenced = set()
+        for _, op, value in self.conditions:
+            if op == 'outside':
+                referenced.update(value)
+            elif op not in ('in', 'notin') and isinstance(value, str):
+                referenced.add(value)
+        unknown = referenced - set(thresholds)
+        if unknown:
+            raise KeyError(f'Rules refer to unknown thresholds: {sorted(unknown)}')
+
+    def _threshold(self, name, type_index):
+        return self.thresholds[name][type_index]
+
+    def masks(self, df):
+        """(rows, rules) boolean array; column i belongs to self.names[i]"""
+        df = _with_features(df, self.columns)
+        n = len(df)
+        shiptype = df['SHIPTYPE'].to_numpy(dtype=np.float64, na_value=np.nan)
+        # Unknown or out-of-range types use the all-types threshold
+        known = (shiptype >= 0) & (shiptype < N_TYPES)
+        type_index = np.where(known, np.nan_to_num(shiptype), N_TYPES).astype(np.intp)
+
+        numeric, evaluated = {}, {}
+        for key in self.conditions:
+            column, op, value = key
+            if op in ('in', 'notin'):
+                hit = df[column].isin(list(value)).to_numpy(dtype=bool, na_value=False)
+                evaluated[key] = hit if op == 'in' else ~hit & df[column].notna().to_numpy()
+                continue
+            if column not in numeric:
+                numeric[column] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            x = numeric[column]
+            with np.errstate(invalid='ignore'):
+                if op == 'outside':
+                    low, high = (self._threshold(v, type_index) for v in value)
+                    evaluated[key] = (x < low) | (x > high)
+                else:
+                    limit = self._threshold(value, type_index) if isinstance(value, str) else value
+                    evaluated[key] = OPS[op](x, limit)
+
+        out = np.empty((n, len(self.names)), dtype=bool)
+        for i, name in enumerate(self.names):
+            mask = np.ones(n, dtype=bool)
+            for condition in self.rules[name]:
+                mask &= evaluated[_key(condition)]
+            out[:, i] = mask
+        return out
+
+    def flag(self, df):
+        """(hit count per rule, flagged rows with ANOMALY_FLAGS bitmask and ANOMALIES names)"""
+        masks = self.masks(df)
+        counts = dict(zip(self.names, masks.sum(axis=0).tolist()))
+        any_hit = masks.any(axis=1)
+        flagged = df[any_hit].copy()
+        hits = masks[any_hit]
+        flagged['ANOMALY_FLAGS'] = (hits * (1 << np.arange(len(self.names)))).sum(axis=1)
+        labels = np.full(len(flagged), '', dtype=object)
+        for i, name in enumerate(self.names):
+            labels[hits[:, i]] += name + ' '
+        flagged['ANOMALIES'] = [s.strip() for s in labels]
+        return counts, flagged
+
+
+def _key(condition):
+    column, op, value = condition
+    # Lists aren't hashable; conditions are shared by their frozen form
+    return column, op, tuple(value) if isinstance(value, list) else value
+
+
+def scan(chunks, engine, output=None, verbose=True):
+    """Run the engine over an iterable of frames, appending flagged rows to output CSV"""
+    totals = dict.fromkeys(engine.names, 0)
+    rows = flagged_rows = 0
+    seconds = 0.0
+    for i, chunk in enumerate(chunks):
+        with instrument.stage('anomalies', rows_in=len(chunk)) as s:
+            start = time.perf_counter()
+            counts, flagged = engine.flag(chunk)
+            seconds += time.perf_counter() - start
+            s.rows_out = len(flagged)
+        for name, n in counts.items():
+            totals[name] += n
+        rows += len(chunk)
+        flagged_rows += len(flagged)
+        if output:
+            flagged.to_csv(output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    if verbose:
+        print(f'Scanned {rows} rows, flagged {flagged_rows} '
+              f'({rows / seconds if seconds else 0:,.0f} rows/s in the rule engine)')
+        for name, n in sorted(totals.items(), key=lambda kv: -kv[1]):
+            print(f'  {name:26s} {n:8d}')
+    return totals, rows, flagged_rows
+
+
+if __name__ == '__main__':
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description='Flag operational anomalies with declarative rules')
+    parser.add_argument('path')
+    parser.add_argument('--thresholds', default='anomaly_thresholds.json',
+                        help='per-SHIPTYPE thresholds; fitted from --fit-from when given')
+    parser.add_argument('--fit-from', nargs='+', help='reference CSVs (globs) to fit the thresholds on')
+    parser.add_argument('--output', default='anomalies.csv')
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    args = parser.parse_args()
+
+    if args.fit_from:
+        paths = [p for pattern in args.fit_from for p in sorted(glob.glob(pattern))]
+        table = fit_thresholds(pd.concat([pd.read_csv(p) for p in paths], ignore_index=True))
+        save_thresholds(table, args.thresholds)
+        print(f'Fitted thresholds on {len(paths)} file(s), saved {args.thresholds}')
+    else:
+        table = load_thresholds(args.thresholds)
+
+    engine = RuleEngine(table)
+    scan(pd.read_csv(args.path, chunksize=args.chunksize), engine, args.output)
+    print(f'Saved flagged rows to {args.output}')
@@ -0,0 +1,312 @@
+import hashlib
+import json
+import os
+import time
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import features
+import instrument
+import module2_data_handling
+from cleaning import DTYPES, peak_rss_mb
+
+WORK_DIR = '.batch'
+FEATURES = ['HC_DIFF', 'LW_RATIO', 'SPEED_ZSCORE', 'ROT_ABS']
+
+
+def split_features(names):
+    """(features computable per row, features needing statistics over every file, their stat columns)"""
+    local = [n for n in names if not features.REGISTRY[n][1]]
+    pooled = [n for n in names if features.REGISTRY[n][1]]
+    return local, pooled, sorted({c for n in pooled for c in features.REGISTRY[n][1]})
+
+
+def part_path(parts_dir, path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(parts_dir, f'{stem}-{hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:8]}.parquet')
+
+
+def process(path, names, parts_dir):
+    """Clean one snapshot and add its per-row features; runs in a worker.
+
+    The frame goes to a Parquet part file and only a small result dict comes
+    back, so the parent never holds more than timings and running stats.
+    Features like SPEED_ZSCORE need statistics over every file, so the worker
+    returns its share of them and merge() computes those features later.
+    """
+    local, _, stat_cols = split_features(names)
+    times = {}
+    cpu = time.process_time()
+
+    start = time.perf_counter()
+    df = pd.read_csv(path, dtype=DTYPES)
+    rows_in = len(df)
+    times['read_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df = module2_data_handling.clean(df, verbose=False)
+    times['clean_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    features.add_features(df, local)
+    stats = {}
+    for c in stat_cols:
+        stats[c] = features.RunningStats()
+        stats[c].update(df[c].to_numpy(dtype='float64', na_value=float('nan')))
+    times['features_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    df['SOURCE'] = os.path.basename(path)
+    part = part_path(parts_dir, path)
+    df.to_parquet(part + '.tmp', index=False)
+    os.replace(part + '.tmp', part)
+    times['write_s'] = time.perf_counter() - start
+    times['cpu_s'] = time.process_time() - cpu
+
+    return {'path': path, 'part': part, 'rows_in': rows_in, 'rows_out': len(df), 'stats': stats,
+            'pid': os.getpid(), 'peak_rss_mb': peak_rss_mb(), **times}
+
+
+class Quarantine:
+    """Files that kept failing, with their last error, kept in quarantine.json.
+
+    A quarantined file is skipped on later runs until it changes on disk
+    (size or mtime) or is released with clear().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def _stamp(self, path):
+        st = os.stat(path)
+        return [st.st_size, st.st_mtime]
+
+    def holds(self, path):
+        entry = self.entries.get(os.path.abspath(path))
+        return entry is not None and os.path.exists(path) and entry['stamp'] == self._stamp(path)
+
+    def add(self, path, error, attempts):
+        stamp = self._stamp(path) if os.path.exists(path) else None
+        self.entries[os.path.abspath(path)] = {'error': error, 'attempts': attempts, 'stamp': stamp,
+                                               'when': time.time()}
+
+    def release(self, path):
+        self.entries.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        self.entries = {}
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+
+
+def run(paths, names=FEATURES, workers=None, in_flight=None, retries=1, work_dir=WORK_DIR, verbose=True):
+    """Fan process() over a process pool, at most `in_flight` files submitted at once.
+
+    A file that raises is resubmitted up to `retries` times, then quarantined;
+    the batch carries on either way. If a worker dies outright the pool can't
+    say which file killed it, so the pool is rebuilt and every file it had in
+    flight is rerun alone, without counting that attempt. Only a file that
+    kills a worker on its own is charged a failed attempt.
+    Returns (results, failures) where failures maps path -> last error.
+    """
+    workers = workers or os.cpu_count() or 1
+    in_flight = in_flight or 2 * workers
+    parts_dir = os.path.join(work_dir, 'parts')
+    os.makedirs(parts_dir, exist_ok=True)
+    quarantine = Quarantine(os.path.join(work_dir, 'quarantine.json'))
+
+    skipped = [p for p in paths if quarantine.holds(p)]
+    if verbose:
+        for p in skipped:
+            print(f'Skipping quarantined {p}')
+    queue = deque(p for p in paths if p not in skipped)
+    suspects = deque()
+    attempts, results, failures = {}, [], {}
+
+    def failed(path, error):
+        if attempts[path] <= retries:
+            queue.append(path)
+            if verbose:
+                print(f'Retrying {path} ({error.strip().splitlines()[-1]})')
+        else:
+            failures[path] = error
+            quarantine.add(path, error, attempts[path])
+            if verbose:
+                print(f'Quarantined {path} after {attempts[path]} attempt(s)')
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pending = {}
+    alone = None  # a suspect running by itself
+    try:
+        while queue or suspects or pending:
+            if suspects and not pending:
+                alone = suspects.popleft()
+                attempts[alone] = attempts.get(alone, 0) + 1
+                pending[pool.submit(process, alone, names, parts_dir)] = alone
+            while alone is None and not suspects and queue and len(pending) < in_flight:
+                path = queue.popleft()
+                attempts[path] = attempts.get(path, 0) + 1
+                pending[pool.submit(process, path, names, parts_dir)] = path
+            isolated = len(pending) == 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    if isolated:
+                        failed(path, 'worker process died')
+                    else:
+                        attempts[path] -= 1
+                        suspects.append(path)
+                except Exception:
+                    failed(path, traceback.format_exc())
+                else:
+                    result['attempts'] = attempts[path]
+                    results.append(result)
+                    quarantine.release(path)
+            alone = None
+            if broken:
+                for path in pending.values():
+                    attempts[path] -= 1
+                    suspects.append(path)
+                pending = {}
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        pool.shutdown()
+        quarantine.save()
+    return results, failures
+
+
+def merge(results, output, names=FEATURES):
+    """Concatenate the part files into one output, adding the features that need global stats.
+
+    Parts are written in source path order and the per-file stats are merged
+    in that same order, so the output doesn't depend on which worker
+    finished first. Memory is bounded by the largest single part.
+    """
+    _, pooled, stat_cols = split_features(names)
+    results = sorted(results, key=lambda r: r['path'])
+    totals = {c: features.RunningStats() for c in stat_cols}
+    for r in results:
+        for c in stat_cols:
+            totals[c].merge(r['stats'][c])
+    stats = {c: acc.result() for c, acc in totals.items()}
+
+    writer = None
+    schema = None
+    columns = None
+    rows = 0
+    with instrument.stage('batch.merge', rows_in=sum(r['rows_out'] for r in results)) as s:
+        for r in results:
+            df = pd.read_parquet(r['part'])
+            features.add_features(df, pooled, stats)
+            # Snapshots don't all list their columns in the same order; the first one sets it
+            if columns is None:
+                columns = [c for c in df.columns if c != 'SOURCE'] + ['SOURCE']
+            extra = [c for c in df.columns if c not in columns]
+            if extra:
+                print(f"Dropping columns {extra} from {r['path']}, not in the first snapshot")
+            df = df.reindex(columns=columns)
+            rows += len(df)
+            if output.endswith('.parquet'):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pq.ParquetWriter(output, schema, compression='zstd')
+                writer.write_table(table.cast(schema))
+            else:
+                df.to_csv(output, mode='w' if writer is None else 'a', header=writer is None, index=False)
+                writer = True
+        if hasattr(writer, 'close'):
+            writer.close()
+        s.rows_out = rows
+        if writer is not None:
+            instrument.wrote(output)
+    return rows, stats
+
+
+def timing_table(results, failures):
+    rows = [{'file': os.path.basename(r['path']), 'status': 'ok', 'attempts': r['attempts'],
+             'rows_in': r['rows_in'], 'rows_out': r['rows_out'], 'read_s': r['read_s'],
+             'clean_s': r['clean_s'], 'features_s': r['features_s'], 'write_s': r['write_s'],
+             'total_s': r['read_s'] + r['clean_s'] + r['features_s'] + r['write_s'], 'cpu_s': r['cpu_s'],
+             'pid': r['pid'], 'peak_rss_mb': r['peak_rss_mb']} for r in results]
+    rows += [{'file': os.path.basename(p), 'status': 'quarantined'} for p in failures]
+    table = pd.DataFrame(rows)
+    if not len(table):
+        return table
+    for c in ['attempts', 'rows_in', 'rows_out', 'pid']:
+        if c in table:
+            table[c] = table[c].astype('Int64')
+    return table.sort_values('file').reset_index(drop=True)
+
+
+def main(paths, output='batch_output.parquet', names=FEATURES, workers=None, in_flight=None, retries=1,
+         work_dir=WORK_DIR, timings=None, retry_quarantined=False):
+    paths = [p for p in paths if not os.path.basename(p).startswith('cleaned')]
+    workers = workers or os.cpu_count() or 1
+    if retry_quarantined:
+        quarantine = Quarantine(os.path.join(work_dir, 'quarantine.json'))
+        quarantine.clear()
+        os.makedirs(work_dir, exist_ok=True)
+        quarantine.save()
+
+    start = time.perf_counter()
+    results, failures = run(paths, names, workers, in_flight, retries, work_dir)
+    processed = time.perf_counter() - start
+    rows, stats = merge(results, output, names)
+    wall = time.perf_counter() - start
+
+    table = timing_table(results, failures)
+    print()
+    print(table.to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+    busy = table['cpu_s'].sum() if len(results) else 0.0
+    rows_in = sum(r['rows_in'] for r in results)
+    print(f'\n{len(results)} of {len(paths)} files, {rows_in} rows in, {rows} rows out')
+    print(f'Workers: {workers}, {busy:.2f}s worker CPU in {processed:.2f}s wall '
+          f'({busy / processed / workers if processed else 0:.0%} of {workers} worker(s) busy, '
+          f'{rows_in / processed if processed else 0:,.0f} rows/s)')
+    print(f'Merged into {output} in {wall - processed:.2f}s; {wall:.2f}s total')
+    for c, (mean, std) in stats.items():
+        print(f'Global {c} mean {mean:.3f}, std {std:.3f}')
+    if failures:
+        print(f'{len(failures)} file(s) quarantined, see {os.path.join(work_dir, "quarantine.json")}')
+    if timings:
+        table.to_csv(timings, index=False)
+        print(f'Saved {timings}')
+    return results, failures
+
+
+if __name__ == '__main__':
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description='Clean and add features to many snapshots across a process pool')
+    parser.add_argument('paths', nargs='*', default=['data/*.csv'], help='CSV files or globs')
+    parser.add_argument('--output', default='batch_output.parquet', help='.parquet or .csv')
+    parser.add_argument('--workers', type=int, help='default: one per core')
+    parser.add_argument('--in-flight', type=int, help='files submitted at once (default 2 per worker)')
+    parser.add_argument('--retries', type=int, default=1)
+    parser.add_argument('--work-dir', default=WORK_DIR)
+    parser.add_argument('--timings', help='also write the per-file timing table to this CSV')
+    parser.add_argument('--retry-quarantined', action='store_true')
+    args = parser.parse_args()
+
+    main([p for pattern in args.paths for p in sorted(glob.glob(pattern))], args.output, FEATURES,
+         args.workers, args.in_flight, args.retries, args.work_dir, args.timings, args.retry_quarantined)
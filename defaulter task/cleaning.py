@@ -0,0 +1,273 @@
+import json
+import os
+import resource
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Fixed dtypes so every chunk parses the same way; duplicate detection hashes
+# values, and 143 (int) and 143.0 (float) would otherwise hash differently.
+NUMERIC = ['LAT', 'LON', 'SPEED', 'COURSE', 'HEADING', 'ELAPSED', 'LENGTH', 'ROT',
+           'SHIPTYPE', 'WIDTH', 'L_FORE', 'W_LEFT', 'DWT', 'GT_SHIPTYPE', 'TYPE_IMG']
+TEXT = ['DESTINATION', 'FLAG', 'SHIPNAME', 'SHIP_ID', 'TYPE_NAME', 'STATUS_NAME']
+DTYPES = {**{c: 'float64' for c in NUMERIC}, **{c: 'str' for c in TEXT}}
+
+SPEED_QUANTILE = 0.99
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (Linux reports KiB)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class HashSet:
+    """Sorted uint64 row hashes, 8 bytes per distinct row instead of a Python set.
+
+    Each chunk's new hashes become one sorted run. A run is merged into the
+    one before it once it is at least as large, like carries in a binary
+    counter, so there are O(log N) runs and inserting N hashes costs
+    O(N log N) overall, rather than re-sorting everything seen so far on
+    every chunk.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def first_seen(self, hashes):
+        """Mask of hashes not seen before (in earlier chunks or earlier in this one)"""
+        fresh = ~pd.Series(hashes).duplicated().to_numpy()
+        # Sorted probes walk each run in order instead of jumping around it at random
+        order = np.argsort(hashes)
+        probes = hashes[order]
+        seen = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            pos = np.searchsorted(run, probes)
+            pos[pos == len(run)] = 0
+            seen |= run[pos] == probes
+        fresh[order[seen]] = False
+        if fresh.any():
+            self.runs.append(np.sort(hashes[fresh]))
+        while len(self.runs) > 1 and len(self.runs[-1]) >= len(self.runs[-2]):
+            last = self.runs.pop()
+            # Timsort (kind='stable') finds the two sorted runs and merges them in linear time
+            self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]), kind='stable')
+        return fresh
+
+
+class ExactQuantile:
+    """Two-pass exact quantile with pandas' linear interpolation.
+
+    Pass one counts values per coarse bucket (the top bits of the float, which
+    sort like the values themselves for positive numbers). Pass two keeps only
+    the values in the bucket(s) holding the wanted ranks and sorts those.
+    """
+
+    SHIFT = np.uint64(40)
+
+    def __init__(self, q):
+        self.q = q
+        self.counts = {}
+        self.n = 0
+        self._targets = None
+        self._kept = []
+
+    def _bucket(self, values):
+        return values.astype(np.float64).view(np.uint64) >> self.SHIFT
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if values.min(initial=1.0) <= 0:
+            raise ValueError('ExactQuantile buckets assume positive values')
+        buckets, counts = np.unique(self._bucket(values), return_counts=True)
+        for b, c in zip(buckets.tolist(), counts.tolist()):
+            self.counts[b] = self.counts.get(b, 0) + c
+        self.n += len(values)
+
+    @property
+    def needs_second_pass(self):
+        return True
+
+    def _ranks(self):
+        h = (self.n - 1) * self.q
+        lo = int(np.floor(h))
+        return lo, min(lo + 1, self.n - 1), h - lo
+
+    def start_second_pass(self):
+        lo, hi, _ = self._ranks()
+        self._targets = {}
+        below = 0
+        for b in sorted(self.counts):
+            for rank in (lo, hi):
+                if below <= rank < below + self.counts[b]:
+                    self._targets[b] = below
+            below += self.counts[b]
+
+    def collect(self, values):
+        values = values[~np.isnan(values)]
+        keep = np.isin(self._bucket(values), list(self._targets))
+        self._kept.append(values[keep])
+
+    def result(self):
+        lo, hi, frac = self._ranks()
+        kept = np.sort(np.concatenate(self._kept)) if self._kept else np.empty(0)
+        # Rank of kept[0] overall = values in buckets below the first target bucket
+        offset = min(self._targets.values())
+        a, b = kept[lo - offset], kept[hi - offset]
+        return a + (b - a) * frac
+
+
+class TDigest:
+    """Merging t-digest (k1 scale); one pass, memory bounded by the compression"""
+
+    def __init__(self, q, compression=200):
+        self.q = q
+        self.delta = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    @property
+    def needs_second_pass(self):
+        return False
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, np.ones(len(values))])
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Group consecutive points whose k1 scale values fall in the same unit interval
+        q_right = np.cumsum(weights) / total
+        k = self.delta / (2 * np.pi) * np.arcsin(np.clip(2 * (q_right - weights / 2 / total) - 1, -1, 1))
+        group = np.floor(k - k.min()).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        w = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / w
+        self.weights = w
+
+    def result(self):
+        if len(self.means) == 0:
+            return np.nan
+        if len(self.means) == 1:
+            return self.means[0]
+        # Interpolate between centroid centres placed at their cumulative midpoints
+        total = self.weights.sum()
+        centres = (np.cumsum(self.weights) - self.weights / 2) / total
+        return float(np.interp(self.q, centres, self.means))
+
+
+def clean_chunk(chunk):
+    """The module2 row rules that need no global state"""
+    chunk['ROT'] = chunk['ROT'].fillna(0)
+    return chunk.dropna(subset=['LAT', 'LON', 'SPEED'])
+
+
+def clean_file(path, output='cleaned_data.csv', chunksize=100_000, quantile='exact',
+               json_path='ship_data.json', verbose=True):
+    """Apply module2's cleaning rules with memory bounded by the chunk size.
+
+    quantile='exact' gives the same SPEED cap as module2 with an extra read of
+    the SPEED column; quantile='tdigest' estimates it in the first pass.
+    Output is CSV, or Parquet when `output` ends in .parquet.
+    """
+    estimator = ExactQuantile(SPEED_QUANTILE) if quantile == 'exact' else TDigest(SPEED_QUANTILE)
+    seen = HashSet()
+    # Numbers are parsed as float64 so chunks agree; columns pd.read_csv would
+    # have made int64 (whole numbers, nothing missing) are cast back on output
+    integral = {}
+    stats = {'rows': 0, 'missing': 0, 'duplicates': 0, 'zero_speed': 0, 'outliers': 0, 'kept': 0}
+
+    # Pass 1: row rules and dedupe, spilled to a temp Parquet file; feed SPEED into the estimator
+    fd, spill = tempfile.mkstemp(suffix='.parquet')
+    os.close(fd)
+    spill_writer = None
+    try:
+        for chunk in pd.read_csv(path, chunksize=chunksize, dtype=DTYPES):
+            stats['rows'] += len(chunk)
+            for c in NUMERIC:
+                if c in chunk and integral.get(c, True):
+                    values = chunk[c].to_numpy()
+                    integral[c] = not np.isnan(values).any() and bool((values % 1 == 0).all())
+            cleaned = clean_chunk(chunk)
+            stats['missing'] += len(chunk) - len(cleaned)
+            fresh = seen.first_seen(pd.util.hash_pandas_object(cleaned, index=False).to_numpy())
+            stats['duplicates'] += int((~fresh).sum())
+            cleaned = cleaned[fresh]
+            moving = cleaned[cleaned['SPEED'] > 0]
+            stats['zero_speed'] += len(cleaned) - len(moving)
+            if len(moving):
+                estimator.update(moving['SPEED'].to_numpy())
+            table = pa.Table.from_pandas(moving, preserve_index=False)
+            if spill_writer is None:
+                spill_writer = pq.ParquetWriter(spill, table.schema)
+            spill_writer.write_table(table)
+        seen = None
+        if spill_writer is None:
+            return _finish(stats, np.nan, output, verbose)
+        spill_writer.close()
+        spilled = pq.ParquetFile(spill)
+
+        if estimator.needs_second_pass:
+            estimator.start_second_pass()
+            for batch in spilled.iter_batches(batch_size=chunksize, columns=['SPEED']):
+                estimator.collect(batch.column(0).to_numpy(zero_copy_only=False))
+        q99 = estimator.result()
+
+        # Final pass: apply the speed cap and stream the output
+        int_columns = {c: 'int64' for c, whole in integral.items() if whole}
+        writer = None
+        first_rows = []
+        for batch in spilled.iter_batches(batch_size=chunksize):
+            chunk = batch.to_pandas()
+            kept = chunk[chunk['SPEED'] <= q99].astype(int_columns)
+            stats['outliers'] += len(chunk) - len(kept)
+            stats['kept'] += len(kept)
+            if len(first_rows) < 100:
+                first_rows.extend(kept.head(100 - len(first_rows)).to_dict(orient='records'))
+            if output.endswith('.parquet'):
+                table = pa.Table.from_pandas(kept, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output, table.schema, compression='zstd')
+                writer.write_table(table)
+            else:
+                kept.to_csv(output, mode='w' if writer is None else 'a', header=writer is None, index=False)
+                writer = True
+        if hasattr(writer, 'close'):
+            writer.close()
+    finally:
+        os.remove(spill)
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(first_rows, f, indent=2)
+    return _finish(stats, q99, output, verbose)
+
+
+def _finish(stats, q99, output, verbose):
+    stats['speed_cap'] = float(q99) if q99 == q99 else None
+    stats['peak_rss_mb'] = peak_rss_mb()
+    if verbose:
+        print(f"Read {stats['rows']} rows")
+        print(f"Dropped {stats['missing']} rows with missing critical data")
+        print(f"Duplicates: {stats['duplicates']}")
+        print(f"Removed {stats['zero_speed']} zero-speed entries")
+        print(f"Filtered {stats['outliers']} speed outliers above {q99:.1f}")
+        print(f"Final rows: {stats['kept']}, saved to {output}")
+        print(f"Peak RSS: {stats['peak_rss_mb']:.1f} MB")
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Chunked version of the module2 cleaning rules')
+    parser.add_argument('path', nargs='?', default='data1.csv')
+    parser.add_argument('--output', default='cleaned_data.csv', help='.csv or .parquet')
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--quantile', choices=['exact', 'tdigest'], default='exact')
+    args = parser.parse_args()
+
+    clean_file(args.path, args.output, args.chunksize, args.quantile)
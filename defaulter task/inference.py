@@ -0,0 +1,228 @@
+import json
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Only numpy and pandas are imported here. Models are exported to plain arrays
+# and evaluated with numpy, so predicting never loads scikit-learn.
+MODEL_FILE = 'models.npz'
+CHUNK_SIZE = 50_000
+FORMAT_VERSION = 1
+
+
+def _linear_arrays(model):
+    return {'coef': np.atleast_2d(model.coef_), 'intercept': np.atleast_1d(model.intercept_)}
+
+
+def _tree_arrays(model):
+    tree = model.tree_
+    return {'left': tree.children_left, 'right': tree.children_right, 'feature': tree.feature,
+            'threshold': tree.threshold, 'value': tree.value[:, 0, :]}
+
+
+# sklearn class name -> (portable kind, array extractor)
+PORTABLE = {
+    'LinearRegression': ('linear', _linear_arrays),
+    'LogisticRegression': ('logistic', _linear_arrays),
+    'DecisionTreeClassifier': ('tree', _tree_arrays),
+    'DecisionTreeRegressor': ('tree', _tree_arrays),
+}
+
+
+def export(df, path=MODEL_FILE, n_types=3):
+    """Fit module4's models on df and save them with their feature schema.
+
+    Every model module4 fits that has a portable form is exported; KNN lives
+    in its own index (knn_index.py). The classifier with the best holdout
+    accuracy becomes the default SHIPTYPE model. Returns the manifest.
+    """
+    import sklearn
+    import module4_ml
+
+    reg = module4_ml.fit_regression(*module4_ml.regression_data(df))
+    classifiers, _ = module4_ml.fit_classifiers(*module4_ml.classification_data(df, n_types))
+
+    fitted = {'SPEED': {'Linear Regression': (reg['model'], {'r2': reg['r2'], 'mae': reg['mae']})},
+              'SHIPTYPE': {name: (c['model'], {'accuracy': c['accuracy']}) for name, c in classifiers.items()
+                           if type(c['model']).__name__ in PORTABLE}}
+    best = max(fitted['SHIPTYPE'], key=lambda name: fitted['SHIPTYPE'][name][1]['accuracy'])
+
+    manifest = {'format': FORMAT_VERSION, 'sklearn': sklearn.__version__, 'trained_rows': len(df),
+                'schema': {'SPEED': module4_ml.REGRESSION_FEATURES,
+                           'SHIPTYPE': module4_ml.CLASSIFICATION_FEATURES},
+                'default': {'SPEED': 'Linear Regression', 'SHIPTYPE': best},
+                'models': {}}
+    arrays = {}
+    for target, models in fitted.items():
+        for name, (model, metrics) in models.items():
+            kind, extract = PORTABLE[type(model).__name__]
+            key = f'{target}:{name}'
+            entry = {'kind': kind, 'estimator': type(model).__name__, 'metrics': metrics}
+            if hasattr(model, 'classes_'):
+                arrays[f'{key}:classes'] = model.classes_
+            for array_name, values in extract(model).items():
+                arrays[f'{key}:{array_name}'] = values
+            manifest['models'][key] = entry
+
+    np.savez(path, manifest=np.array(json.dumps(manifest)), **arrays)
+    return manifest
+
+
+class Model:
+    """One exported model evaluated with numpy"""
+
+    def __init__(self, kind, arrays, features):
+        self.kind = kind
+        self.arrays = arrays
+        self.features = features
+
+    def predict(self, X):
+        a = self.arrays
+        if self.kind == 'linear':
+            return X @ a['coef'][0] + a['intercept'][0]
+        if self.kind == 'logistic':
+            scores = X @ a['coef'].T + a['intercept']
+            if scores.shape[1] == 1:
+                return a['classes'][(scores[:, 0] > 0).astype(int)]
+            return a['classes'][scores.argmax(axis=1)]
+
+        # Walk every row down the tree one level per step; sklearn compares in float32
+        X = X.astype(np.float32)
+        node = np.zeros(len(X), dtype=np.intp)
+        rows = np.arange(len(X))
+        active = a['left'][node] != -1
+        while active.any():
+            r, n = rows[active], node[active]
+            go_left = X[r, a['feature'][n]] <= a['threshold'][n]
+            node[r] = np.where(go_left, a['left'][n], a['right'][n])
+            active = a['left'][node] != -1
+        value = a['value'][node]
+        if 'classes' in a:
+            return a['classes'][value.argmax(axis=1)]
+        return value[:, 0]
+
+
+def load(path=MODEL_FILE, speed_model=None, shiptype_model=None):
+    """Load the default (or named) SPEED and SHIPTYPE models from an export"""
+    with np.load(path, allow_pickle=False) as data:
+        manifest = json.loads(str(data['manifest']))
+        if manifest['format'] != FORMAT_VERSION:
+            raise ValueError(f'{path} has format {manifest["format"]}, expected {FORMAT_VERSION}')
+        chosen = {'SPEED': speed_model or manifest['default']['SPEED'],
+                  'SHIPTYPE': shiptype_model or manifest['default']['SHIPTYPE']}
+        models = {}
+        for target, name in chosen.items():
+            key = f'{target}:{name}'
+            if key not in manifest['models']:
+                raise KeyError(f'No {target} model named {name!r} in {path}')
+            arrays = {f[len(key) + 1:]: data[f] for f in data.files if f.startswith(key + ':')}
+            models[target] = Model(manifest['models'][key]['kind'], arrays, manifest['schema'][target])
+    return models, manifest
+
+
+def _complete(df, features):
+    X = df[features].to_numpy(dtype=np.float64, na_value=np.nan)
+    return X, ~np.isnan(X).any(axis=1)
+
+
+def predict_chunk(models, df):
+    """Add SHIPTYPE_PRED, SHIPTYPE_FILLED and SPEED_PRED to one chunk.
+
+    SHIPTYPE is predicted first and fills missing SHIPTYPE values, so the
+    SPEED model can use it. Rows missing a model input get NaN.
+    """
+    n = len(df)
+    X, ok = _complete(df, models['SHIPTYPE'].features)
+    shiptype = np.full(n, np.nan)
+    if ok.any():
+        shiptype[ok] = models['SHIPTYPE'].predict(X[ok])
+    df['SHIPTYPE_PRED'] = shiptype
+
+    missing = df['SHIPTYPE'].isna().to_numpy() & ok
+    df['SHIPTYPE_FILLED'] = missing
+    df['SHIPTYPE'] = df['SHIPTYPE'].where(~missing, shiptype)
+
+    X, ok = _complete(df, models['SPEED'].features)
+    speed = np.full(n, np.nan)
+    if ok.any():
+        speed[ok] = models['SPEED'].predict(X[ok])
+    df['SPEED_PRED'] = speed
+    return df
+
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE, columns=()):
+    """Frames of at most chunk_size rows from a snapshot CSV or station JSON"""
+    dtype = {c: 'float64' for c in columns}
+    if path.endswith('.json'):
+        # ingest.py lives in the repo root, next to the scraper that writes these files
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from ingest import ingest
+        # Station payloads are capped per tile, so one parse then slicing keeps memory bounded
+        df = ingest(path)
+        for c in columns:
+            if c in df.columns:
+                df[c] = df[c].astype('float64')
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size].copy()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype)
+
+
+def run(path, output, models, chunk_size=CHUNK_SIZE, verbose=True):
+    """Stream path through the models chunk by chunk, appending to output CSV"""
+    columns = set(models['SPEED'].features) | set(models['SHIPTYPE'].features)
+    rows = filled = 0
+    start = time.perf_counter()
+    for i, chunk in enumerate(iter_chunks(path, chunk_size, columns)):
+        for c in columns | {'SHIPTYPE'}:
+            if c not in chunk.columns:
+                chunk[c] = np.nan
+        chunk = predict_chunk(models, chunk)
+        chunk.to_csv(output, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        rows += len(chunk)
+        filled += int(chunk['SHIPTYPE_FILLED'].sum())
+        if verbose:
+            seconds = time.perf_counter() - start
+            print(f'chunk {i}: {rows} rows, {rows / seconds:,.0f} rows/s, '
+                  f'peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB')
+    return {'rows': rows, 'filled': filled, 'seconds': time.perf_counter() - start}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Export module4 models and run batch inference')
+    parser.add_argument('--models', default=MODEL_FILE)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    exp = sub.add_parser('export', help='fit and save the models')
+    exp.add_argument('path', nargs='?', default='data1.csv')
+    exp.add_argument('--types', type=int, default=3, help='number of most common SHIPTYPEs to classify')
+
+    pred = sub.add_parser('predict', help='add SHIPTYPE_PRED / SPEED_PRED to a snapshot CSV or station JSON')
+    pred.add_argument('path')
+    pred.add_argument('--output', default='predictions.csv')
+    pred.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    pred.add_argument('--speed-model')
+    pred.add_argument('--shiptype-model')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        manifest = export(pd.read_csv(args.path), args.models, args.types)
+        for key, entry in manifest['models'].items():
+            metrics = ', '.join(f'{k}={v:.4f}' for k, v in entry['metrics'].items())
+            print(f'{key:35s} {entry["estimator"]:24s} {metrics}')
+        print(f"Default SHIPTYPE model: {manifest['default']['SHIPTYPE']}")
+        print(f'Saved {args.models}')
+    else:
+        start = time.perf_counter()
+        models, manifest = load(args.models, args.speed_model, args.shiptype_model)
+        print(f'Loaded {args.models} in {(time.perf_counter() - start) * 1000:.1f} ms')
+        result = run(args.path, args.output, models, args.chunk_size)
+        print(f"Predicted {result['rows']} rows in {result['seconds']:.2f}s "
+              f"({result['rows'] / result['seconds']:,.0f} rows/s), filled {result['filled']} missing SHIPTYPE")
+        print(f'Saved {args.output}')
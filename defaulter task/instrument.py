@@ -0,0 +1,290 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Off unless configure() is called or MARITIME_METRICS is set:
+#   MARITIME_METRICS=metrics.jsonl   (or '-' for stderr)
+#   MARITIME_METRICS_FORMAT=jsonl | prom
+#   MARITIME_PROFILE=<stage name>    sample that stage's stacks into profile_<stage>.folded
+_config = {'enabled': False, 'output': None, 'format': 'jsonl', 'profile': None, 'interval': 0.005}
+_stack = []
+_totals = {}
+_lock = threading.Lock()
+
+
+def configure(output='-', fmt='jsonl', profile=None, interval=0.005, enabled=True):
+    """Turn recording on. jsonl writes a line per finished stage; prom writes totals at exit"""
+    if fmt not in ('jsonl', 'prom'):
+        raise ValueError(f'Unknown metrics format: {fmt}')
+    _config.update(enabled=enabled, output=output, format=fmt, profile=profile, interval=interval)
+
+
+def enabled():
+    return _config['enabled']
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+
+
+class _MemoryWatch:
+    """Samples RSS every `interval` seconds while any stage is open.
+
+    Each sample raises the peak of every open stage, so a stage's peak is its
+    own and the process-wide ru_maxrss that other reports read is left alone.
+    Spikes shorter than the interval can be missed.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.done.wait(self.interval):
+            rss = rss_mb()
+            for s in list(_stack):
+                s.peak_mb = max(s.peak_mb, rss)
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+
+
+_watch = None
+
+
+class _NullStage:
+    """Returned while disabled; every operation is a no-op"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+    def add(self, **counts):
+        pass
+
+
+_NULL = _NullStage()
+
+
+class Stage:
+    """Records wall/CPU time, peak RSS, rows and bytes for one block of work.
+
+    Set rows_in/rows_out/bytes_read/bytes_written on it (or call add()) while
+    it runs. Nested stages report their own numbers; a parent's peak RSS
+    includes its children's. Peak RSS is sampled (see _MemoryWatch).
+    """
+
+    def __init__(self, name, rows_in=None, **labels):
+        self.name = name
+        self.labels = labels
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak_mb = 0.0
+
+    def add(self, **counts):
+        for key, value in counts.items():
+            setattr(self, key, (getattr(self, key) or 0) + value)
+
+    def __enter__(self):
+        global _watch
+        self.rss_start = rss_mb()
+        self.peak_mb = self.rss_start
+        if _watch is None:
+            _watch = _MemoryWatch(_config['interval'])
+        self.sampler = Sampler(self.name, _config['interval']) if _config['profile'] == self.name else None
+        if self.sampler:
+            self.sampler.start()
+        _stack.append(self)
+        self.cpu = time.process_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.start
+        cpu = time.process_time() - self.cpu
+        _stack.pop()
+        if self.sampler:
+            self.sampler.stop()
+        self.peak_mb = max(self.peak_mb, rss_mb())
+        if _stack:
+            _stack[-1].peak_mb = max(_stack[-1].peak_mb, self.peak_mb)
+        else:
+            _stop_watch()
+        _record({'stage': self.name, **self.labels, 'wall_s': wall, 'cpu_s': cpu,
+                 'peak_rss_mb': self.peak_mb, 'rss_start_mb': self.rss_start,
+                 'rows_in': self.rows_in, 'rows_out': self.rows_out,
+                 'bytes_read': self.bytes_read, 'bytes_written': self.bytes_written,
+                 'error': exc_type.__name__ if exc_type else None, 'ts': time.time()})
+        return False
+
+
+def _stop_watch():
+    global _watch
+    if _watch is not None:
+        _watch.stop()
+        _watch = None
+
+
+def stage(name, rows_in=None, **labels):
+    """Context manager for one stage; costs one dict lookup while disabled"""
+    if not _config['enabled']:
+        return _NULL
+    return Stage(name, rows_in, **labels)
+
+
+def current():
+    """The innermost running stage, so helpers can add counts without being passed it"""
+    return _stack[-1] if _stack else _NULL
+
+
+def add(**counts):
+    current().add(**counts)
+
+
+def read_csv(path, name='load', **kwargs):
+    """pd.read_csv inside a stage that records the file size and row count"""
+    import pandas as pd
+    with stage(name, path=str(path)) as s:
+        df = pd.read_csv(path, **kwargs)
+        s.bytes_read = os.path.getsize(path)
+        s.rows_out = len(df)
+    return df
+
+
+def wrote(path):
+    """Count a file just written towards the current stage's bytes_written"""
+    if _stack:
+        _stack[-1].add(bytes_written=os.path.getsize(path))
+
+
+def _rows(value):
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def instrumented(name=None):
+    """Decorator form: rows_in from the first argument, rows_out from the return value"""
+    def wrap(fn):
+        stage_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            if not _config['enabled']:
+                return fn(*args, **kwargs)
+            with Stage(stage_name, _rows(args[0]) if args else None) as s:
+                result = fn(*args, **kwargs)
+                s.rows_out = _rows(result)
+            return result
+        return run
+    return wrap
+
+
+def _write(text):
+    if _config['output'] in (None, '-'):
+        sys.stderr.write(text)
+    else:
+        with open(_config['output'], 'a') as f:
+            f.write(text)
+
+
+def _record(record):
+    with _lock:
+        total = _totals.setdefault(record['stage'], Counter())
+        total['calls'] += 1
+        total['errors'] += record['error'] is not None
+        for key in ('wall_s', 'cpu_s', 'rows_in', 'rows_out', 'bytes_read', 'bytes_written'):
+            total[key] += record[key] or 0
+        total['peak_rss_mb'] = max(total['peak_rss_mb'], record['peak_rss_mb'])
+        if _config['format'] == 'jsonl':
+            _write(json.dumps(record) + '\n')
+
+
+# counter key -> (metric name, type, multiplier)
+PROM_METRICS = {
+    'calls': ('maritime_stage_calls_total', 'counter', 1),
+    'errors': ('maritime_stage_errors_total', 'counter', 1),
+    'wall_s': ('maritime_stage_wall_seconds_total', 'counter', 1),
+    'cpu_s': ('maritime_stage_cpu_seconds_total', 'counter', 1),
+    'rows_in': ('maritime_stage_rows_in_total', 'counter', 1),
+    'rows_out': ('maritime_stage_rows_out_total', 'counter', 1),
+    'bytes_read': ('maritime_stage_bytes_read_total', 'counter', 1),
+    'bytes_written': ('maritime_stage_bytes_written_total', 'counter', 1),
+    'peak_rss_mb': ('maritime_stage_peak_rss_bytes', 'gauge', 1024 * 1024),
+}
+
+
+def prometheus_text():
+    """Totals per stage in the Prometheus text exposition format"""
+    lines = []
+    for key, (metric, kind, scale) in PROM_METRICS.items():
+        lines.append(f'# TYPE {metric} {kind}')
+        for name, total in sorted(_totals.items()):
+            lines.append(f'{metric}{{stage="{name}"}} {total[key] * scale:g}')
+    return '\n'.join(lines) + '\n'
+
+
+@atexit.register
+def _dump():
+    if _config['enabled'] and _config['format'] == 'prom' and _totals:
+        _write(prometheus_text())
+
+
+class Sampler:
+    """Sampling profiler for the thread that starts it.
+
+    A background thread records the target thread's stack every `interval`
+    seconds; stop() writes the counts in folded format (one
+    'file:func;file:func N' line per stack) for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, name, interval=0.005, output=None):
+        self.output = output or f'profile_{name}.folded'
+        self.interval = interval
+        self.target = threading.get_ident()
+        self.counts = Counter()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.counts[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+        with open(self.output, 'w') as f:
+            for stack, n in self.counts.most_common():
+                f.write(f'{stack} {n}\n')
+
+
+if os.environ.get('MARITIME_METRICS'):
+    configure(os.environ['MARITIME_METRICS'], os.environ.get('MARITIME_METRICS_FORMAT', 'jsonl'),
+              os.environ.get('MARITIME_PROFILE'))
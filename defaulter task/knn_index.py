@@ -0,0 +1,161 @@
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import BallTree, KDTree
+
+import module4_ml
+
+FEATURES = module4_ml.CLASSIFICATION_FEATURES
+INDEX_FILE = 'shiptype_knn.pkl'
+TREES = {'kd': KDTree, 'ball': BallTree}
+
+
+class ShipTypeIndex:
+    """KNN SHIPTYPE classifier over a prebuilt tree of standardized features.
+
+    Build once from labelled snapshots, save, then load and classify new
+    snapshots without refitting. Votes are uniform and ties go to the
+    smallest label, the same as KNeighborsClassifier.
+    """
+
+    def __init__(self, X, y, k=5, kind='kd', leaf_size=40):
+        X = np.asarray(X, dtype=np.float64)
+        self.k = k
+        self.kind = kind
+        # Population std like StandardScaler; constant columns are left unscaled
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        self.classes, self.codes = np.unique(np.asarray(y), return_inverse=True)
+        self.tree = TREES[kind](self.transform(X), leaf_size=leaf_size)
+
+    @classmethod
+    def build(cls, df, n_types=3, **kwargs):
+        """Index the module4 classification task's rows (top n_types SHIPTYPEs)"""
+        X, y = module4_ml.classification_data(df, n_types)
+        return cls(X.to_numpy(dtype=np.float64), y.to_numpy(), **kwargs)
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean) / self.std
+
+    def kneighbors(self, X, k=None):
+        """(distances, reference row indices) of the k nearest references per query row"""
+        return self.tree.query(self.transform(X), k=k or self.k)
+
+    def predict(self, X):
+        _, idx = self.kneighbors(X)
+        votes = np.zeros((len(idx), len(self.classes)), dtype=np.int32)
+        rows = np.repeat(np.arange(len(idx)), idx.shape[1])
+        np.add.at(votes, (rows, self.codes[idx].ravel()), 1)
+        return self.classes[votes.argmax(axis=1)]
+
+    def predict_frame(self, df):
+        """Predicted SHIPTYPE for every row of df; NaN where a feature is missing"""
+        X = df[FEATURES].to_numpy(dtype=np.float64, na_value=np.nan)
+        ok = ~np.isnan(X).any(axis=1)
+        out = np.full(len(df), np.nan)
+        if ok.any():
+            out[ok] = self.predict(X[ok])
+        return pd.Series(out, index=df.index, name='SHIPTYPE_PRED')
+
+    def save(self, path=INDEX_FILE):
+        with open(path, 'wb') as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path=INDEX_FILE):
+        # Unpickling restores the tree's arrays directly, nothing is rebuilt
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+
+def sample_queries(df, n, seed=0):
+    """n query rows resampled from df with a little noise, standing in for a new snapshot"""
+    rng = np.random.default_rng(seed)
+    X = df[FEATURES].dropna().to_numpy(dtype=np.float64)
+    X = X[rng.integers(0, len(X), n)]
+    return X + rng.normal(0, 0.5, X.shape)
+
+
+def compare_exact(index, X):
+    """Latency and recall of the index against an exact sklearn KNN fitted per run.
+
+    The baseline is what module4 does today: fit KNeighborsClassifier on the
+    reference rows, then predict. Recall is the fraction of returned
+    neighbours no farther than the exact k-th neighbour; snapshots repeat
+    vessels, so many neighbours tie and comparing row ids would undercount.
+    """
+    from sklearn.neighbors import KNeighborsClassifier
+
+    start = time.perf_counter()
+    labels = index.predict(X)
+    index_seconds = time.perf_counter() - start
+    dist, _ = index.kneighbors(X)
+
+    reference = index.tree.get_arrays()[0]
+    start = time.perf_counter()
+    exact = KNeighborsClassifier(n_neighbors=index.k, algorithm='brute')
+    exact.fit(reference, index.classes[index.codes])
+    exact_labels = exact.predict(index.transform(X))
+    exact_seconds = time.perf_counter() - start
+    exact_dist, _ = exact.kneighbors(index.transform(X))
+
+    hits = dist <= exact_dist[:, -1:] + 1e-9
+    return {'rows': len(X), 'index_ms': index_seconds * 1000, 'exact_ms': exact_seconds * 1000,
+            'recall': hits.mean(), 'label_agreement': (labels == exact_labels).mean()}
+
+
+if __name__ == '__main__':
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description='Persistent KNN index for SHIPTYPE classification')
+    parser.add_argument('--index', default=INDEX_FILE)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('build', help='index labelled snapshot CSVs')
+    build.add_argument('paths', nargs='*', default=['data1.csv'])
+    build.add_argument('--types', type=int, default=3, help='number of most common SHIPTYPEs to keep')
+    build.add_argument('-k', type=int, default=5)
+    build.add_argument('--tree', choices=list(TREES), default='kd')
+
+    classify = sub.add_parser('classify', help='add SHIPTYPE_PRED to a snapshot CSV')
+    classify.add_argument('path')
+    classify.add_argument('--output', default='classified.csv')
+
+    bench = sub.add_parser('bench', help='latency and recall against exact sklearn KNN')
+    bench.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    bench.add_argument('--queries-from', default='data1.csv')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        paths = [p for path in args.paths for p in sorted(glob.glob(path))]
+        df = pd.concat([pd.read_csv(p) for p in paths], ignore_index=True)
+        start = time.perf_counter()
+        index = ShipTypeIndex.build(df, args.types, k=args.k, kind=args.tree)
+        index.save(args.index)
+        print(f'Indexed {len(index.codes)} vessels from {len(paths)} file(s), '
+              f'classes {index.classes.tolist()}, in {(time.perf_counter() - start) * 1000:.0f} ms')
+        print(f'Saved {args.index}')
+    else:
+        start = time.perf_counter()
+        index = ShipTypeIndex.load(args.index)
+        print(f'Loaded {args.index} ({len(index.codes)} vessels, {index.kind}-tree, k={index.k}) '
+              f'in {(time.perf_counter() - start) * 1000:.1f} ms')
+        if args.command == 'classify':
+            df = pd.read_csv(args.path)
+            start = time.perf_counter()
+            df['SHIPTYPE_PRED'] = index.predict_frame(df)
+            seconds = time.perf_counter() - start
+            df.to_csv(args.output, index=False)
+            print(f'Classified {df["SHIPTYPE_PRED"].notna().sum()} of {len(df)} rows in {seconds * 1000:.0f} ms, '
+                  f'saved {args.output}')
+        else:
+            source = pd.read_csv(args.queries_from)
+            print(f'{"rows":>8s} {"index ms":>10s} {"exact ms":>10s} {"speedup":>8s} {"recall":>8s} {"agree":>8s}')
+            for n in args.sizes:
+                r = compare_exact(index, sample_queries(source, n))
+                print(f"{r['rows']:8d} {r['index_ms']:10.1f} {r['exact_ms']:10.1f} "
+                      f"{r['exact_ms'] / r['index_ms']:7.1f}x {r['recall']:8.4f} {r['label_agreement']:8.4f}")
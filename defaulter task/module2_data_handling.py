@@ -1,40 +1,59 @@
-import pandas as pd
-import numpy as np
 import json
 
-df = pd.read_csv('data1.csv')
+import instrument
 
-print(f'Original shape: {df.shape}')
-print(df.dtypes)
 
-print('\nMissing values:')
-print(df.isnull().sum())
+@instrument.instrumented('clean')
+def clean(df, verbose=True):
+    """Fill ROT, drop incomplete/duplicate rows, zero speeds and the top 1% of speeds"""
+    df = df.copy()
+    df['ROT'] = df['ROT'].fillna(0)
 
-df['ROT'].fillna(0, inplace=True)
+    initial_rows = len(df)
+    df = df.dropna(subset=['LAT', 'LON', 'SPEED'])
+    if verbose:
+        print(f'\nDropped {initial_rows - len(df)} rows with missing critical data')
+        print(f'\nDuplicates: {df.duplicated().sum()}')
+    df = df.drop_duplicates()
 
-initial_rows = len(df)
-df = df.dropna(subset=['LAT', 'LON', 'SPEED'])
-print(f'\nDropped {initial_rows - len(df)} rows with missing critical data')
+    df_filtered = df[df['SPEED'] > 0].copy()
+    if verbose:
+        print(f'Removed {len(df) - len(df_filtered)} zero-speed entries')
 
-print(f'\nDuplicates: {df.duplicated().sum()}')
-df = df.drop_duplicates()
+    q99 = df_filtered['SPEED'].quantile(0.99)
+    df_filtered = df_filtered[df_filtered['SPEED'] <= q99]
+    if verbose:
+        print(f'Filtered speed outliers above {q99:.1f}')
+    return df_filtered
 
-df_filtered = df[df['SPEED'] > 0].copy()
-print(f'Removed {len(df) - len(df_filtered)} zero-speed entries')
 
-q99 = df_filtered['SPEED'].quantile(0.99)
-df_filtered = df_filtered[df_filtered['SPEED'] <= q99]
-print(f'Filtered speed outliers above {q99:.1f}')
+def main(path='data1.csv'):
+    df = instrument.read_csv(path)
 
-print(f'\nFinal shape: {df_filtered.shape}')
+    print(f'Original shape: {df.shape}')
+    print(df.dtypes)
 
-df_filtered.to_csv('cleaned_data.csv', index=False)
-print('Saved to cleaned_data.csv')
+    print('\nMissing values:')
+    print(df.isnull().sum())
 
-data_dict = df_filtered.to_dict(orient='records')
-with open('ship_data.json', 'w') as f:
-    json.dump(data_dict[:100], f, indent=2)
-print('Saved first 100 records to ship_data.json')
+    df_filtered = clean(df)
 
-print('\nCleaned data summary:')
-print(df_filtered.describe())
+    print(f'\nFinal shape: {df_filtered.shape}')
+
+    with instrument.stage('save', rows_in=len(df_filtered)):
+        df_filtered.to_csv('cleaned_data.csv', index=False)
+        instrument.wrote('cleaned_data.csv')
+        print('Saved to cleaned_data.csv')
+
+        data_dict = df_filtered.to_dict(orient='records')
+        with open('ship_data.json', 'w') as f:
+            json.dump(data_dict[:100], f, indent=2)
+        instrument.wrote('ship_data.json')
+    print('Saved first 100 records to ship_data.json')
+
+    print('\nCleaned data summary:')
+    print(df_filtered.describe())
+
+
+if __name__ == '__main__':
+    main()
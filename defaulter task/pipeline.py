@@ -0,0 +1,279 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+
+import pandas as pd
+
+import features
+import instrument
+import module2_data_handling
+import module4_ml
+
+CACHE_DIR = '.stage_cache'
+MAX_CACHE_MB = 1024
+
+# name -> (code the stage depends on, default params, function). Stages run in
+# registration order, each taking the previous stage's output.
+STAGES = {}
+
+
+def stage(name, code=(), **defaults):
+    """Register fn(data, **params) as a pipeline stage.
+
+    `code` lists the helper functions (or whole modules) the stage calls, so
+    editing them changes the stage's cache key just like editing the stage itself.
+    """
+    def register(fn):
+        STAGES[name] = (tuple(code), defaults, fn)
+        return fn
+    return register
+
+
+def code_version(name):
+    code, _, fn = STAGES[name]
+    h = hashlib.sha256()
+    for f in (fn,) + code:
+        h.update(inspect.getsource(f).encode())
+    return h.hexdigest()
+
+
+def stage_key(name, upstream, params):
+    """Cache key: upstream key (or input file hash), stage code and parameters"""
+    h = hashlib.sha256()
+    h.update(upstream.encode())
+    h.update(name.encode())
+    h.update(code_version(name).encode())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class StageCache:
+    """On-disk store of stage outputs with an LRU size bound.
+
+    DataFrames are kept as Parquet, anything else is pickled. index.json keeps
+    size, last use and hit count per entry, plus input file hashes keyed by
+    path/size/mtime so unchanged inputs aren't rehashed.
+    """
+
+    def __init__(self, path=CACHE_DIR, max_mb=MAX_CACHE_MB):
+        self.path = path
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(path, exist_ok=True)
+        self.index_path = os.path.join(path, 'index.json')
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+        else:
+            self.index = {'entries': {}, 'files': {}}
+
+    def save_index(self):
+        with open(self.index_path, 'w') as f:
+            json.dump(self.index, f, indent=2)
+
+    def input_hash(self, path):
+        st = os.stat(path)
+        abspath = os.path.abspath(path)
+        known = self.index['files'].get(abspath)
+        if known and known['size'] == st.st_size and known['mtime'] == st.st_mtime:
+            return known['sha256']
+        digest = file_hash(path)
+        self.index['files'][abspath] = {'size': st.st_size, 'mtime': st.st_mtime, 'sha256': digest}
+        return digest
+
+    def _file(self, key):
+        entry = self.index['entries'][key]
+        return os.path.join(self.path, key + ('.parquet' if entry['format'] == 'parquet' else '.pkl'))
+
+    def contains(self, key):
+        if key not in self.index['entries']:
+            return False
+        if not os.path.exists(self._file(key)):
+            del self.index['entries'][key]
+            return False
+        return True
+
+    def touch(self, key):
+        entry = self.index['entries'][key]
+        entry['last_used'] = time.time()
+        entry['hits'] += 1
+
+    def get(self, key):
+        """Stored value for key, or None on a miss"""
+        if not self.contains(key):
+            return None
+        self.touch(key)
+        path = self._file(key)
+        if self.index['entries'][key]['format'] == 'parquet':
+            return pd.read_parquet(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def put(self, key, stage_name, value, keep=()):
+        """Store value and evict down to max_bytes, never dropping key or `keep`"""
+        fmt = 'parquet' if isinstance(value, pd.DataFrame) else 'pickle'
+        self.index['entries'][key] = {'stage': stage_name, 'format': fmt, 'bytes': 0,
+                                      'created': time.time(), 'last_used': time.time(), 'hits': 0}
+        path = self._file(key)
+        if fmt == 'parquet':
+            value.to_parquet(path, index=False)
+        else:
+            with open(path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.index['entries'][key]['bytes'] = os.path.getsize(path)
+        self.evict(keep={key, *keep})
+
+    def remove(self, key):
+        path = self._file(key)
+        if os.path.exists(path):
+            os.remove(path)
+        del self.index['entries'][key]
+
+    def evict(self, keep=()):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        entries = self.index['entries']
+        total = sum(e['bytes'] for e in entries.values())
+        evicted = []
+        for key in sorted(entries, key=lambda k: entries[k]['last_used']):
+            if total <= self.max_bytes:
+                break
+            if key in keep:
+                continue
+            total -= entries[key]['bytes']
+            evicted.append((key, entries[key]['stage']))
+            self.remove(key)
+        for key, name in evicted:
+            print(f'Evicted {name} {key[:12]} (cache over {self.max_bytes / 1024 / 1024:.1f} MB)')
+        return evicted
+
+    def invalidate(self, stage_name):
+        """Remove every cached output of one stage"""
+        keys = [k for k, e in self.index['entries'].items() if e['stage'] == stage_name]
+        for key in keys:
+            self.remove(key)
+        return len(keys)
+
+    def total_bytes(self):
+        return sum(e['bytes'] for e in self.index['entries'].values())
+
+
+def run(path='data1.csv', params=None, force=(), cache=None, stop=None, verbose=True):
+    """Run the registered stages on one CSV, reusing cached outputs.
+
+    `params` maps stage name -> parameter overrides, `force` names stages to
+    recompute even when cached, `stop` ends the run after that stage. Keys
+    only depend on upstream keys, so hits are decided before any data is
+    read and a hit stage is never loaded unless the next stage needs it.
+    Returns (output of the last stage, report rows).
+    """
+    cache = cache or StageCache()
+    params = params or {}
+    unknown = [s for s in list(params) + list(force) if s not in STAGES]
+    if unknown:
+        raise KeyError(f'Unknown stages: {unknown}')
+
+    names = list(STAGES)
+    if stop is not None:
+        names = names[:names.index(stop) + 1]
+
+    plan = []
+    upstream = cache.input_hash(path)
+    for name in names:
+        stage_params = {**STAGES[name][1], **params.get(name, {})}
+        key = stage_key(name, upstream, stage_params)
+        if name in force:
+            status = 'forced'
+        else:
+            status = 'hit' if cache.contains(key) else 'miss'
+        plan.append((name, key, stage_params, status))
+        upstream = key
+
+    outputs = {}
+    report = []
+    for i, (name, key, stage_params, status) in enumerate(plan):
+        start = time.perf_counter()
+        if status == 'hit':
+            cache.touch(key)
+        else:
+            if i == 0:
+                data = pd.read_csv(path)
+            elif i - 1 in outputs:
+                data = outputs[i - 1]
+            else:
+                data = cache.get(plan[i - 1][1])
+            with instrument.stage(f'pipeline.{name}', rows_in=len(data)) as s:
+                outputs[i] = STAGES[name][2](data, **stage_params)
+                if isinstance(outputs[i], pd.DataFrame):
+                    s.rows_out = len(outputs[i])
+            # The rest of this run's outputs stay, a later hit may still need loading
+            cache.put(key, name, outputs[i], keep={p[1] for p in plan})
+        seconds = time.perf_counter() - start
+        report.append({'stage': name, 'status': status, 'key': key[:12], 'seconds': seconds})
+        if verbose:
+            print(f'{name:10s} {status:6s} {key[:12]}  {seconds * 1000:8.1f} ms')
+
+    last = len(plan) - 1
+    result = outputs[last] if last in outputs else cache.get(plan[last][1])
+    cache.save_index()
+    return result, report
+
+
+@stage('clean', code=[module2_data_handling.clean])
+def clean_stage(df):
+    return module2_data_handling.clean(df, verbose=False)
+
+
+@stage('features', code=[features], names=['HC_DIFF', 'LW_RATIO', 'SPEED_ZSCORE', 'ROT_ABS'])
+def features_stage(df, names):
+    return features.add_features(df.copy(), names)
+
+
+@stage('model', code=[module4_ml.regression_data, module4_ml.classification_data,
+                      module4_ml.fit_regression, module4_ml.fit_classifiers], n_types=3)
+def model_stage(df, n_types):
+    reg = module4_ml.fit_regression(*module4_ml.regression_data(df))
+    classifiers, _ = module4_ml.fit_classifiers(*module4_ml.classification_data(df, n_types))
+    return {'regression': {'r2': reg['r2'], 'mae': reg['mae'], 'model': reg['model']},
+            'classification': {name: {'accuracy': c['accuracy'], 'model': c['model']}
+                               for name, c in classifiers.items()}}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run clean -> features -> model with a stage cache')
+    parser.add_argument('path', nargs='?', default='data1.csv')
+    parser.add_argument('--cache', default=CACHE_DIR)
+    parser.add_argument('--max-mb', type=float, default=MAX_CACHE_MB)
+    parser.add_argument('--force', action='append', default=[], choices=list(STAGES),
+                        help='recompute this stage even if cached (repeatable)')
+    parser.add_argument('--invalidate', action='append', default=[], choices=list(STAGES),
+                        help='delete every cached output of this stage and exit')
+    parser.add_argument('--stop', choices=list(STAGES), help='stop after this stage')
+    args = parser.parse_args()
+
+    cache = StageCache(args.cache, args.max_mb)
+    if args.invalidate:
+        for name in args.invalidate:
+            print(f'Invalidated {cache.invalidate(name)} cached {name} output(s)')
+        cache.save_index()
+    else:
+        start = time.perf_counter()
+        result, report = run(args.path, force=args.force, cache=cache, stop=args.stop)
+        hits = sum(r['status'] == 'hit' for r in report)
+        print(f'\n{hits} hit(s), {len(report) - hits} miss(es) in {time.perf_counter() - start:.2f}s; '
+              f'cache holds {len(cache.index["entries"])} entries, {cache.total_bytes() / 1024 / 1024:.1f} MB')
+        if isinstance(result, dict) and 'classification' in result:
+            print(f"Regression R²={result['regression']['r2']:.4f}, MAE={result['regression']['mae']:.2f}")
+            for name, c in result['classification'].items():
+                print(f"{name}: accuracy {c['accuracy']:.4f}")
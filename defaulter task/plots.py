@@ -0,0 +1,133 @@
+import numpy as np
+
+from render import scatter
+
+# Figure functions for module3_eda and module3_feature_engineering.
+# Each takes the columns it needs and an output path, so render.render_all
+# can run them in separate processes. matplotlib and seaborn are imported
+# inside them, so a run whose figures are all cached never loads either.
+
+
+def eda_histograms(df, output):
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(1, 3, figsize=(15, 4))
+
+    df['SPEED'].hist(bins=50, ax=axes[0], edgecolor='black')
+    axes[0].set_title('Speed Distribution')
+    axes[0].set_xlabel('Speed (knots)')
+    axes[0].grid(alpha=0.3)
+
+    df['LENGTH'].hist(bins=50, ax=axes[1], edgecolor='black')
+    axes[1].set_title('Ship Length Distribution')
+    axes[1].set_xlabel('Length (m)')
+    axes[1].grid(alpha=0.3)
+
+    df['WIDTH'].hist(bins=30, ax=axes[2], edgecolor='black')
+    axes[2].set_title('Ship Width Distribution')
+    axes[2].set_xlabel('Width (m)')
+    axes[2].grid(alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(output, dpi=100)
+    plt.close(fig)
+
+
+def eda_boxplots(df, output):
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(1, 3, figsize=(15, 5))
+
+    axes[0].boxplot(df['SPEED'].dropna(), vert=True)
+    axes[0].set_ylabel('Speed (knots)')
+    axes[0].set_title('Speed Boxplot')
+    axes[0].grid(alpha=0.3)
+
+    axes[1].boxplot(df['LENGTH'].dropna(), vert=True)
+    axes[1].set_ylabel('Length (m)')
+    axes[1].set_title('Length Boxplot')
+    axes[1].grid(alpha=0.3)
+
+    axes[2].boxplot(df['WIDTH'].dropna(), vert=True)
+    axes[2].set_ylabel('Width (m)')
+    axes[2].set_title('Width Boxplot')
+    axes[2].grid(alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(output, dpi=100)
+    plt.close(fig)
+
+
+def correlation_heatmap(df, output, title='Correlation Heatmap'):
+    heatmap(df.corr(), output, title)
+
+
+def heatmap(corr, output, title='Correlation Heatmap'):
+    """Draw an already computed correlation matrix"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    fig = plt.figure(figsize=(10, 8))
+    sns.heatmap(corr, annot=True, fmt='.2f', cmap='coolwarm', center=0)
+    plt.title(title)
+    plt.tight_layout()
+    plt.savefig(output, dpi=100)
+    plt.close(fig)
+
+
+def length_width_scatter(df, output):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 6))
+    scatter_df = df.dropna(subset=['LENGTH', 'WIDTH', 'SPEED'])
+    points = scatter(ax, scatter_df['LENGTH'], scatter_df['WIDTH'], scatter_df['SPEED'],
+                     cmap='viridis', alpha=0.5, s=10)
+    plt.colorbar(points, label='Speed (knots)')
+    plt.xlabel('Length (m)')
+    plt.ylabel('Width (m)')
+    plt.title('Ship Dimensions vs Speed')
+    plt.grid(alpha=0.3)
+    plt.savefig(output, dpi=100)
+    plt.close(fig)
+
+
+def engineered_features(df, output):
+    import matplotlib.pyplot as plt
+    fig, axes = plt.subplots(2, 2, figsize=(12, 10))
+    # WIDTH == 0 gives an infinite ratio, which hist() cannot bin
+    df = df.replace([np.inf, -np.inf], np.nan)
+
+    df['HC_DIFF'].hist(bins=50, ax=axes[0, 0], edgecolor='black')
+    axes[0, 0].set_title('Heading-Course Difference')
+    axes[0, 0].set_xlabel('Degrees')
+    axes[0, 0].grid(alpha=0.3)
+
+    df['LW_RATIO'].hist(bins=50, ax=axes[0, 1], edgecolor='black')
+    axes[0, 1].set_title('Length/Width Ratio')
+    axes[0, 1].set_xlabel('Ratio')
+    axes[0, 1].grid(alpha=0.3)
+
+    df['SPEED_ZSCORE'].hist(bins=50, ax=axes[1, 0], edgecolor='black')
+    axes[1, 0].set_title('Speed Z-Score')
+    axes[1, 0].set_xlabel('Z-Score')
+    axes[1, 0].grid(alpha=0.3)
+
+    df['ROT_ABS'].hist(bins=50, ax=axes[1, 1], edgecolor='black')
+    axes[1, 1].set_title('Absolute Rate of Turn')
+    axes[1, 1].set_xlabel('deg/min')
+    axes[1, 1].grid(alpha=0.3)
+
+    plt.tight_layout()
+    plt.savefig(output, dpi=100)
+    plt.close(fig)
+
+
+def geographic_speed(df, output):
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(12, 8))
+    geo_df = df.dropna(subset=['LON', 'LAT', 'SPEED'])
+    points = scatter(ax, geo_df['LON'], geo_df['LAT'], geo_df['SPEED'],
+                     cmap='plasma', alpha=0.6, s=5)
+    plt.colorbar(points, label='Speed (knots)')
+    plt.xlabel('Longitude')
+    plt.ylabel('Latitude')
+    plt.title('Geographic Distribution with Speed')
+    plt.grid(alpha=0.3)
+    plt.savefig(output, dpi=100)
+    plt.close(fig)
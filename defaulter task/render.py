@@ -0,0 +1,129 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import instrument
+
+CACHE_FILE = '.figure_cache.json'
+
+# Scatters with more points than this are drawn as binned images instead of markers
+MAX_SCATTER_POINTS = 50_000
+
+
+def figure(fn, output, columns, **params):
+    """Describe one figure: fn(df, output, **params) draws df[columns] into output"""
+    return {'fn': fn, 'output': output, 'columns': list(columns), 'params': params}
+
+
+def cache_key(df, spec):
+    """Hash of the figure's input columns, its parameters and its plotting code.
+
+    The plotting code is the whole module defining fn plus scatter() here, so
+    a change to a helper the figure calls also redraws it.
+    """
+    h = hashlib.sha256()
+    h.update(spec['fn'].__module__.encode() + b'.' + spec['fn'].__name__.encode())
+    h.update(inspect.getsource(inspect.getmodule(spec['fn'])).encode())
+    h.update(inspect.getsource(scatter).encode())
+    h.update(json.dumps(spec['params'], sort_keys=True, default=str).encode())
+    h.update(json.dumps(spec['columns']).encode())
+    h.update(pd.util.hash_pandas_object(df[spec['columns']], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _draw(fn, data, output, params):
+    start = time.perf_counter()
+    fn(data, output, **params)
+    return time.perf_counter() - start
+
+
+def render_all(df, specs, workers=None, cache_path=CACHE_FILE, force=False):
+    """Render figures in a process pool, skipping those whose inputs are unchanged.
+
+    Each worker receives only the columns its figure uses. Returns
+    {output: 'cached' | seconds | exception}.
+    """
+    with instrument.stage('render', rows_in=len(df), figures=len(specs)) as s:
+        results = _render_all(df, specs, workers, cache_path, force)
+        s.add(bytes_written=sum(os.path.getsize(o) for o, r in results.items() if isinstance(r, float)))
+    return results
+
+
+def _render_all(df, specs, workers, cache_path, force):
+    cache = {}
+    if os.path.exists(cache_path) and not force:
+        with open(cache_path) as f:
+            cache = json.load(f)
+
+    results = {}
+    todo = []
+    for spec in specs:
+        key = cache_key(df, spec)
+        if cache.get(spec['output']) == key and os.path.exists(spec['output']):
+            results[spec['output']] = 'cached'
+            print(f"Unchanged {spec['output']} (cached)")
+        else:
+            todo.append((spec, key))
+
+    if todo:
+        workers = workers or min(len(todo), os.cpu_count() or 1)
+        if workers == 1:
+            _init_worker()
+            outcomes = []
+            for spec, key in todo:
+                try:
+                    outcomes.append(_draw(spec['fn'], df[spec['columns']], spec['output'], spec['params']))
+                except Exception as e:
+                    outcomes.append(e)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                futures = [pool.submit(_draw, spec['fn'], df[spec['columns']], spec['output'], spec['params'])
+                           for spec, key in todo]
+                outcomes = []
+                for future in futures:
+                    try:
+                        outcomes.append(future.result())
+                    except Exception as e:
+                        outcomes.append(e)
+
+        for (spec, key), outcome in zip(todo, outcomes):
+            results[spec['output']] = outcome
+            if isinstance(outcome, Exception):
+                cache.pop(spec['output'], None)
+                print(f"Failed {spec['output']}: {type(outcome).__name__}: {outcome}")
+            else:
+                cache[spec['output']] = key
+                print(f"Saved {spec['output']} ({outcome:.2f}s)")
+
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f, indent=2)
+    return results
+
+
+def scatter(ax, x, y, c, cmap, max_points=MAX_SCATTER_POINTS, bins=(480, 320), **kwargs):
+    """Scatter x/y coloured by c, or for large inputs an image of mean c per bin.
+
+    Returns the mappable for plt.colorbar either way.
+    """
+    x, y, c = (np.asarray(v, dtype=np.float64) for v in (x, y, c))
+    if len(x) <= max_points:
+        return ax.scatter(x, y, c=c, cmap=cmap, **kwargs)
+
+    vmin, vmax = kwargs.get('vmin'), kwargs.get('vmax')
+    counts, xedges, yedges = np.histogram2d(x, y, bins=bins)
+    sums, _, _ = np.histogram2d(x, y, bins=[xedges, yedges], weights=c)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(counts > 0, sums / counts, np.nan)
+    return ax.imshow(mean.T, origin='lower', aspect='auto', cmap=cmap, vmin=vmin, vmax=vmax,
+                     extent=[xedges[0], xedges[-1], yedges[0], yedges[-1]], interpolation='nearest')
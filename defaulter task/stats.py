@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+import instrument
+
+STATS_DIR = '.stats'
+SKETCH_CAPACITY = 65_536
+
+
+class QuantileSketch:
+    """Mergeable value -> count histogram for medians and other quantiles.
+
+    Exact while a column has at most `capacity` distinct values, which the
+    integer AIS fields (SPEED, LENGTH, WIDTH, ...) never exceed. Past that,
+    neighbouring values are pooled into `capacity` buckets of equal weight,
+    so quantiles are off by at most about 1/capacity in rank.
+    """
+
+    def __init__(self, values=None, counts=None, capacity=SKETCH_CAPACITY, exact=True):
+        self.values = np.empty(0) if values is None else np.asarray(values, dtype=np.float64)
+        self.counts = np.empty(0, dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        self.capacity = capacity
+        self.exact = exact
+
+    @classmethod
+    def of(cls, data, capacity=SKETCH_CAPACITY):
+        data = data[~np.isnan(data)]
+        values, counts = np.unique(data, return_counts=True)
+        return cls(values, counts, capacity)._compress()
+
+    def merge(self, other):
+        values, inverse = np.unique(np.concatenate([self.values, other.values]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, other.counts])).astype(np.int64)
+        return QuantileSketch(values, counts, self.capacity, self.exact and other.exact)._compress()
+
+    def _compress(self):
+        if len(self.values) <= self.capacity:
+            return self
+        cum = np.cumsum(self.counts)
+        bucket = np.minimum((cum - 1) * self.capacity // cum[-1], self.capacity - 1)
+        counts = np.bincount(bucket, weights=self.counts)
+        sums = np.bincount(bucket, weights=self.values * self.counts)
+        keep = counts > 0
+        return QuantileSketch(sums[keep] / counts[keep], counts[keep].astype(np.int64), self.capacity, False)
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def quantile(self, q):
+        """Linear interpolation between order statistics, as pandas/numpy do by default"""
+        if self.n == 0:
+            return np.nan
+        h = (self.n - 1) * q
+        lower = int(np.floor(h))
+        cum = np.cumsum(self.counts)
+        lo, hi = np.searchsorted(cum, [lower + 1, min(lower + 2, self.n)])
+        return self.values[lo] + (h - lower) * (self.values[hi] - self.values[lo])
+
+
+class Moments:
+    """Mergeable pairwise moments over k columns, NaNs skipped pairwise like DataFrame.corr.
+
+    For every column pair (i, j) it keeps, over the rows where both are
+    present: the count n[i, j], the mean of column i mean[i, j], its sum of
+    squared deviations m2[i, j] and the co-moment c[i, j]. The diagonal holds
+    each column's own count, mean and M2. Partials combine with Chan et al.'s
+    parallel update, so merging chunk or file results is exact up to
+    rounding, in any order.
+    """
+
+    def __init__(self, columns, n=None, mean=None, m2=None, c=None, minimum=None, maximum=None,
+                 rows=0, sketches=None):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros((k, k)) if n is None else n
+        self.mean = np.zeros((k, k)) if mean is None else mean
+        self.m2 = np.zeros((k, k)) if m2 is None else m2
+        self.c = np.zeros((k, k)) if c is None else c
+        self.minimum = np.full(k, np.nan) if minimum is None else minimum
+        self.maximum = np.full(k, np.nan) if maximum is None else maximum
+        self.rows = rows
+        self.sketches = sketches if sketches is not None else [QuantileSketch() for _ in self.columns]
+
+    @classmethod
+    def of(cls, df, columns):
+        """Partial aggregates for one frame"""
+        x = np.column_stack([pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                             for c in columns]) if len(df) else np.empty((0, len(columns)))
+        valid = ~np.isnan(x)
+        v = valid.astype(np.float64)
+        n = v.T @ v
+        # Shift by the chunk's column means before summing squares, so the
+        # one-pass sums don't lose precision to cancellation
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shift = np.nan_to_num(np.nansum(x, axis=0) / valid.sum(axis=0)) if len(x) else np.zeros(len(columns))
+        x0 = np.where(valid, x - shift, 0.0)
+        s = x0.T @ v
+        q = (x0 * x0).T @ v
+        p = x0.T @ x0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_shifted = np.where(n > 0, s / n, 0.0)
+        m2 = q - s * mean_shifted
+        c = p - s * mean_shifted.T
+        mean = np.where(n > 0, mean_shifted + shift[:, None], 0.0)
+        any_valid = valid.any(axis=0)
+        minimum = np.where(any_valid, np.nanmin(np.where(valid, x, np.inf), axis=0) if len(x) else np.nan, np.nan)
+        maximum = np.where(any_valid, np.nanmax(np.where(valid, x, -np.inf), axis=0) if len(x) else np.nan, np.nan)
+        sketches = [QuantileSketch.of(x[:, i]) for i in range(len(columns))]
+        return cls(columns, n, mean, m2, c, minimum, maximum, len(df), sketches)
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError(f'Cannot merge statistics over {other.columns} into {self.columns}')
+        n = self.n + other.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, self.n * other.n / n, 0.0)
+            delta = other.mean - self.mean
+            mean = np.where(n > 0, self.mean + delta * np.where(n > 0, other.n / n, 0.0), 0.0)
+        m2 = self.m2 + other.m2 + delta * delta * weight
+        c = self.c + other.c + delta * delta.T * weight
+        return Moments(self.columns, n, mean, m2, c, np.fmin(self.minimum, other.minimum),
+                       np.fmax(self.maximum, other.maximum), self.rows + other.rows,
+                       [a.merge(b) for a, b in zip(self.sketches, other.sketches)])
+
+    def nan_counts(self):
+        return {col: self.rows - int(self.n[i, i]) for i, col in enumerate(self.columns)}
+
+    def summary(self, columns=None):
+        """{column: {statistic: value}} with the keys module3_eda.summary_stats uses"""
+        out = {}
+        for col in columns or self.columns:
+            i = self.columns.index(col)
+            n = self.n[i, i]
+            var = self.m2[i, i] / (n - 1) if n > 1 else np.nan
+            out[col] = {'Mean': self.mean[i, i] if n else np.nan, 'Median': self.sketches[i].quantile(0.5),
+                        'Std Dev': np.sqrt(var), 'Variance': var,
+                        'Min': self.minimum[i], 'Max': self.maximum[i]}
+        return out
+
+    def corr(self, columns=None):
+        """Pearson correlation matrix over pairwise-complete rows, like DataFrame.corr()"""
+        idx = [self.columns.index(c) for c in columns or self.columns]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            r = self.c / np.sqrt(self.m2 * self.m2.T)
+        r = np.where(self.n > 1, np.clip(r, -1.0, 1.0), np.nan)
+        names = [self.columns[i] for i in idx]
+        return pd.DataFrame(r[np.ix_(idx, idx)], index=names, columns=names)
+
+    def save(self, path):
+        arrays = {'n': self.n, 'mean': self.mean, 'm2': self.m2, 'c': self.c,
+                  'minimum': self.minimum, 'maximum': self.maximum}
+        for i, sketch in enumerate(self.sketches):
+            arrays[f'sketch_values_{i}'] = sketch.values
+            arrays[f'sketch_counts_{i}'] = sketch.counts
+        meta = {'columns': self.columns, 'rows': self.rows,
+                'exact': [s.exact for s in self.sketches], 'capacity': [s.capacity for s in self.sketches]}
+        tmp = path + '.tmp.npz'
+        np.savez(tmp, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as f:
+            meta = json.loads(str(f['meta']))
+            sketches = [QuantileSketch(f[f'sketch_values_{i}'], f[f'sketch_counts_{i}'], capacity, exact)
+                        for i, (exact, capacity) in enumerate(zip(meta['exact'], meta['capacity']))]
+            return cls(meta['columns'], f['n'], f['mean'], f['m2'], f['c'], f['minimum'], f['maximum'],
+                       meta['rows'], sketches)
+
+
+def of_csv(path, columns, chunksize=500_000):
+    """Statistics of one CSV, read chunk by chunk"""
+    total = Moments(columns)
+    for chunk in pd.read_csv(path, usecols=lambda c: c in columns, chunksize=chunksize):
+        total = total.merge(Moments.of(chunk.reindex(columns=columns), columns))
+    return total
+
+
+class StatsStore:
+    """Per-snapshot statistics on disk, keyed by file content and column list.
+
+    Only snapshots without a stored result are read, so adding one file to
+    data/ costs one file's pass.
+    """
+
+    def __init__(self, path=STATS_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, snapshot, columns):
+        # Hashed here rather than with pipeline.file_hash, which would pull in sklearn
+        h = hashlib.sha256(json.dumps(columns).encode())
+        with open(snapshot, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        return os.path.join(self.path, h.hexdigest()[:32] + '.npz')
+
+    def get(self, snapshot, columns, chunksize=500_000):
+        cached = self._file(snapshot, columns)
+        if os.path.exists(cached):
+            return Moments.load(cached), True
+        with instrument.stage('stats', path=snapshot) as s:
+            moments = of_csv(snapshot, columns, chunksize)
+            s.rows_out = moments.rows
+            s.bytes_read = os.path.getsize(snapshot)
+        moments.save(cached)
+        return moments, False
+
+    def combined(self, snapshots, columns, chunksize=500_000, verbose=True):
+        total = Moments(columns)
+        for snapshot in snapshots:
+            moments, hit = self.get(snapshot, columns, chunksize)
+            if verbose:
+                print(f"{'Cached' if hit else 'Computed'} {snapshot}: {moments.rows} rows")
+            total = total.merge(moments)
+        return total
+
+
+def main(paths, store=STATS_DIR, chunksize=500_000, heatmap=None, check=False):
+    import module3_eda
+
+    paths = [p for p in paths if not os.path.basename(p).startswith('cleaned')]
+    columns = list(dict.fromkeys(module3_eda.CORR_COLS + module3_eda.SUMMARY_COLS))
+
+    start = time.perf_counter()
+    moments = StatsStore(store).combined(paths, columns, chunksize)
+    print(f'{len(paths)} snapshots, {moments.rows} rows in {time.perf_counter() - start:.2f}s')
+    print('\nMissing values:')
+    for col, n in moments.nan_counts().items():
+        print(f'  {col}: {n}')
+
+    print('\n=== Summary Statistics ===')
+    stats = moments.summary(module3_eda.SUMMARY_COLS)
+    module3_eda.print_summary(stats)
+    corr = moments.corr(module3_eda.CORR_COLS)
+    print('\nCorrelation matrix:')
+    print(corr.round(2))
+
+    if heatmap:
+        import plots
+        plots.heatmap(corr, heatmap, title='Correlation Heatmap')
+        print(f'Saved {heatmap}')
+
+    if check:
+        df = pd.concat([pd.read_csv(p, usecols=lambda c: c in columns) for p in paths], ignore_index=True)
+        expected = module3_eda.summary_stats(df)
+        worst = max(abs(stats[c][k] - v) / max(abs(v), 1.0) for c, s in expected.items() for k, v in s.items())
+        corr_error = np.nanmax(np.abs(corr.to_numpy() - df[module3_eda.CORR_COLS].corr().to_numpy()))
+        print(f'\nAgainst pandas on the concatenation: worst relative summary error {worst:.1e}, '
+              f'worst correlation error {corr_error:.1e}')
+    return moments
+
+
+if __name__ == '__main__':
+    import argparse
+    import glob
+
+    parser = argparse.ArgumentParser(description='Summary statistics and correlations across many snapshots')
+    parser.add_argument('paths', nargs='*', default=['data/*.csv'], help='CSV files or globs')
+    parser.add_argument('--store', default=STATS_DIR)
+    parser.add_argument('--chunksize', type=int, default=500_000)
+    parser.add_argument('--heatmap', help='draw the combined correlation heatmap here')
+    parser.add_argument('--check', action='store_true',
+                        help='also load everything with pandas and compare (slow, for validation)')
+    args = parser.parse_args()
+    main([p for pattern in args.paths for p in sorted(glob.glob(pattern))],
+         args.store, args.chunksize, args.heatmap, args.check)
@@ -0,0 +1,186 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.metrics import accuracy_score, f1_score, mean_absolute_error, r2_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from sklearn.neighbors import KNeighborsClassifier, KNeighborsRegressor
+from sklearn.tree import DecisionTreeClassifier, DecisionTreeRegressor
+
+import module4_ml
+
+# task -> model name -> (estimator class, fixed kwargs, hyperparameter grid)
+GRID = {
+    'classification': {
+        'Logistic Regression': (LogisticRegression, {'max_iter': 1000}, {'C': [0.1, 1.0, 10.0]}),
+        'Decision Tree': (DecisionTreeClassifier, {'random_state': 42}, {'max_depth': [5, 10, 20, None]}),
+        'KNN': (KNeighborsClassifier, {}, {'n_neighbors': [3, 5, 11, 21]}),
+    },
+    'regression': {
+        'Linear Regression': (LinearRegression, {}, {}),
+        'Decision Tree': (DecisionTreeRegressor, {'random_state': 42}, {'max_depth': [5, 10, 20]}),
+        'KNN': (KNeighborsRegressor, {}, {'n_neighbors': [5, 11, 21]}),
+    },
+}
+
+# The first metric of each task ranks the leaderboard (higher is better)
+METRICS = {
+    'classification': ['accuracy', 'f1_macro'],
+    'regression': ['r2', 'mae'],
+}
+
+_shared = {}
+
+
+def expand(task):
+    """Every (model name, params) combination in the task's grid"""
+    configs = []
+    for name, (_, _, grid) in GRID[task].items():
+        keys = sorted(grid)
+        for values in product(*(grid[k] for k in keys)):
+            configs.append((name, dict(zip(keys, values))))
+    return configs
+
+
+def task_data(df, task):
+    """The same X, y module4_ml builds for each task, as float64 arrays"""
+    if task == 'classification':
+        X, y = module4_ml.classification_data(df)
+    else:
+        X, y = module4_ml.regression_data(df)
+    return X.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64)
+
+
+def splits(task, y, folds, seed=42):
+    if task == 'classification':
+        return list(StratifiedKFold(folds, shuffle=True, random_state=seed).split(np.zeros(len(y)), y))
+    # SPEED is continuous, so regression folds are plain shuffled k-fold
+    return list(KFold(folds, shuffle=True, random_state=seed).split(y))
+
+
+def share(arrays):
+    """Copy arrays into shared memory blocks; returns (blocks, specs workers can attach to)"""
+    blocks, specs = [], {}
+    for name, arr in arrays.items():
+        block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, arr.dtype, buffer=block.buf)[...] = arr
+        blocks.append(block)
+        specs[name] = (block.name, arr.shape, arr.dtype.str)
+    return blocks, specs
+
+
+def _attach(specs):
+    from threadpoolctl import threadpool_limits
+    # One BLAS thread per process, the pool already uses every core
+    threadpool_limits(1)
+    for name, (block_name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared[name] = (block, np.ndarray(shape, np.dtype(dtype), buffer=block.buf))
+
+
+def _fit(task, model, params, fold, train, test):
+    X, y = _shared['X'][1], _shared['y'][1]
+    cls, fixed, _ = GRID[task][model]
+    estimator = cls(**fixed, **params)
+
+    start = time.perf_counter()
+    estimator.fit(X[train], y[train])
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    pred = estimator.predict(X[test])
+    predict_seconds = time.perf_counter() - start
+
+    if task == 'classification':
+        scores = {'accuracy': accuracy_score(y[test], pred),
+                  'f1_macro': f1_score(y[test], pred, average='macro')}
+    else:
+        scores = {'r2': r2_score(y[test], pred), 'mae': mean_absolute_error(y[test], pred)}
+    return {'task': task, 'model': model, 'params': params, 'fold': fold,
+            'fit_s': fit_seconds, 'predict_s': predict_seconds, **scores}
+
+
+def _params_label(params):
+    return ', '.join(f'{k}={v}' for k, v in params.items()) or '-'
+
+
+def leaderboard(fits, task):
+    """Mean/std of each metric per (model, params), best first"""
+    metrics = METRICS[task]
+    rows = pd.DataFrame([f for f in fits if f['task'] == task])
+    rows['params'] = rows['params'].map(_params_label)
+    columns = {f'{metrics[0]}_mean': (metrics[0], 'mean'), f'{metrics[0]}_std': (metrics[0], 'std')}
+    columns.update({f'{m}_mean': (m, 'mean') for m in metrics[1:]})
+    board = rows.groupby(['model', 'params']).agg(
+        **columns, folds=('fold', 'count'), fit_s=('fit_s', 'mean'), predict_s=('predict_s', 'mean'),
+    )
+    return board.sort_values(f'{metrics[0]}_mean', ascending=False).reset_index()
+
+
+def sweep(df, tasks=('classification', 'regression'), folds=5, workers=None, verbose=True):
+    """Cross-validate every grid config for each task across a process pool.
+
+    X and y are placed in shared memory once per task; workers receive only
+    the fold indices. A line is printed as each config's last fold finishes.
+    Returns {task: leaderboard DataFrame} and the list of per-fold results.
+    """
+    workers = workers or os.cpu_count() or 1
+    boards, fits = {}, []
+    for task in tasks:
+        X, y = task_data(df, task)
+        folds_idx = splits(task, y, folds)
+        configs = expand(task)
+        metric = METRICS[task][0]
+        if verbose:
+            print(f'\n=== {task}: {len(configs)} configs x {folds} folds on {len(y)} rows, {workers} workers ===')
+
+        blocks, specs = share({'X': X, 'y': y})
+        start = time.perf_counter()
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(specs,)) as pool:
+                futures = [pool.submit(_fit, task, model, params, fold, train, test)
+                           for model, params in configs
+                           for fold, (train, test) in enumerate(folds_idx)]
+                pending = {}
+                for future in as_completed(futures):
+                    result = future.result()
+                    fits.append(result)
+                    key = (result['model'], _params_label(result['params']))
+                    pending.setdefault(key, []).append(result)
+                    if verbose and len(pending[key]) == folds:
+                        scores = [r[metric] for r in pending[key]]
+                        fit_total = sum(r['fit_s'] for r in pending[key])
+                        print(f'{time.perf_counter() - start:7.2f}s  {key[0]:20s} {key[1]:18s} '
+                              f'{metric} {np.mean(scores):.4f} ± {np.std(scores, ddof=1):.4f}  '
+                              f'fit {fit_total / folds * 1000:7.1f} ms/fold')
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        boards[task] = leaderboard(fits, task)
+        if verbose:
+            print(f'\n{task} leaderboard ({time.perf_counter() - start:.2f}s wall):')
+            print(boards[task].to_string(index=False, float_format=lambda v: f'{v:.4f}'))
+    return boards, fits
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Cross-validated model sweep over the module4 tasks')
+    parser.add_argument('path', nargs='?', default='data1.csv')
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--task', choices=list(GRID), action='append')
+    parser.add_argument('--output', help='write every per-fold result to this CSV')
+    args = parser.parse_args()
+
+    boards, fits = sweep(pd.read_csv(args.path), args.task or list(GRID), args.folds, args.workers)
+    if args.output:
+        pd.DataFrame(fits).assign(params=lambda d: d['params'].map(_params_label)).to_csv(args.output, index=False)
+        print(f'\nSaved {len(fits)} fold results to {args.output}')
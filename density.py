@@ -0,0 +1,204 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import tiles
+
+PYRAMID_DIR = "pyramid"
+MAX_ZOOM = 10
+
+# SHIPTYPE is a single digit (0-9); one histogram bin each, missing types go to "other"
+SHIPTYPES = list(range(10))
+TYPE_COLUMNS = [f"TYPE_{t}" for t in SHIPTYPES] + ["TYPE_OTHER"]
+SUM_COLUMNS = ["COUNT", "SPEED_SUM", "SPEED_N"] + TYPE_COLUMNS
+
+
+def aggregate(df, zoom=MAX_ZOOM):
+    """Bucket positions into the z/X/Y tiles of one zoom level.
+
+    Returns one row per occupied tile with COUNT, SPEED_SUM/SPEED_N (for the
+    mean, skipping missing speeds) and a SHIPTYPE histogram.
+    """
+    df = df.dropna(subset=["LAT", "LON"])
+    x, y = tiles.tile_xy(df["LAT"].to_numpy(), df["LON"].to_numpy(), zoom)
+    speed = pd.to_numeric(df["SPEED"], errors="coerce").to_numpy(dtype=np.float64)
+    shiptype = pd.to_numeric(df["SHIPTYPE"], errors="coerce").to_numpy(dtype=np.float64)
+
+    cells = pd.DataFrame({"X": x, "Y": y, "COUNT": 1,
+                          "SPEED_SUM": np.nan_to_num(speed), "SPEED_N": ~np.isnan(speed)})
+    for t, col in zip(SHIPTYPES, TYPE_COLUMNS):
+        cells[col] = shiptype == t
+    cells["TYPE_OTHER"] = ~np.isin(shiptype, SHIPTYPES)
+    return cells.groupby(["X", "Y"], as_index=False)[SUM_COLUMNS].sum()
+
+
+def roll_up(cells):
+    """Aggregate one level's cells into their parent tiles; every column is a sum, so this is exact"""
+    parent = cells.assign(X=cells["X"] // 2, Y=cells["Y"] // 2)
+    return parent.groupby(["X", "Y"], as_index=False)[SUM_COLUMNS].sum()
+
+
+def build_levels(df, max_zoom=MAX_ZOOM):
+    """All levels 0..max_zoom for a snapshot, computed from the finest level only"""
+    levels = {max_zoom: aggregate(df, max_zoom)}
+    for z in range(max_zoom - 1, -1, -1):
+        levels[z] = roll_up(levels[z + 1])
+    return levels
+
+
+def merge(a, b):
+    return pd.concat([a, b]).groupby(["X", "Y"], as_index=False)[SUM_COLUMNS].sum()
+
+
+class Pyramid:
+    """Persisted density pyramid, one Parquet file of occupied cells per zoom level.
+
+    Each add() writes a new generation of level files and then switches to it
+    by atomically replacing manifest.json, so a crash at any point leaves
+    either the old pyramid or the new one, never a snapshot counted in some
+    levels but not recorded in the manifest.
+    """
+
+    def __init__(self, path=PYRAMID_DIR, max_zoom=MAX_ZOOM):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.manifest_path = os.path.join(path, "manifest.json")
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {"max_zoom": max_zoom, "sources": []}
+        self.max_zoom = self.manifest["max_zoom"]
+
+    def _level_path(self, z, generation=None):
+        generation = self.manifest.get("generation") if generation is None else generation
+        # Pyramids written before generations were introduced keep their plain file names
+        name = f"z{z:02d}.parquet" if generation is None else f"z{z:02d}.g{generation:06d}.parquet"
+        return os.path.join(self.path, name)
+
+    def add(self, df, source):
+        """Fold one snapshot into every level; returns False if it was already added"""
+        if source in self.manifest["sources"]:
+            print(f"Skipping {source}: already in the pyramid")
+            return False
+        old = self.manifest.get("generation")
+        new = 0 if old is None else old + 1
+        for z, cells in build_levels(df, self.max_zoom).items():
+            path = self._level_path(z)
+            if os.path.exists(path):
+                cells = merge(pd.read_parquet(path), cells)
+            cells.to_parquet(self._level_path(z, new), index=False)
+
+        manifest = {**self.manifest, "generation": new, "sources": self.manifest["sources"] + [source]}
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+        previous = [self._level_path(z) for z in range(self.max_zoom + 1)]
+        self.manifest = manifest
+        for path in previous:
+            if os.path.exists(path):
+                os.remove(path)
+        return True
+
+    def level(self, z, bbox=None):
+        """Cells of zoom z, optionally only those inside (lat_min, lat_max, lon_min, lon_max).
+
+        A box with lon_min > lon_max crosses the antimeridian and covers
+        lon_min..180 plus -180..lon_max.
+        """
+        cells = pd.read_parquet(self._level_path(z))
+        if bbox is not None:
+            lat_min, lat_max, lon_min, lon_max = bbox
+            x0, y1 = tiles.tile_xy(lat_min, lon_min, z)
+            x1, y0 = tiles.tile_xy(lat_max, lon_max, z)
+            # tile_xy wraps 180 into the first column; as a right edge it means the last one
+            if lon_max - lon_min >= 360:
+                x0, x1 = 0, tiles.side(z) - 1
+            elif lon_max >= 180:
+                x1 = tiles.side(z) - 1
+            in_y = cells["Y"].between(int(y0), int(y1))
+            if lon_min > lon_max:
+                in_x = (cells["X"] >= int(x0)) | (cells["X"] <= int(x1))
+            else:
+                in_x = cells["X"].between(int(x0), int(x1))
+            cells = cells[in_x & in_y]
+        cells = cells.copy()
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cells["MEAN_SPEED"] = cells["SPEED_SUM"] / cells["SPEED_N"]
+        return cells
+
+    def grid(self, z, value="COUNT"):
+        """Dense side x side array of one cell value (rows are Y, north first)"""
+        cells = self.level(z)
+        n = tiles.side(z)
+        out = np.zeros((n, n)) if value == "COUNT" else np.full((n, n), np.nan)
+        out[cells["Y"].to_numpy(), cells["X"].to_numpy()] = cells[value].to_numpy()
+        return out
+
+    def render(self, z, output, value="COUNT"):
+        """Write a heatmap of zoom level z from the stored cells"""
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from matplotlib.colors import LogNorm
+
+        data = self.grid(z, value)
+        plt.figure(figsize=(12, 8))
+        if value == "COUNT":
+            image = plt.imshow(np.where(data > 0, data, np.nan), cmap="viridis",
+                               norm=LogNorm(), interpolation="nearest")
+            label = "Vessels per cell"
+        else:
+            image = plt.imshow(data, cmap="plasma", interpolation="nearest")
+            label = value
+        plt.colorbar(image, label=label)
+        plt.title(f"Vessel Density (zoom {z}, {tiles.side(z)}x{tiles.side(z)} cells)")
+        plt.axis("off")
+        plt.savefig(output, dpi=100, bbox_inches="tight")
+        plt.close()
+        print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import time
+
+    parser = argparse.ArgumentParser(description="Multi-resolution vessel density pyramid")
+    parser.add_argument("--pyramid", default=PYRAMID_DIR)
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    add = sub.add_parser("add", help="fold snapshot CSVs into the pyramid")
+    add.add_argument("paths", nargs="*", default=sorted(glob.glob("data/*.csv")))
+    add.add_argument("--align", type=float, metavar="STALE_MINUTES",
+                     help="dead-reckon positions to capture time first, dropping reports older than this")
+
+    render = sub.add_parser("render", help="draw one zoom level")
+    render.add_argument("--zoom", type=int, default=6)
+    render.add_argument("--value", default="COUNT", help="COUNT or MEAN_SPEED")
+    render.add_argument("--output", default="density.png")
+    args = parser.parse_args()
+
+    pyramid = Pyramid(args.pyramid, args.max_zoom)
+    if args.command == "add":
+        for path in args.paths:
+            if os.path.basename(path).startswith("cleaned"):
+                continue
+            start = time.perf_counter()
+            columns = ["LAT", "LON", "SPEED", "SHIPTYPE"]
+            if args.align is None:
+                df = pd.read_csv(path, usecols=columns)
+            else:
+                import dead_reckoning
+                df = dead_reckoning.align(pd.read_csv(path, usecols=columns + ["COURSE", "ELAPSED"]),
+                                          stale=args.align, max_project=args.align)
+            if pyramid.add(df, os.path.abspath(path)):
+                print(f"Added {path} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    else:
+        start = time.perf_counter()
+        pyramid.render(args.zoom, args.output, args.value)
+        print(f"Rendered zoom {args.zoom} in {(time.perf_counter() - start) * 1000:.0f} ms")
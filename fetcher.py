@@ -0,0 +1,146 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = "https://www.marinetraffic.com"
+TILE_PATH = "/getData/get_data_json_4/z:{z}/X:{x}/Y:{y}/station:0"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Same defaults the Selenium scraper used: one zoom level, four tiles
+DEFAULT_TILES = [(2, 0, 0), (2, 0, 1), (2, 1, 0), (2, 1, 1)]
+
+
+def tile_url(z, x, y, base_url=BASE_URL):
+    """Build the get_data_json_4 URL for one tile"""
+    return base_url.rstrip("/") + TILE_PATH.format(z=z, x=x, y=y)
+
+
+def make_session(concurrency=4):
+    """Create a keep-alive session whose connection pool fits the worker count"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept": "application/json, text/plain, */*",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_rows(payload):
+    """Pull the vessel rows out of a decoded get_data_json_4 payload"""
+    if "data" in payload and "rows" in payload["data"]:
+        return payload["data"]["rows"]
+    return None
+
+
+def fetch_tile(session, z, x, y, base_url=BASE_URL, timeout=10.0, retries=3):
+    """Fetch one tile with retries, returning a report dict with the rows"""
+    url = tile_url(z, x, y, base_url)
+    report = {"z": z, "x": x, "y": y, "url": url, "rows": [], "bytes": 0,
+              "seconds": 0.0, "attempts": 0, "error": None}
+    start = time.perf_counter()
+
+    for attempt in range(retries + 1):
+        report["attempts"] = attempt + 1
+        try:
+            response = session.get(url, timeout=timeout)
+            # 429 and 5xx are worth another try, other client errors are not
+            if response.status_code == 429 or response.status_code >= 500:
+                raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+            response.raise_for_status()
+            report["bytes"] = len(response.content)
+            rows = parse_rows(json.loads(response.content))
+            if rows is None:
+                report["error"] = "no rows in payload"
+            else:
+                report["rows"] = rows
+                report["error"] = None
+            break
+        except requests.HTTPError as e:
+            report["error"] = str(e)
+            status = e.response.status_code if e.response is not None else None
+            if status is not None and status < 500 and status != 429:
+                break
+        except (requests.ConnectionError, requests.Timeout, ValueError) as e:
+            report["error"] = f"{type(e).__name__}: {e}"
+
+        if attempt < retries:
+            time.sleep(backoff_delay(attempt))
+
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+
+def fetch_tiles(tiles=None, base_url=BASE_URL, concurrency=4, timeout=10.0,
+                retries=3, session=None, verbose=True):
+    """Fetch tiles concurrently over one pooled session.
+
+    Returns (reports, wall_seconds) where reports keep the order of `tiles`.
+    """
+    tiles = list(tiles or DEFAULT_TILES)
+    own_session = session is None
+    if own_session:
+        session = make_session(concurrency)
+    lock = threading.Lock()
+
+    def work(tile):
+        z, x, y = tile
+        report = fetch_tile(session, z, x, y, base_url, timeout, retries)
+        if verbose:
+            with lock:
+                print_report(report)
+        return report
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            reports = list(pool.map(work, tiles))
+    finally:
+        if own_session:
+            session.close()
+    wall = time.perf_counter() - start
+
+    if verbose:
+        total_rows = sum(len(r["rows"]) for r in reports)
+        total_bytes = sum(r["bytes"] for r in reports)
+        print(f"Fetched {len(reports)} tiles, {total_rows} records, "
+              f"{total_bytes / 1024:.1f} KiB in {wall:.2f}s")
+    return reports, wall
+
+
+def print_report(report):
+    """Print the per-tile line: rows, bytes, time, attempts"""
+    tile = f"z:{report['z']} X:{report['x']} Y:{report['y']}"
+    if report["error"]:
+        print(f"Error for {tile} after {report['attempts']} attempt(s): {report['error']}")
+    else:
+        print(f"Loaded {len(report['rows'])} records from {tile} "
+              f"({report['bytes'] / 1024:.1f} KiB, {report['seconds'] * 1000:.0f} ms, "
+              f"{report['attempts']} attempt(s))")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch vessel tiles over pooled HTTP")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--retries", type=int, default=3)
+    args = parser.parse_args()
+
+    fetch_tiles(base_url=args.base_url, concurrency=args.concurrency,
+                timeout=args.timeout, retries=args.retries)
@@ -0,0 +1,177 @@
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tiles
+
+TILE_RE = re.compile(r"/getData/get_data_json_4/z:(\d+)/X:(\d+)/Y:(\d+)/station:0/?$")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serve station_XY.json files the way get_data_json_4 serves tiles"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse sockets
+
+    def do_GET(self):
+        match = TILE_RE.match(self.path)
+        if not match:
+            self.send_error(404)
+            return
+        z, x, y = (int(v) for v in match.groups())
+
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if server.fail_rate and random.random() < server.fail_rate:
+            self.send_error(503)
+            return
+
+        body = server.payload(z, x, y)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Local stand-in for the tile endpoint, backed by the station files"""
+
+    daemon_threads = True
+
+    def __init__(self, port=0, data_dir=HERE, latency=0.0, fail_rate=0.0,
+                 world=False, cap=2500, margin=0.5, churn=0.0):
+        super().__init__(("127.0.0.1", port), FixtureHandler)
+        self.data_dir = data_dir
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.world = world
+        self.cap = cap
+        self.margin = margin
+        self.churn = churn
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self._cache = {}
+        self._world_rows = None
+        self._live = {}
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def payload(self, z, x, y):
+        """Bytes for tile z/x/y; the station files stand in for the four quadrants"""
+        if self.world:
+            return self.world_payload(z, x, y)
+        if x > 1 or y > 1:
+            return None
+        key = f"{x}{y}"
+        if key not in self._cache:
+            path = os.path.join(self.data_dir, f"station_{key}.json")
+            if not os.path.exists(path):
+                return None
+            with open(path, "rb") as f:
+                self._cache[key] = f.read()
+        if self.churn:
+            return self.churned(key, self._cache[key])
+        return self._cache[key]
+
+    def churned(self, key, body):
+        """Move a `churn` fraction of the tile's vessels before every response.
+
+        Each moved vessel advances a minute along its course at its speed (or
+        drifts slightly when stopped) and may change speed, so repeated polls
+        see a live feed instead of the same file.
+        """
+        with self.lock:
+            if key not in self._live:
+                self._live[key] = json.loads(body)["data"]["rows"]
+            rows = self._live[key]
+            for row in random.sample(rows, int(len(rows) * self.churn)):
+                try:
+                    lat, lon = float(row["LAT"]), float(row["LON"])
+                    speed = float(row.get("SPEED") or 0)
+                    course = math.radians(float(row.get("COURSE") or random.uniform(0, 360)))
+                except (TypeError, ValueError):
+                    continue
+                step = max(speed, 5) / 10 / 60 / 60  # tenths of a knot -> degrees per minute
+                row["LAT"] = f"{max(-90.0, min(90.0, lat + step * math.cos(course))):.6f}"
+                row["LON"] = f"{(lon + step * math.sin(course) + 180) % 360 - 180:.6f}"
+                row["SPEED"] = str(max(0, int(speed + random.choice((-5, 0, 0, 5)))))
+            return json.dumps({"type": 1, "data": {"rows": rows}}).encode()
+
+    def world_payload(self, z, x, y):
+        """Serve the union of the station files cut into real z/X/Y tiles.
+
+        Rows within `margin` degrees of a tile edge are served by both neighbours
+        and each response is truncated to `cap` rows, like the live endpoint.
+        """
+        n = tiles.side(z)
+        if x >= n or y >= n:
+            return None
+        key = tiles.tile_key(z, x, y)
+        with self.lock:
+            if key in self._cache:
+                return self._cache[key]
+            if self._world_rows is None:
+                self._world_rows = self.load_world()
+
+        lat_min, lat_max, lon_min, lon_max = tiles.tile_bounds(z, x, y)
+        rows = [row for lat, lon, row in self._world_rows
+                if lat_min - self.margin <= lat < lat_max + self.margin
+                and lon_min - self.margin <= lon < lon_max + self.margin]
+        body = json.dumps({"type": 1, "data": {"rows": rows[:self.cap]}}).encode()
+        with self.lock:
+            self._cache[key] = body
+        return body
+
+    def load_world(self):
+        """All distinct vessels from the station files with parsed coordinates"""
+        seen = {}
+        for key in ("00", "01", "10", "11"):
+            path = os.path.join(self.data_dir, f"station_{key}.json")
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as f:
+                for row in json.load(f)["data"]["rows"]:
+                    seen.setdefault(row["SHIP_ID"], row)
+        return [(float(row["LAT"]), float(row["LON"]), row) for row in seen.values()]
+
+    def start(self):
+        """Serve from a background thread and return self"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve station_*.json as a local tile endpoint")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each response")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered 503")
+    parser.add_argument("--world", action="store_true", help="cut the station files into real z/X/Y tiles")
+    parser.add_argument("--cap", type=int, default=2500, help="max rows per tile in --world mode")
+    parser.add_argument("--churn", type=float, default=0.0,
+                        help="fraction of vessels that move before each response (not with --world)")
+    args = parser.parse_args()
+
+    server = FixtureServer(args.port, latency=args.latency, fail_rate=args.fail_rate,
+                           world=args.world, cap=args.cap, churn=args.churn)
+    print(f"Serving station files on {server.base_url}")
+    server.serve_forever()
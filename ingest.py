@@ -0,0 +1,280 @@
+import codecs
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+# Fields the endpoint sends as numeric strings ("SPEED":"143"); they are parsed
+# straight into float64 columns and narrowed to int64 when every value is integral.
+NUMERIC_FIELDS = {
+    "LAT", "LON", "SPEED", "COURSE", "HEADING", "ELAPSED", "LENGTH", "ROT",
+    "SHIPTYPE", "WIDTH", "L_FORE", "W_LEFT", "DWT", "GT_SHIPTYPE", "TYPE_IMG",
+}
+
+# Strings pandas.read_csv turns into NaN by default; matching them keeps the
+# ingest output identical to the DataFrame -> CSV -> read_csv path.
+NA_STRINGS = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+}
+
+CHUNK_SIZE = 1 << 16
+INITIAL_CAPACITY = 4096
+
+
+def _is_int_token(token):
+    return token.isdigit() or (token[:1] in "+-" and token[1:].isdigit())
+
+
+class NumericColumn:
+    """Preallocated float64 column that remembers whether every value was an integer"""
+
+    def __init__(self, capacity):
+        self.values = np.full(capacity, np.nan)
+        self.integral = True
+        self.bad = 0
+
+    def grow(self, capacity):
+        grown = np.full(capacity, np.nan)
+        grown[:len(self.values)] = self.values
+        self.values = grown
+
+    def set(self, i, value):
+        if value is None:
+            return
+        if isinstance(value, str):
+            if value in NA_STRINGS:
+                return
+            if self.integral and not _is_int_token(value):
+                self.integral = False
+            try:
+                self.values[i] = float(value)
+            except ValueError:
+                self.bad += 1
+        else:
+            if self.integral and not isinstance(value, int):
+                self.integral = False
+            self.values[i] = value
+
+    def finish(self, n):
+        values = self.values[:n]
+        if self.integral and n and not np.isnan(values).any():
+            return values.astype(np.int64)
+        return values
+
+
+class TextColumn:
+    """Preallocated object column; numeric-looking text is re-inferred at the end"""
+
+    def __init__(self, capacity):
+        self.values = np.full(capacity, np.nan, dtype=object)
+
+    def grow(self, capacity):
+        grown = np.full(capacity, np.nan, dtype=object)
+        grown[:len(self.values)] = self.values
+        self.values = grown
+
+    def set(self, i, value):
+        if value is None:
+            return
+        if not isinstance(value, str):
+            value = str(value)
+        if value in NA_STRINGS:
+            return
+        self.values[i] = value
+
+    def finish(self, n):
+        values = self.values[:n]
+        present = values[pd.notna(values)]
+        if len(present) == 0:
+            return np.full(n, np.nan)
+        # Same rule read_csv applies: all integers -> int, all numbers -> float
+        for kind in (int, float):
+            try:
+                parsed = [kind(v) for v in present]
+            except ValueError:
+                continue
+            if kind is int and len(present) == n:
+                return np.array(parsed, dtype=np.int64)
+            out = np.full(n, np.nan)
+            out[pd.notna(values)] = parsed
+            return out
+        return values
+
+
+class ColumnBuilder:
+    """Receives one row object at a time from the JSON decoder and fills columns"""
+
+    def __init__(self, capacity=INITIAL_CAPACITY):
+        self.capacity = capacity
+        self.n = 0
+        self.columns = {}
+
+    def add_row(self, pairs):
+        if self.n == self.capacity:
+            self.capacity *= 2
+            for column in self.columns.values():
+                column.grow(self.capacity)
+        i = self.n
+        columns = self.columns
+        for key, value in pairs:
+            column = columns.get(key)
+            if column is None:
+                cls = NumericColumn if key in NUMERIC_FIELDS else TextColumn
+                column = columns[key] = cls(self.capacity)
+            column.set(i, value)
+        self.n += 1
+
+    def to_frame(self, categorical=False):
+        data = {}
+        for key, column in self.columns.items():
+            values = column.finish(self.n)
+            if categorical and values.dtype == object:
+                values = pd.Categorical(values)
+            data[key] = values
+        return pd.DataFrame(data)
+
+    @property
+    def bad_values(self):
+        return {key: c.bad for key, c in self.columns.items() if getattr(c, "bad", 0)}
+
+
+def _open(source):
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source), True
+    if isinstance(source, str) and source.lstrip().startswith("{"):
+        return io.StringIO(source), True
+    if hasattr(source, "read"):
+        return source, False
+    return open(source, "rb"), True
+
+
+def iter_row_pairs(source, builder, chunk_size=CHUNK_SIZE):
+    """Stream the objects of data.rows through `builder` chunk by chunk.
+
+    Each row is decoded with an object_pairs_hook, so no per-vessel dict is built.
+    Returns the number of rows read.
+    """
+    f, close = _open(source)
+    rows_seen = 0
+    decoder = json.JSONDecoder(object_pairs_hook=builder.add_row)
+    # Incremental so a multi-byte character split across chunks decodes correctly
+    text = codecs.getincrementaldecoder("utf-8")()
+    try:
+        buf = ""
+        eof = False
+
+        def fill():
+            nonlocal buf, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                buf += text.decode(b"", final=True)
+                return
+            buf += text.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+        # Skip the envelope up to the opening bracket of "rows"
+        while True:
+            start = buf.find('"rows"')
+            if start >= 0:
+                bracket = buf.find("[", start)
+                if bracket >= 0:
+                    pos = bracket + 1
+                    break
+            if eof:
+                return 0
+            fill()
+
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buf):
+                if eof:
+                    break
+                buf = buf[pos:]
+                pos = 0
+                fill()
+                continue
+            if buf[pos] == "]":
+                break
+            try:
+                _, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buf = buf[pos:]
+                pos = 0
+                fill()
+                continue
+            rows_seen += 1
+            pos = end
+            # Drop consumed text so the buffer stays around one chunk long
+            if pos > chunk_size:
+                buf = buf[pos:]
+                pos = 0
+    finally:
+        if close:
+            f.close()
+    return rows_seen
+
+
+def ingest(sources, categorical=False, chunk_size=CHUNK_SIZE):
+    """Parse one or more station payloads (paths, bytes or file objects) into a typed DataFrame.
+
+    Columns appear in first-seen order and get the dtypes read_csv would infer
+    from the CSV that convertData writes, so the result matches that path exactly.
+    """
+    if isinstance(sources, (str, bytes, bytearray)) or hasattr(sources, "read"):
+        sources = [sources]
+    builder = ColumnBuilder()
+    for source in sources:
+        iter_row_pairs(source, builder, chunk_size)
+    if builder.bad_values:
+        print(f"Warning: unparseable numeric values set to NaN: {builder.bad_values}")
+    return builder.to_frame(categorical)
+
+
+def reference_frame(paths):
+    """The current path: json.loads -> list of dicts -> DataFrame -> CSV -> read_csv"""
+    all_rows = []
+    for path in paths:
+        with open(path) as f:
+            all_rows.extend(json.loads(f.read())["data"]["rows"])
+    buf = io.StringIO()
+    pd.DataFrame(all_rows).to_csv(buf, index=False)
+    buf.seek(0)
+    return pd.read_csv(buf)
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import time
+    import tracemalloc
+
+    parser = argparse.ArgumentParser(description="Typed streaming ingest of station JSON")
+    parser.add_argument("paths", nargs="*", default=sorted(glob.glob("station_*.json")))
+    parser.add_argument("--compare", action="store_true", help="check against the DataFrame/CSV path and time both")
+    args = parser.parse_args()
+
+    def measure(fn):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, seconds, peak
+
+    df, seconds, peak = measure(lambda: ingest(args.paths))
+    print(f"Ingested {len(df)} rows x {df.shape[1]} columns in {seconds:.3f}s, "
+          f"peak {peak / 1e6:.1f} MB")
+    print(df.dtypes)
+
+    if args.compare:
+        ref, ref_seconds, ref_peak = measure(lambda: reference_frame(args.paths))
+        print(f"DataFrame/CSV path: {ref_seconds:.3f}s, peak {ref_peak / 1e6:.1f} MB")
+        pd.testing.assert_frame_equal(df, ref)
+        print("Output identical to the DataFrame/CSV path")
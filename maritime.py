@@ -0,0 +1,195 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Only the standard library is imported up here. Each subcommand imports what
+# it needs when it runs, so `maritime.py --help` or `clean` never load
+# matplotlib, seaborn or sklearn.
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TASK_DIR = os.path.join(ROOT, "defaulter task")
+SDAUR_DIR = os.path.join(ROOT, "sdaur")
+FETCH_URL = "https://www.marinetraffic.com"  # fetcher.BASE_URL, without importing requests for --help
+
+
+def _use(directory):
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+
+
+def fetch(args):
+    import script
+    script.main(args.mode, args.base_url, args.concurrency, args.timeout, args.retries, args.store)
+
+
+def clean(args):
+    _use(TASK_DIR)
+    import module2_data_handling
+    module2_data_handling.main(args.path)
+
+
+def features(args):
+    _use(TASK_DIR)
+    import module3_feature_engineering
+    module3_feature_engineering.main(args.path)
+
+
+def eda(args):
+    _use(TASK_DIR)
+    import module3_eda
+    module3_eda.main(args.path)
+
+
+def stats(args):
+    _use(TASK_DIR)
+    import glob
+    import stats as snapshot_stats
+    snapshot_stats.main([p for pattern in args.paths for p in sorted(glob.glob(pattern))],
+                        args.store, heatmap=args.heatmap)
+
+
+def batch(args):
+    _use(TASK_DIR)
+    import glob
+    import batch as batch_runner
+    batch_runner.main([p for pattern in args.paths for p in sorted(glob.glob(pattern))], args.output,
+                      workers=args.workers, in_flight=args.in_flight, retries=args.retries,
+                      timings=args.timings, retry_quarantined=args.retry_quarantined)
+
+
+def train(args):
+    _use(TASK_DIR)
+    if args.sweep:
+        import pandas as pd
+        from sweep import sweep
+        sweep(pd.read_csv(args.path), folds=args.folds, workers=args.workers)
+    else:
+        import module4_ml
+        module4_ml.main(args.path)
+    if args.export:
+        import pandas as pd
+        import inference
+        inference.export(pd.read_csv(args.path), args.export)
+        print(f"Saved {args.export}")
+
+
+def predict(args):
+    _use(TASK_DIR)
+    import inference
+    models, _ = inference.load(args.models)
+    result = inference.run(args.path, args.output, models, args.chunk_size)
+    print(f"Predicted {result['rows']} rows in {result['seconds']:.2f}s, "
+          f"filled {result['filled']} missing SHIPTYPE")
+    print(f"Saved {args.output}")
+
+
+def report(args):
+    _use(SDAUR_DIR)
+    import create_presentation
+    create_presentation.plots_dir = args.plots_dir
+    create_presentation.main(args.output, None if args.full_res else args.dpi, args.force,
+                             args.markdown, args.pdf)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="maritime", description="Maritime traffic analysis pipeline")
+    parser.add_argument("--import-profile", action="store_true",
+                        help="run the command and print where import time went")
+    sub = parser.add_subparsers(dest="command", required=True, metavar="command")
+
+    p = sub.add_parser("fetch", help="scrape one snapshot to CSV (script.py)")
+    p.add_argument("--mode", choices=["http", "selenium"], default="http")
+    p.add_argument("--base-url", default=FETCH_URL)
+    p.add_argument("--concurrency", type=int, default=4)
+    p.add_argument("--timeout", type=float, default=10.0)
+    p.add_argument("--retries", type=int, default=3)
+    p.add_argument("--store", help="write into this snapshot store instead of a CSV")
+    p.set_defaults(run=fetch)
+
+    for name, fn, help_text in [
+        ("clean", clean, "clean a snapshot into cleaned_data.csv (module2)"),
+        ("features", features, "engineer features and plot them (module3_feature_engineering)"),
+        ("eda", eda, "summary statistics and EDA plots (module3_eda)"),
+    ]:
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("path", nargs="?", default="data1.csv")
+        p.set_defaults(run=fn)
+
+    p = sub.add_parser("stats", help="summary statistics and correlations merged across snapshots (stats)")
+    p.add_argument("paths", nargs="*", default=["data/*.csv"])
+    p.add_argument("--store", default=".stats", help="per-snapshot results are kept here")
+    p.add_argument("--heatmap")
+    p.set_defaults(run=stats)
+
+    p = sub.add_parser("batch", help="clean and add features to many snapshots across cores (batch)")
+    p.add_argument("paths", nargs="*", default=["data/*.csv"])
+    p.add_argument("--output", default="batch_output.parquet")
+    p.add_argument("--workers", type=int)
+    p.add_argument("--in-flight", type=int)
+    p.add_argument("--retries", type=int, default=1)
+    p.add_argument("--timings")
+    p.add_argument("--retry-quarantined", action="store_true")
+    p.set_defaults(run=batch)
+
+    p = sub.add_parser("train", help="speed regression and ship type classification (module4)")
+    p.add_argument("path", nargs="?", default="data1.csv")
+    p.add_argument("--sweep", action="store_true", help="cross-validated model sweep instead of one split")
+    p.add_argument("--folds", type=int, default=5)
+    p.add_argument("--workers", type=int)
+    p.add_argument("--export", metavar="MODELS", help="also export portable models for predict")
+    p.set_defaults(run=train)
+
+    p = sub.add_parser("predict", help="add SHIPTYPE_PRED / SPEED_PRED to a snapshot (inference)")
+    p.add_argument("path")
+    p.add_argument("--models", default="models.npz")
+    p.add_argument("--output", default="predictions.csv")
+    p.add_argument("--chunk-size", type=int, default=100_000)
+    p.set_defaults(run=predict)
+
+    p = sub.add_parser("report", help="build the presentation and reports (sdaur/create_presentation)")
+    p.add_argument("--plots-dir", default="plots")
+    p.add_argument("--output", default="marine_traffic_presentation.pptx")
+    p.add_argument("--dpi", type=int, default=120)
+    p.add_argument("--full-res", action="store_true")
+    p.add_argument("--force", action="store_true")
+    p.add_argument("--markdown")
+    p.add_argument("--pdf")
+    p.set_defaults(run=report)
+    return parser
+
+
+def import_profile(argv, top=15):
+    """Re-run the command under -X importtime and sum import time per top-level package"""
+    argv = [a for a in argv if a != "--import-profile"]
+    proc = subprocess.Popen([sys.executable, "-X", "importtime", os.path.abspath(__file__), *argv],
+                            stderr=subprocess.PIPE, text=True)
+    totals = {}
+    for line in proc.stderr:
+        if not line.startswith("import time:"):
+            sys.stderr.write(line)
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # the header line
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us)
+    proc.wait()
+
+    total = sum(totals.values())
+    print(f"\nImport time by package ({total / 1e6:.2f}s total):", file=sys.stderr)
+    for package, us in sorted(totals.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"  {package:24s} {us / 1000:8.1f} ms  {us / total:6.1%}", file=sys.stderr)
+    return proc.returncode
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = build_parser().parse_args(argv)
+    if args.import_profile:
+        return import_profile(argv)
+    args.run(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+import numpy as np
+import pandas as pd
+
+# Per-vessel attributes that repeat on every row of a snapshot. A vessel whose
+# attributes change between snapshots (a DWT correction, say) gets a second
+# row in the vessel table with the same SHIP, so nothing is lost.
+STATIC = ["SHIPNAME", "FLAG", "LENGTH", "WIDTH", "DWT", "L_FORE", "W_LEFT", "GT_SHIPTYPE", "SHIPTYPE"]
+STATIC_DTYPES = {"LENGTH": "Int16", "WIDTH": "Int16", "DWT": "Int32", "L_FORE": "Int16", "W_LEFT": "Int16",
+                 "GT_SHIPTYPE": "Int16", "SHIPTYPE": "Int8"}
+
+# Per-report columns. Everything but LAT/LON is a whole number in range for 16 bits
+DYNAMIC_DTYPES = {"LAT": "float32", "LON": "float32", "SPEED": "Int16", "COURSE": "Int16",
+                  "HEADING": "Int16", "ELAPSED": "Int16", "ROT": "Int16"}
+ENCODED = ["DESTINATION", "STATUS_NAME"]
+# Checked in add(); the nullable dtypes would otherwise wrap or truncate silently
+NARROW = {c: dtype for c, dtype in {**STATIC_DTYPES, **DYNAMIC_DTYPES}.items() if dtype.startswith("Int")}
+
+# TYPE_IMG always equals SHIPTYPE and TYPE_NAME is a function of it (see the
+# SHIPTYPE/TYPE_IMG note in notes.txt), so both come from a lookup table. Rows
+# only carry whether the scrape included them.
+TYPE_COLUMNS = ["TYPE_IMG", "TYPE_NAME"]
+
+COLUMNS = ["LAT", "LON", "SPEED", "COURSE", "HEADING", "ELAPSED", "DESTINATION", "FLAG", "LENGTH", "ROT",
+           "SHIPNAME", "SHIPTYPE", "SHIP_ID", "WIDTH", "L_FORE", "W_LEFT", "DWT", "GT_SHIPTYPE", "TYPE_IMG",
+           "TYPE_NAME", "STATUS_NAME"]
+
+
+class Dictionary:
+    """Append-only string dictionary; codes stay stable as snapshots are added"""
+
+    def __init__(self):
+        self.values = pd.Index([], dtype="str")
+
+    def encode(self, series):
+        """int32 codes for series, -1 for missing; unseen strings are appended"""
+        seen = pd.Index(series.dropna().unique(), dtype="str")
+        new = seen[self.values.get_indexer(seen) == -1]
+        if len(new):
+            self.values = self.values.append(new)
+        return self.values.get_indexer(series).astype(np.int32)
+
+    def compact(self):
+        """Copy the appended pieces into one array; each slice otherwise pins its whole source buffer"""
+        self.values = pd.Index(self.values.to_numpy(dtype=object), dtype="str")
+        return self.values
+
+    def categorical(self, codes):
+        return pd.Categorical.from_codes(codes, categories=self.compact())
+
+
+class VesselRegistry:
+    """Snapshots split into a vessel dimension table and a narrow position table.
+
+    positions: one row per report; VESSEL (int32) points into vessels, SNAPSHOT
+        and the ENCODED strings are categoricals, numbers use DYNAMIC_DTYPES,
+        TYPE_SHOWN says whether the row had TYPE_IMG/TYPE_NAME.
+    vessels: one row per distinct (SHIP_ID, STATIC) version, indexed by VESSEL;
+        SHIP (int32) is the surrogate for SHIP_ID, held once in ship_ids.
+    types: SHIPTYPE -> TYPE_IMG, TYPE_NAME. A vessel without SHIPTYPE has no
+        entry and gets missing type columns.
+
+    flat() joins these back into the original wide layout, only for the
+    columns asked for.
+    """
+
+    def __init__(self):
+        self.ship_ids = Dictionary()
+        self.strings = {c: Dictionary() for c in ["SHIPNAME", "FLAG", "SNAPSHOT", *ENCODED]}
+        self.types = pd.DataFrame({"TYPE_IMG": pd.Series(dtype="Int16"), "TYPE_NAME": pd.Series(dtype="str")},
+                                  index=pd.Index([], dtype="Int8", name="SHIPTYPE"))
+        self._hashes = pd.Index([], dtype="uint64")
+        self._vessel_chunks = []
+        self._position_chunks = []
+        self._vessels = None
+        self._positions = None
+
+    def _learn_types(self, df):
+        shown = df.dropna(subset=["TYPE_NAME"])[["SHIPTYPE", *TYPE_COLUMNS]].drop_duplicates()
+        if shown["SHIPTYPE"].isna().any():
+            raise ValueError("TYPE_NAME is set on rows without SHIPTYPE; the types lookup table can't represent it")
+        if shown["SHIPTYPE"].duplicated().any() or (shown["TYPE_IMG"] != shown["SHIPTYPE"]).any():
+            raise ValueError("TYPE_NAME/TYPE_IMG are not a function of SHIPTYPE in this snapshot; "
+                             "the types lookup table can't represent it")
+        shown = shown.set_index("SHIPTYPE")
+        known = shown.index.isin(self.types.index)
+        if known.any():
+            clash = self.types.loc[shown.index[known], "TYPE_NAME"].to_numpy() != shown["TYPE_NAME"][known].to_numpy()
+            if clash.any():
+                raise ValueError(f"SHIPTYPE {shown.index[known][clash].tolist()} changed TYPE_NAME between snapshots")
+        new = shown[~known]
+        if len(new):
+            new = new.astype({"TYPE_IMG": "Int16", "TYPE_NAME": "str"})
+            new.index = new.index.astype("Int8")
+            self.types = pd.concat([self.types, new]).sort_index()
+
+    def add(self, df, source):
+        """Append one snapshot; returns the number of new vessel versions"""
+        df = df.reset_index(drop=True)
+        unexpected = [c for c in df.columns if c not in COLUMNS]
+        if unexpected:
+            raise ValueError(f"Columns {unexpected} have no place in the registry")
+        df = df.reindex(columns=COLUMNS)
+        _check_narrow(df)
+        self._learn_types(df)
+
+        # Vessel versions are matched by hashing SHIP_ID plus the static columns
+        static = df[["SHIP_ID", *STATIC]]
+        hashes = pd.util.hash_pandas_object(static, index=False).to_numpy()
+        unique, first, inverse = np.unique(hashes, return_index=True, return_inverse=True)
+        ids = self._hashes.get_indexer(unique)
+        new = ids == -1
+        ids[new] = len(self._hashes) + np.arange(new.sum())
+        if new.any():
+            self._hashes = self._hashes.append(pd.Index(unique[new]))
+            fresh = static.iloc[first[new]]
+            vessels = {"VESSEL": ids[new].astype(np.int32), "SHIP": self.ship_ids.encode(fresh["SHIP_ID"])}
+            for c in STATIC:
+                vessels[c] = self.strings[c].encode(fresh[c]) if c in self.strings else fresh[c].to_numpy()
+            self._vessel_chunks.append(pd.DataFrame(vessels))
+            self._vessels = None
+
+        positions = {"VESSEL": ids[inverse].astype(np.int32),
+                     "SNAPSHOT": self.strings["SNAPSHOT"].encode(pd.Series([source] * len(df), dtype="str"))}
+        for c in DYNAMIC_DTYPES:
+            positions[c] = df[c].to_numpy()
+        for c in ENCODED:
+            positions[c] = self.strings[c].encode(df[c])
+        positions["TYPE_SHOWN"] = df["TYPE_NAME"].notna().to_numpy()
+        self._position_chunks.append(pd.DataFrame(positions))
+        self._positions = None
+        return int(new.sum())
+
+    @property
+    def vessels(self):
+        if self._vessels is None:
+            raw = pd.concat(self._vessel_chunks, ignore_index=True) if self._vessel_chunks else \
+                pd.DataFrame(columns=["VESSEL", "SHIP", *STATIC])
+            self._vessel_chunks = [raw]
+            out = pd.DataFrame({"SHIP": raw["SHIP"].to_numpy(dtype=np.int32)},
+                               index=pd.Index(raw["VESSEL"].to_numpy(dtype=np.int32), name="VESSEL"))
+            for c in STATIC:
+                if c in self.strings:
+                    out[c] = self.strings[c].categorical(raw[c].to_numpy())
+                else:
+                    out[c] = pd.array(raw[c].to_numpy(), dtype=STATIC_DTYPES[c])
+            self._vessels = out
+        return self._vessels
+
+    @property
+    def positions(self):
+        if self._positions is None:
+            raw = pd.concat(self._position_chunks, ignore_index=True)
+            self._position_chunks = [raw]
+            out = pd.DataFrame({"VESSEL": raw["VESSEL"].to_numpy(dtype=np.int32),
+                                "SNAPSHOT": self.strings["SNAPSHOT"].categorical(raw["SNAPSHOT"].to_numpy())})
+            for c, dtype in DYNAMIC_DTYPES.items():
+                out[c] = pd.array(raw[c].to_numpy(), dtype=dtype) if dtype.startswith("Int") else \
+                    raw[c].to_numpy(dtype=dtype)
+            for c in ENCODED:
+                out[c] = self.strings[c].categorical(raw[c].to_numpy())
+            out["TYPE_SHOWN"] = raw["TYPE_SHOWN"].to_numpy(dtype=bool)
+            self._positions = out
+        return self._positions
+
+    def _type_rows(self, shiptypes):
+        """Row of each SHIPTYPE in types, -1 where it is missing or unknown"""
+        return self.types.index.get_indexer(pd.Index(shiptypes, dtype="Int8"))
+
+    def vessel_table(self, fill_types=True):
+        """Vessels with SHIP_ID and the type columns joined in"""
+        v = self.vessels.copy()
+        v.insert(0, "SHIP_ID", self.ship_ids.values.take(v["SHIP"].to_numpy()))
+        if fill_types:
+            rows = self._type_rows(v["SHIPTYPE"].array)
+            for c in TYPE_COLUMNS:
+                v[c] = self.types[c].array.take(rows, allow_fill=True)
+        return v
+
+    def flat(self, columns=None, fill_types=False, snapshots=None):
+        """Join back to the wide snapshot layout, with the dtypes pd.read_csv gives.
+
+        Only `columns` are joined. fill_types=True fills TYPE_IMG/TYPE_NAME from
+        SHIPTYPE on every row instead of only where the scrape included them.
+        snapshots limits the rows to those sources.
+        """
+        columns = COLUMNS if columns is None else list(columns)
+        unknown = [c for c in columns if c not in COLUMNS]
+        if unknown:
+            raise KeyError(f"Unknown columns: {unknown}")
+        positions = self.positions
+        if snapshots is not None:
+            positions = positions[positions["SNAPSHOT"].isin(snapshots)]
+        vessel_rows = self.vessels.index.get_indexer(positions["VESSEL"].to_numpy())
+        out = {}
+        for c in columns:
+            if c in positions.columns:
+                values = positions[c].array
+            elif c in STATIC:
+                values = self.vessels[c].array.take(vessel_rows)
+            elif c == "SHIP_ID":
+                values = self.ship_ids.values.take(self.vessels["SHIP"].to_numpy()[vessel_rows])
+            else:
+                rows = self._type_rows(self.vessels["SHIPTYPE"].array.take(vessel_rows))
+                values = pd.Series(self.types[c].array.take(rows, allow_fill=True))
+                if not fill_types:
+                    values = values.where(positions["TYPE_SHOWN"].to_numpy())
+            out[c] = _as_read(values)
+        return pd.DataFrame(out)
+
+    def memory(self):
+        """Bytes per table; the categoricals' deep size includes their dictionaries"""
+        return {"positions": int(self.positions.memory_usage(deep=True).sum()),
+                "vessels": int(self.vessels.memory_usage(deep=True).sum()),
+                "ship_ids": int(self.ship_ids.compact().memory_usage(deep=True)),
+                "types": int(self.types.memory_usage(deep=True).sum())}
+
+
+def _check_narrow(df):
+    """Raise unless every NARROW column holds whole numbers within its dtype's range"""
+    for c, dtype in NARROW.items():
+        values = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        if np.isnan(values).sum() > df[c].isna().sum():
+            raise ValueError(f"{c} has values that aren't numbers")
+        info = np.iinfo(dtype.lower())
+        with np.errstate(invalid="ignore"):
+            bad = (values < info.min) | (values > info.max) | (values != np.round(values))
+        bad &= ~np.isnan(values)
+        if bad.any():
+            raise ValueError(f"{c} values {np.unique(values[bad])[:5].tolist()} don't fit {dtype}")
+
+
+def _as_read(values):
+    """Cast to what pd.read_csv would have inferred: str, int64 when nothing is missing, else float64"""
+    s = pd.Series(values).reset_index(drop=True)
+    if isinstance(s.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(s.dtype):
+        return s.astype("str")
+    if pd.api.types.is_integer_dtype(s.dtype) and not s.isna().any():
+        return s.astype("int64")
+    return s.astype("float64")
+
+
+def from_csvs(paths):
+    registry = VesselRegistry()
+    for path in paths:
+        registry.add(pd.read_csv(path, dtype={"SHIP_ID": str}), path)
+    return registry
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import os
+    import time
+
+    parser = argparse.ArgumentParser(description="Load snapshots into a normalized vessel registry and compare memory")
+    parser.add_argument("paths", nargs="*", default=["data/*.csv"], help="CSV files or globs")
+    args = parser.parse_args()
+    paths = [p for pattern in args.paths for p in sorted(glob.glob(pattern))
+             if not os.path.basename(p).startswith("cleaned")]
+
+    flat_df = pd.concat([pd.read_csv(p, dtype={"SHIP_ID": str}) for p in paths], ignore_index=True)
+    before = flat_df.memory_usage(deep=True).sum()
+    with pd.option_context("future.infer_string", False):
+        as_objects = pd.concat([pd.read_csv(p, dtype={"SHIP_ID": str}) for p in paths], ignore_index=True)
+    before_objects = as_objects.memory_usage(deep=True).sum()
+    del as_objects
+
+    start = time.perf_counter()
+    registry = from_csvs(paths)
+    memory = registry.memory()
+    built = time.perf_counter() - start
+    after = sum(memory.values())
+
+    mb = 1024 * 1024
+    print(f"{len(paths)} snapshots, {len(registry.positions)} rows, {len(registry.vessels)} vessel versions "
+          f"of {len(registry.ship_ids.values)} ships, built in {built:.2f}s")
+    print(f"\nFlat DataFrame, object strings: {before_objects / mb:7.2f} MB")
+    print(f"Flat DataFrame, pandas str:     {before / mb:7.2f} MB")
+    print(f"Registry:                       {after / mb:7.2f} MB "
+          f"({before_objects / after:.1f}x / {before / after:.1f}x smaller)")
+    for table, size in memory.items():
+        print(f"  {table:10s} {size / mb:7.2f} MB")
+
+    start = time.perf_counter()
+    joined = registry.flat()
+    seconds = time.perf_counter() - start
+    print(f"\nJoined back to {joined.shape[1]} columns in {seconds * 1000:.0f} ms")
+    for c in COLUMNS:
+        if c in ("LAT", "LON"):
+            error = np.nanmax(np.abs(joined[c].to_numpy() - flat_df[c].to_numpy()))
+            print(f"  {c} max float32 rounding error {error:.1e} degrees")
+        elif not joined[c].equals(flat_df[c]):
+            print(f"  {c} differs from the CSVs")
+    start = time.perf_counter()
+    registry.flat(["LAT", "LON", "SHIPNAME", "TYPE_NAME"], fill_types=True)
+    print(f"LAT, LON, SHIPNAME, TYPE_NAME (filled from SHIPTYPE) in {(time.perf_counter() - start) * 1000:.0f} ms")
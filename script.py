@@ -1,14 +1,39 @@
 import os
+import sys
 import pandas as pd
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import json
 import time
-def getData():
+
+import fetcher
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "defaulter task"))
+import instrument
+
+
+def getData(mode="http", base_url=fetcher.BASE_URL, concurrency=4, timeout=10.0, retries=3):
+    """Fetch data from all 4 station combinations.
+
+    mode="http" pulls the tiles concurrently over a pooled session (fetcher.py),
+    mode="selenium" drives headless Chrome one tile at a time as before.
+    """
+    if mode == "selenium":
+        return getDataSelenium()
+
+    reports, wall = fetcher.fetch_tiles(base_url=base_url, concurrency=concurrency,
+                                        timeout=timeout, retries=retries)
+    all_rows = []
+    for report in reports:
+        all_rows.extend(report["rows"])
+    instrument.add(bytes_read=sum(r["bytes"] for r in reports))
+    return all_rows
+
+
+def getDataSelenium():
     """Fetch data from all 4 station combinations using Selenium"""
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+
     all_rows = []
     coordinates = ["00", "01", "10", "11"]
     
@@ -69,17 +94,41 @@ def getData():
     
     return all_rows
 
-def convertData(all_rows):
-    """Convert rows to CSV with timestamp filename"""
+def convertData(all_rows, store_dir=None):
+    """Convert rows to CSV with timestamp filename, or to a Parquet partition in store_dir"""
     if all_rows:
         df = pd.DataFrame(all_rows)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_file = f"{timestamp}.csv"
-        df.to_csv(output_file, index=False)
+        if store_dir:
+            import snapshot_store
+            output_file = snapshot_store.write_snapshot(df, store_dir=store_dir)
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output_file = f"{timestamp}.csv"
+            df.to_csv(output_file, index=False)
+        if os.path.isfile(output_file):
+            instrument.add(bytes_written=os.path.getsize(output_file))
         print(f"Converted {len(all_rows)} total records to {output_file}")
     else:
         print("No data found")
 
+def main(mode="http", base_url=fetcher.BASE_URL, concurrency=4, timeout=10.0, retries=3, store_dir=None):
+    """Fetch one snapshot and write it out"""
+    with instrument.stage("fetch", mode=mode) as s:
+        all_rows = getData(mode, base_url, concurrency, timeout, retries)
+        s.rows_out = len(all_rows)
+    with instrument.stage("convert", rows_in=len(all_rows)):
+        convertData(all_rows, store_dir)
+
 if __name__ == "__main__":
-    all_rows = getData()
-    convertData(all_rows)
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scrape one vessel snapshot to CSV")
+    parser.add_argument("--mode", choices=["http", "selenium"], default="http")
+    parser.add_argument("--base-url", default=fetcher.BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--store", help="write into this snapshot store instead of a CSV")
+    args = parser.parse_args()
+
+    main(args.mode, args.base_url, args.concurrency, args.timeout, args.retries, args.store)
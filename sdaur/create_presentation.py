@@ -2,19 +2,77 @@ from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
+import hashlib
+import json
 import os
+import sys
+import time
 
-# Create presentation
-prs = Presentation()
-prs.slide_width = Inches(16)
-prs.slide_height = Inches(9)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "defaulter task"))
+import instrument
+
+SLIDE_WIDTH_IN = 16
+SLIDE_HEIGHT_IN = 9
+# Pictures are placed 6.5in high and never wider than the slide. A 9in slide
+# shown on a 1080p screen is 120 pixels per inch, so more detail is never seen.
+IMAGE_HEIGHT_IN = 6.5
+IMAGE_MAX_WIDTH_IN = 14
+DPI = 120
+
+MANIFEST = "presentation_manifest.json"
+CACHE_DIR = ".slide_cache"
+
+TITLE = "Marine Traffic Data Analysis"
+SUBTITLE = "An Exploratory Study of Global Vessel Patterns"
+
+# Question Slides (8 questions max)
+plots_dir = "plots"
+
+questions_and_plots = [
+    ("What does global maritime traffic look like?",
+     "05_geographic_distribution.png"),
+
+    ("Do different vessel types have characteristic shapes?",
+     "03_lw_ratio_by_shiptype.png"),
+
+    ("How does cargo capacity relate to vessel size?",
+     "04_dwt_vs_length.png"),
+
+    ("How does speed vary geographically?",
+     "06_speed_by_location.png"),
+
+    ("Can heading-course differences identify vessels in distress?",
+     "02_hc_diff_anomalies.png"),
+
+    ("Which features show strong correlations?",
+     "07_correlation_matrix.png"),
+
+    ("What's missing in our data?",
+     "08_missing_data_analysis.png"),
+
+    ("Can we model dimensional relationships?",
+     "12_dimensions_with_speed.png")
+]
+
+conclusion_text = """We reverse-engineered the MarineTraffic API and scraped 10,379 vessels globally.
+
+Through exploratory analysis, we discovered systematic relationships between vessel
+characteristics, identified operational patterns, and built predictive models.
+
+Simple linear regression explained 51.8% of dimensional variance—satisfying academic
+requirements while revealing the need for advanced machine learning approaches.
+
+This static snapshot establishes the foundation for real-time maritime surveillance,
+anomaly detection, and predictive analytics."""
+
+
+def blank_layout(prs):
+    return prs.slide_layouts[6]
 
-# Define slide layout (blank)
-blank_slide_layout = prs.slide_layouts[6]
 
 def add_title_slide(prs, title, subtitle=""):
     """Add a title slide"""
-    slide = prs.slides.add_slide(blank_slide_layout)
+    slide = prs.slides.add_slide(blank_layout(prs))
 
     # Title
     title_box = slide.shapes.add_textbox(Inches(1), Inches(3), Inches(14), Inches(2))
@@ -38,7 +96,7 @@ def add_title_slide(prs, title, subtitle=""):
 
 def add_question_slide(prs, question, image_path):
     """Add a slide with question as title and graph as content"""
-    slide = prs.slides.add_slide(blank_slide_layout)
+    slide = prs.slides.add_slide(blank_layout(prs))
 
     # Question (title)
     title_box = slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(15), Inches(1))
@@ -50,16 +108,16 @@ def add_question_slide(prs, question, image_path):
     title_frame.paragraphs[0].font.color.rgb = RGBColor(0, 0, 0)
 
     # Image (graph)
-    if os.path.exists(image_path):
+    if image_path and os.path.exists(image_path):
         # Center the image
         left = Inches(2)
         top = Inches(1.5)
-        height = Inches(6.5)
+        height = Inches(IMAGE_HEIGHT_IN)
         slide.shapes.add_picture(image_path, left, top, height=height)
     else:
         # Placeholder text if image doesn't exist
         placeholder = slide.shapes.add_textbox(Inches(2), Inches(3), Inches(12), Inches(2))
-        placeholder.text_frame.text = f"[Image: {os.path.basename(image_path)}]"
+        placeholder.text_frame.text = f"[Image: {os.path.basename(image_path or '')}]"
         placeholder.text_frame.paragraphs[0].alignment = PP_ALIGN.CENTER
         placeholder.text_frame.paragraphs[0].font.size = Pt(24)
         placeholder.text_frame.paragraphs[0].font.color.rgb = RGBColor(150, 150, 150)
@@ -68,7 +126,7 @@ def add_question_slide(prs, question, image_path):
 
 def add_conclusion_slide(prs, text):
     """Add conclusion slide"""
-    slide = prs.slides.add_slide(blank_slide_layout)
+    slide = prs.slides.add_slide(blank_layout(prs))
 
     # Title
     title_box = slide.shapes.add_textbox(Inches(1), Inches(1.5), Inches(14), Inches(1))
@@ -88,59 +146,174 @@ def add_conclusion_slide(prs, text):
 
     return slide
 
-# Title Slide
-add_title_slide(prs,
-                "Marine Traffic Data Analysis",
-                "An Exploratory Study of Global Vessel Patterns")
 
-# Question Slides (8 questions max)
-plots_dir = "plots"
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-questions_and_plots = [
-    ("What does global maritime traffic look like?",
-     "05_geographic_distribution.png"),
 
-    ("Do different vessel types have characteristic shapes?",
-     "03_lw_ratio_by_shiptype.png"),
+def slide_image(path, dpi=DPI, cache_dir=CACHE_DIR, digest=None):
+    """Path of the plot downscaled to what the slide displays at `dpi`.
 
-    ("How does cargo capacity relate to vessel size?",
-     "04_dwt_vs_length.png"),
+    Images are resized and re-encoded once per (content, dpi) and kept in
+    cache_dir; dpi=None embeds the original file. Plots use few colours, so a
+    256-colour palette keeps them sharp at a fraction of the truecolour size.
+    """
+    if dpi is None:
+        return path
+    digest = digest or file_hash(path)
+    cached = os.path.join(cache_dir, f"{digest[:20]}_{dpi}.png")
+    if os.path.exists(cached):
+        return cached
 
-    ("How does speed vary geographically?",
-     "06_speed_by_location.png"),
+    from PIL import Image
+    os.makedirs(cache_dir, exist_ok=True)
+    with Image.open(path) as image:
+        image.load()
+        max_size = (int(IMAGE_MAX_WIDTH_IN * dpi), int(IMAGE_HEIGHT_IN * dpi))
+        if image.width > max_size[0] or image.height > max_size[1]:
+            image.thumbnail(max_size, Image.LANCZOS)
+        if image.mode in ("RGBA", "LA", "P"):
+            # Plots are drawn on white; flattening drops the alpha channel
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+            image = background
+        image = image.convert("RGB").quantize(256, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+        tmp = cached + ".tmp"
+        image.save(tmp, format="PNG", optimize=True)
+    os.replace(tmp, cached)
+    return cached
 
-    ("Can heading-course differences identify vessels in distress?",
-     "02_hc_diff_anomalies.png"),
 
-    ("Which features show strong correlations?",
-     "07_correlation_matrix.png"),
+def build_manifest(dpi=DPI, cache_dir=CACHE_DIR):
+    """Every slide's inputs (text, source image hash, cached image), in deck order"""
+    slides = [{"kind": "title", "title": TITLE, "subtitle": SUBTITLE}]
+    for question, plot_file in questions_and_plots:
+        image_path = os.path.join(plots_dir, plot_file)
+        entry = {"kind": "question", "question": question, "image": image_path,
+                 "image_hash": None, "asset": None}
+        if os.path.exists(image_path):
+            entry["image_hash"] = file_hash(image_path)
+            entry["asset"] = slide_image(image_path, dpi, cache_dir, entry["image_hash"])
+        slides.append(entry)
+    slides.append({"kind": "conclusion", "text": conclusion_text})
+    key = hashlib.sha256(json.dumps({"dpi": dpi, "slides": slides}, sort_keys=True).encode()).hexdigest()
+    return {"dpi": dpi, "key": key, "slides": slides}
 
-    ("What's missing in our data?",
-     "08_missing_data_analysis.png"),
 
-    ("Can we model dimensional relationships?",
-     "12_dimensions_with_speed.png")
-]
+def build_deck(manifest, output_path):
+    prs = Presentation()
+    prs.slide_width = Inches(SLIDE_WIDTH_IN)
+    prs.slide_height = Inches(SLIDE_HEIGHT_IN)
+    with instrument.stage("slides", rows_in=len(manifest["slides"])) as s:
+        for entry in manifest["slides"]:
+            if entry["kind"] == "title":
+                add_title_slide(prs, entry["title"], entry["subtitle"])
+            elif entry["kind"] == "question":
+                if entry["asset"]:
+                    s.add(bytes_read=os.path.getsize(entry["asset"]))
+                add_question_slide(prs, entry["question"], entry["asset"] or entry["image"])
+            else:
+                add_conclusion_slide(prs, entry["text"])
+        s.rows_out = len(prs.slides)
+    with instrument.stage("save"):
+        prs.save(output_path)
+        instrument.wrote(output_path)
 
-for question, plot_file in questions_and_plots:
-    image_path = os.path.join(plots_dir, plot_file)
-    add_question_slide(prs, question, image_path)
 
-# Conclusion Slide
-conclusion_text = """We reverse-engineered the MarineTraffic API and scraped 10,379 vessels globally.
+def write_markdown(manifest, path):
+    """The deck as a markdown report: one section per question with its plot"""
+    base = os.path.dirname(os.path.abspath(path))
+    lines = []
+    for entry in manifest["slides"]:
+        if entry["kind"] == "title":
+            lines += [f"# {entry['title']}", "", f"*{entry['subtitle']}*", ""]
+        elif entry["kind"] == "question":
+            lines += [f"## {entry['question']}", ""]
+            image = entry["asset"] or entry["image"]
+            if entry["asset"]:
+                lines += [f"![{entry['question']}]({os.path.relpath(os.path.abspath(image), base)})", ""]
+            else:
+                lines += [f"*[Image: {os.path.basename(image)}]*", ""]
+        else:
+            lines += ["## Conclusion", "", entry["text"], ""]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
 
-Through exploratory analysis, we discovered systematic relationships between vessel
-characteristics, identified operational patterns, and built predictive models.
 
-Simple linear regression explained 51.8% of dimensional variance—satisfying academic
-requirements while revealing the need for advanced machine learning approaches.
+def write_pdf(manifest, path):
+    """The deck as a PDF, one 16x9 page per slide, drawn from the cached images"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
 
-This static snapshot establishes the foundation for real-time maritime surveillance,
-anomaly detection, and predictive analytics."""
+    with PdfPages(path) as pdf:
+        for entry in manifest["slides"]:
+            fig = plt.figure(figsize=(SLIDE_WIDTH_IN, SLIDE_HEIGHT_IN))
+            if entry["kind"] == "title":
+                fig.text(0.5, 0.55, entry["title"], ha="center", fontsize=40, weight="bold")
+                fig.text(0.5, 0.42, entry["subtitle"], ha="center", fontsize=22, color="#646464")
+            elif entry["kind"] == "question":
+                fig.text(0.5, 0.93, entry["question"], ha="center", fontsize=28, weight="bold")
+                if entry["asset"]:
+                    ax = fig.add_axes([0.05, 0.05, 0.9, 0.8])
+                    ax.imshow(plt.imread(entry["asset"]))
+                    ax.axis("off")
+            else:
+                fig.text(0.5, 0.8, "Conclusion", ha="center", fontsize=36, weight="bold")
+                fig.text(0.5, 0.45, entry["text"], ha="center", va="center", fontsize=16, linespacing=1.5)
+            pdf.savefig(fig)
+            plt.close(fig)
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def main(output_path="marine_traffic_presentation.pptx", dpi=DPI, force=False, markdown=None, pdf=None,
+         manifest_path=MANIFEST, cache_dir=CACHE_DIR):
+    """Build the deck (and optional report) unless nothing it depends on has changed"""
+    start = time.perf_counter()
+    manifest = build_manifest(dpi, cache_dir)
+    previous = load_manifest(manifest_path)
+    if not force and previous and previous["key"] == manifest["key"] and os.path.exists(output_path):
+        print(f"Presentation up to date: {output_path}")
+    else:
+        if previous:
+            changed = [new.get("question") or new["kind"]
+                       for old, new in zip(previous["slides"], manifest["slides"]) if old != new]
+            changed += [new.get("question") or new["kind"]
+                        for new in manifest["slides"][len(previous["slides"]):]]
+            if changed and not force:
+                print(f"Changed slides: {', '.join(changed)}")
+        build_deck(manifest, output_path)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        print(f"Presentation created: {output_path} ({os.path.getsize(output_path) / 1024:.0f} KiB)")
+    if markdown:
+        write_markdown(manifest, markdown)
+        print(f"Report written: {markdown}")
+    if pdf:
+        write_pdf(manifest, pdf)
+        print(f"Report written: {pdf}")
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    import argparse
 
-add_conclusion_slide(prs, conclusion_text)
+    parser = argparse.ArgumentParser(description="Build the presentation, reusing cached slide images")
+    parser.add_argument("--output", default="marine_traffic_presentation.pptx")
+    parser.add_argument("--dpi", type=int, default=DPI, help="resolution images are downscaled to")
+    parser.add_argument("--full-res", action="store_true", help="embed the original PNGs")
+    parser.add_argument("--force", action="store_true", help="rebuild even if nothing changed")
+    parser.add_argument("--markdown", help="also write the slides as a markdown report")
+    parser.add_argument("--pdf", help="also write the slides as a PDF")
+    args = parser.parse_args()
 
-# Save presentation
-output_path = "marine_traffic_presentation.pptx"
-prs.save(output_path)
-print(f"Presentation created: {output_path}")
+    main(args.output, None if args.full_res else args.dpi, args.force, args.markdown, args.pdf)
@@ -0,0 +1,179 @@
+import glob
+import os
+import re
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+STORE_DIR = "store"
+COMPRESSION = "zstd"
+
+# Every column the endpoint sends, in one fixed order. The numeric fields are
+# all whole numbers apart from LAT/LON, so they fit nullable 32-bit ints.
+SCHEMA = pa.schema([
+    ("LAT", pa.float64()),
+    ("LON", pa.float64()),
+    ("SPEED", pa.int32()),
+    ("COURSE", pa.int32()),
+    ("HEADING", pa.int32()),
+    ("ELAPSED", pa.int32()),
+    ("DESTINATION", pa.string()),
+    ("FLAG", pa.string()),
+    ("LENGTH", pa.int32()),
+    ("ROT", pa.int32()),
+    ("SHIPNAME", pa.string()),
+    ("SHIPTYPE", pa.int32()),
+    ("SHIP_ID", pa.string()),
+    ("WIDTH", pa.int32()),
+    ("L_FORE", pa.int32()),
+    ("W_LEFT", pa.int32()),
+    ("DWT", pa.int32()),
+    ("GT_SHIPTYPE", pa.int32()),
+    ("TYPE_IMG", pa.int32()),
+    ("TYPE_NAME", pa.string()),
+    ("STATUS_NAME", pa.string()),
+    ("CAPTURED_AT", pa.timestamp("s")),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("capture_date", pa.date32())]), flavor="hive")
+
+FILENAME_TIME = re.compile(r"(\d{8}_\d{6})")
+
+
+def to_table(df, captured_at):
+    """Cast a snapshot DataFrame (typed, or the raw string rows) to SCHEMA"""
+    columns = {}
+    for field in SCHEMA:
+        if field.name == "CAPTURED_AT":
+            columns[field.name] = pa.array([captured_at] * len(df), type=field.type)
+        elif field.name not in df.columns:
+            columns[field.name] = pa.nulls(len(df), type=field.type)
+        elif pa.types.is_string(field.type):
+            values = df[field.name].astype(object).where(df[field.name].notna(), None)
+            columns[field.name] = pa.array(values.map(lambda v: v if v is None else str(v)), type=field.type)
+        else:
+            values = pd.to_numeric(df[field.name], errors="coerce")
+            columns[field.name] = pa.array(values, type=field.type, from_pandas=True)
+    return pa.table(columns, schema=SCHEMA)
+
+
+def write_snapshot(df, captured_at=None, store_dir=STORE_DIR):
+    """Write one scrape as store/capture_date=YYYY-MM-DD/YYYYMMDD_HHMMSS.parquet"""
+    captured_at = (captured_at or datetime.now()).replace(microsecond=0)
+    table = to_table(df, captured_at)
+    partition = os.path.join(store_dir, f"capture_date={captured_at.date().isoformat()}")
+    os.makedirs(partition, exist_ok=True)
+    stem = captured_at.strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(partition, stem + ".parquet")
+    n = 1
+    while os.path.exists(path):  # never overwrite a scrape with the same timestamp
+        path = os.path.join(partition, f"{stem}_{n}.parquet")
+        n += 1
+    pq.write_table(table, path, compression=COMPRESSION)
+    return path
+
+
+def dataset(store_dir=STORE_DIR):
+    return ds.dataset(store_dir, format="parquet", schema=SCHEMA.append(pa.field("capture_date", pa.date32())),
+                      partitioning=PARTITIONING)
+
+
+def read(columns=None, filters=None, days=None, since=None, until=None, store_dir=STORE_DIR):
+    """Read snapshots with column projection and predicate pushdown.
+
+    filters use the pyarrow/pandas form, e.g. [("SHIPTYPE", "==", 7)].
+    days/since/until restrict capture time; whole date partitions outside the
+    range are skipped without being opened.
+
+        read(["LAT", "LON", "SPEED"], [("SHIPTYPE", "==", 7)], days=7)
+    """
+    expression = pq.filters_to_expression(filters) if filters else None
+    if days is not None:
+        since = datetime.now() - timedelta(days=days)
+    clauses = []
+    if since is not None:
+        clauses.append(ds.field("capture_date") >= pa.scalar(since.date(), pa.date32()))
+        clauses.append(ds.field("CAPTURED_AT") >= pa.scalar(since, pa.timestamp("s")))
+    if until is not None:
+        clauses.append(ds.field("capture_date") <= pa.scalar(until.date(), pa.date32()))
+        clauses.append(ds.field("CAPTURED_AT") <= pa.scalar(until, pa.timestamp("s")))
+    for clause in clauses:
+        expression = clause if expression is None else expression & clause
+
+    table = dataset(store_dir).to_table(columns=columns, filter=expression)
+    return table.to_pandas()
+
+
+def capture_time(path):
+    """Capture time from a YYYYMMDD_HHMMSS file name, else the file's mtime"""
+    match = FILENAME_TIME.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+    print(f"Warning: no timestamp in {os.path.basename(path)}, using its modification time")
+    return datetime.fromtimestamp(os.path.getmtime(path)).replace(microsecond=0)
+
+
+def import_csvs(paths, store_dir=STORE_DIR):
+    """One-shot import of existing snapshot CSVs into the store"""
+    written = []
+    for path in paths:
+        if os.path.basename(path).startswith("cleaned"):
+            print(f"Skipping {path}: derived data, not a raw snapshot")
+            continue
+        df = pd.read_csv(path, dtype={"SHIP_ID": str})
+        out = write_snapshot(df, capture_time(path), store_dir)
+        print(f"Imported {len(df)} rows from {path} -> {out}")
+        written.append(out)
+    return written
+
+
+def compare_read_times(paths, columns, store_dir=STORE_DIR):
+    """Time loading `columns` across every snapshot from CSV and from the store"""
+    import time
+
+    start = time.perf_counter()
+    csv_rows = sum(len(pd.read_csv(path, usecols=columns)) for path in paths)
+    csv_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store_rows = len(read(columns, store_dir=store_dir))
+    store_seconds = time.perf_counter() - start
+
+    print(f"CSV:   {csv_rows} rows of {columns} in {csv_seconds * 1000:.0f} ms")
+    print(f"Store: {store_rows} rows of {columns} in {store_seconds * 1000:.0f} ms "
+          f"({store_seconds / csv_seconds:.0%} of CSV time)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Partitioned Parquet store for vessel snapshots")
+    parser.add_argument("--store", default=STORE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    imp = sub.add_parser("import", help="import snapshot CSVs into the store")
+    imp.add_argument("paths", nargs="*", default=sorted(glob.glob("data/*.csv")))
+
+    query = sub.add_parser("read", help="read a projection of the store")
+    query.add_argument("--columns", nargs="+")
+    query.add_argument("--shiptype", type=int)
+    query.add_argument("--days", type=int)
+
+    bench = sub.add_parser("bench", help="compare column reads against CSV parsing")
+    bench.add_argument("paths", nargs="*", default=sorted(glob.glob("data/*.csv")))
+    bench.add_argument("--columns", nargs="+", default=["LAT", "LON", "SPEED"])
+    args = parser.parse_args()
+
+    if args.command == "import":
+        import_csvs(args.paths, args.store)
+    elif args.command == "read":
+        filters = [("SHIPTYPE", "==", args.shiptype)] if args.shiptype is not None else None
+        df = read(args.columns, filters, args.days, store_dir=args.store)
+        print(df.describe())
+        print(f"{len(df)} rows")
+    else:
+        paths = [p for p in args.paths if not os.path.basename(p).startswith("cleaned")]
+        compare_read_times(paths, args.columns, args.store)
@@ -0,0 +1,383 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG_LAT = np.pi * EARTH_RADIUS_KM / 180.0
+HALF_CIRCUMFERENCE_KM = np.pi * EARTH_RADIUS_KM
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; broadcasts over arrays"""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def wrap_lon(lon):
+    return (np.asarray(lon, dtype=np.float64) + 180.0) % 360.0 - 180.0
+
+
+def _ragged_arange(starts, lengths):
+    """Concatenation of arange(s, s + n) for each (s, n), without a Python loop"""
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - lengths - starts, lengths)
+
+
+def _group(qid, n, *arrays):
+    """Split arrays into n per-query pieces; qid must already be sorted"""
+    if n == 0:
+        return [[] for _ in arrays]
+    cuts = np.searchsorted(qid, np.arange(1, n))
+    return [np.split(a, cuts) for a in arrays]
+
+
+class GridIndex:
+    """Equal-angle grid index over vessel positions.
+
+    Points are bucketed into cell_deg x cell_deg cells and kept sorted by
+    cell id, so a bounding box becomes one contiguous slice per grid row,
+    found by binary search. Longitude wraps, so boxes and circles crossing
+    the antimeridian are handled.
+
+    Updates go to a second, small grid that is rebuilt on each upsert; it is
+    folded into the main grid once it grows past merge_fraction of the
+    indexed points, so a new snapshot costs O(snapshot) until then.
+    """
+
+    def __init__(self, cell_deg=0.5, merge_fraction=0.1):
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180.0 / cell_deg))
+        self.n_cols = int(np.ceil(360.0 / cell_deg))
+        self.merge_fraction = merge_fraction
+
+        # Slot arrays: every point ever inserted since the last merge
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+        self._ids = np.empty(0, dtype=object)
+        self._alive = np.empty(0, dtype=bool)
+        self._slot = {}
+
+        # Main grid over slots [0, _indexed), delta grid over the rest.
+        # Each is (slots sorted by cell, their sorted cell ids).
+        self._indexed = 0
+        self._main = self._grid(np.empty(0, dtype=np.int64))
+        self._delta = self._main
+
+    def __len__(self):
+        return len(self._slot)
+
+    def _cell_rc(self, lat, lon):
+        row = np.clip(((np.asarray(lat) + 90.0) // self.cell_deg).astype(np.int64), 0, self.n_rows - 1)
+        col = ((wrap_lon(lon) + 180.0) // self.cell_deg).astype(np.int64) % self.n_cols
+        return row, col
+
+    def build(self, ids, lat, lon):
+        """Replace the contents of the index"""
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+        self._ids = np.empty(0, dtype=object)
+        self._alive = np.empty(0, dtype=bool)
+        self._slot = {}
+        self._indexed = 0
+        self.upsert(ids, lat, lon)
+        self._merge()
+        return self
+
+    def upsert(self, ids, lat, lon):
+        """Insert or move points; an existing id's old position is retired"""
+        ids = np.asarray(ids, dtype=object)
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = wrap_lon(lon)
+        keep = ~(np.isnan(lat) | np.isnan(lon))
+        ids, lat, lon = ids[keep], lat[keep], lon[keep]
+        # A later duplicate in the same batch wins
+        last = np.fromiter(dict(zip(ids.tolist(), range(len(ids)))).values(), dtype=np.int64)
+        if len(last) < len(ids):
+            last.sort()
+            ids, lat, lon = ids[last], lat[last], lon[last]
+
+        self.remove(ids)
+        base = len(self._lat)
+        self._lat = np.concatenate([self._lat, lat])
+        self._lon = np.concatenate([self._lon, lon])
+        self._ids = np.concatenate([self._ids, ids])
+        self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+        self._slot.update(zip(ids.tolist(), range(base, base + len(ids))))
+
+        if len(self._lat) - self._indexed > self.merge_fraction * max(self._indexed, 1):
+            self._merge()
+        else:
+            self._delta = self._grid(np.arange(self._indexed, len(self._lat)))
+
+    def remove(self, ids):
+        slots = [self._slot.pop(i) for i in np.asarray(ids, dtype=object).tolist() if i in self._slot]
+        if slots:
+            self._alive[slots] = False
+
+    def _grid(self, slots):
+        row, col = self._cell_rc(self._lat[slots], self._lon[slots])
+        cell = row * self.n_cols + col
+        order = np.argsort(cell, kind="stable")
+        return slots[order], cell[order]
+
+    def _merge(self):
+        """Compact live slots and rebuild the main grid"""
+        live = np.flatnonzero(self._alive)
+        self._lat, self._lon, self._ids = self._lat[live], self._lon[live], self._ids[live]
+        self._alive = np.ones(len(live), dtype=bool)
+        self._slot = dict(zip(self._ids.tolist(), range(len(live))))
+        self._indexed = len(live)
+        self._main = self._grid(np.arange(len(live)))
+        self._delta = self._grid(np.empty(0, dtype=np.int64))
+
+    def _col_ranges(self, lon_min, lon_max):
+        """Column index ranges covering [lon_min, lon_max] (unwrapped, lon_min <= lon_max),
+        split in two where the range crosses the antimeridian"""
+        lo = int(np.floor((lon_min + 180.0) / self.cell_deg))
+        hi = int(np.floor((lon_max + 180.0) / self.cell_deg))
+        if hi - lo + 1 >= self.n_cols:
+            return [(0, self.n_cols - 1)]
+        lo, hi = lo % self.n_cols, hi % self.n_cols
+        if lo <= hi:
+            return [(lo, hi)]
+        return [(lo, self.n_cols - 1), (0, hi)]
+
+    def _candidates(self, lat_min, lat_max, lon_min, lon_max):
+        """Live slots whose cell intersects the box"""
+        r0, _ = self._cell_rc(max(lat_min, -90.0), 0.0)
+        r1, _ = self._cell_rc(min(lat_max, 90.0), 0.0)
+        rows = np.arange(int(r0), int(r1) + 1) * self.n_cols
+        parts = []
+        for slots, cells in (self._main, self._delta):
+            if len(cells) == 0:
+                continue
+            for c0, c1 in self._col_ranges(lon_min, lon_max):
+                starts = np.searchsorted(cells, rows + c0)
+                ends = np.searchsorted(cells, rows + c1 + 1)
+                parts.extend(slots[a:b] for a, b in zip(starts, ends) if b > a)
+        slots = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        return slots[self._alive[slots]]
+
+    def _candidates_batch(self, lat_min, lat_max, lon_min, lon_max):
+        """(query, slot) pairs for many boxes at once, like _candidates per box.
+
+        The cell ranges of every box are searched in one searchsorted call per
+        grid, and the slots gathered with one fancy index.
+        """
+        lat_min, lat_max, lon_min, lon_max = np.broadcast_arrays(
+            *(np.asarray(v, dtype=np.float64) for v in (lat_min, lat_max, lon_min, lon_max)))
+        r0, _ = self._cell_rc(np.maximum(lat_min, -90.0), 0.0)
+        r1, _ = self._cell_rc(np.minimum(lat_max, 90.0), 0.0)
+        # Column ranges as in _col_ranges: whole, one piece, or split at the antimeridian
+        lo = np.floor((lon_min + 180.0) / self.cell_deg).astype(np.int64)
+        hi = np.floor((lon_max + 180.0) / self.cell_deg).astype(np.int64)
+        full = hi - lo + 1 >= self.n_cols
+        lo = np.where(full, 0, lo % self.n_cols)
+        hi = np.where(full, self.n_cols - 1, hi % self.n_cols)
+        split = lo > hi
+        query = np.concatenate([np.arange(len(lo)), np.flatnonzero(split)])
+        c0 = np.concatenate([lo, np.zeros(split.sum(), dtype=np.int64)])
+        c1 = np.concatenate([np.where(split, self.n_cols - 1, hi), hi[split]])
+        # One entry per (range, grid row)
+        n_rows = r1[query] - r0[query] + 1
+        row = _ragged_arange(r0[query], n_rows) * self.n_cols
+        query, c0, c1 = (np.repeat(a, n_rows) for a in (query, c0, c1))
+
+        queries, parts = [], []
+        for slots, cells in (self._main, self._delta):
+            if len(cells) == 0:
+                continue
+            starts = np.searchsorted(cells, row + c0)
+            lengths = np.searchsorted(cells, row + c1 + 1) - starts
+            queries.append(np.repeat(query, lengths))
+            parts.append(slots[_ragged_arange(starts, lengths)])
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        query, slots = np.concatenate(queries), np.concatenate(parts)
+        alive = self._alive[slots]
+        return query[alive], slots[alive]
+
+    def bbox(self, lat_min, lat_max, lon_min, lon_max):
+        """Ids inside a box; lon_min > lon_max means the box crosses the antimeridian"""
+        if lon_max - lon_min >= 360.0:
+            # Wrapping would make -180..180 an empty box at -180
+            slots = self._candidates(lat_min, lat_max, -180.0, 180.0)
+            lat = self._lat[slots]
+            return self._ids[slots[(lat >= lat_min) & (lat <= lat_max)]]
+        # A right edge at 180 wraps to -180 and is then treated as crossing, which
+        # keeps lon_min..180 (points at 180 are stored as -180)
+        lon_min, lon_max = wrap_lon(lon_min), wrap_lon(lon_max)
+        if lon_min > lon_max:
+            span = (lon_min, lon_max + 360.0)
+        else:
+            span = (lon_min, lon_max)
+        slots = self._candidates(lat_min, lat_max, *span)
+        lat, lon = self._lat[slots], self._lon[slots]
+        in_lat = (lat >= lat_min) & (lat <= lat_max)
+        if lon_min > lon_max:
+            in_lon = (lon >= lon_min) | (lon <= lon_max)
+        else:
+            in_lon = (lon >= lon_min) & (lon <= lon_max)
+        return self._ids[slots[in_lat & in_lon]]
+
+    def _circle_box(self, lat, lon, km):
+        """Bounding box of the circles around lat/lon; broadcasts"""
+        dlat = np.asarray(km, dtype=np.float64) / KM_PER_DEG_LAT
+        lat_min, lat_max = lat - dlat, lat + dlat
+        widest = np.maximum(np.abs(lat_min), np.abs(lat_max))
+        with np.errstate(divide="ignore"):
+            dlon = np.minimum(180.0, dlat / np.cos(np.radians(np.minimum(widest, 90.0))))
+        # A circle covering a pole, or as wide as the world, takes every longitude
+        whole = (lat_min <= -90.0) | (lat_max >= 90.0) | (dlon >= 180.0)
+        lon_min = np.where(whole, -180.0, lon - dlon)
+        lon_max = np.where(whole, 180.0, lon + dlon)
+        return lat_min, lat_max, lon_min, lon_max
+
+    def _within(self, lat, lon, km):
+        lat_min, lat_max, lon_min, lon_max = (float(v) for v in self._circle_box(lat, lon, km))
+        slots = self._candidates(lat_min, lat_max, lon_min, lon_max)
+        dist = haversine_km(lat, lon, self._lat[slots], self._lon[slots])
+        hit = dist <= km
+        return slots[hit], dist[hit]
+
+    def radius(self, lat, lon, km):
+        """(ids, distances_km) within km of a point, nearest first"""
+        slots, dist = self._within(lat, lon, km)
+        order = np.argsort(dist, kind="stable")
+        return self._ids[slots[order]], dist[order]
+
+    def knn(self, lat, lon, k):
+        """(ids, distances_km) of the k nearest points"""
+        k = min(k, len(self))
+        if k == 0:
+            return self._ids[:0], np.empty(0)
+        km = self.cell_deg * KM_PER_DEG_LAT
+        # Every point within km is found, so once k are in the circle they are the k nearest
+        while True:
+            slots, dist = self._within(lat, lon, km)
+            if len(slots) >= k or km >= HALF_CIRCUMFERENCE_KM:
+                break
+            km *= 2.0
+        top = np.argpartition(dist, k - 1)[:k] if len(dist) > k else np.arange(len(dist))
+        top = top[np.argsort(dist[top], kind="stable")]
+        return self._ids[slots[top]], dist[top]
+
+    def _within_batch(self, lats, lons, km):
+        """(query, slot, distance) for every point within km of each query point"""
+        query, slots = self._candidates_batch(*self._circle_box(lats, lons, km))
+        dist = haversine_km(lats[query], lons[query], self._lat[slots], self._lon[slots])
+        hit = dist <= np.broadcast_to(km, lats.shape)[query]
+        return query[hit], slots[hit], dist[hit]
+
+    def radius_batch(self, lats, lons, km):
+        """radius() for many points at once: a list of (ids, distances_km), nearest first"""
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        query, slots, dist = self._within_batch(lats, lons, km)
+        order = np.lexsort((dist, query))
+        ids, dists = _group(query[order], len(lats), self._ids[slots[order]], dist[order])
+        return list(zip(ids, dists))
+
+    def knn_batch(self, lats, lons, k):
+        """knn() for many points at once: a list of (ids, distances_km), nearest first.
+
+        All queries start from one cell's radius; each round searches only the
+        queries that still have fewer than k points in their circle, with that
+        circle doubled.
+        """
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        k = min(k, len(self))
+        if k == 0 or len(lats) == 0:
+            return [(self._ids[:0], np.empty(0)) for _ in range(len(lats))]
+        km = np.full(len(lats), self.cell_deg * KM_PER_DEG_LAT)
+        todo = np.arange(len(lats))
+        found_query, found_slots, found_dist = [], [], []
+        while len(todo):
+            query, slots, dist = self._within_batch(lats[todo], lons[todo], km[todo])
+            counts = np.bincount(query, minlength=len(todo))
+            done = (counts >= k) | (km[todo] >= HALF_CIRCUMFERENCE_KM)
+            keep = done[query]
+            found_query.append(todo[query[keep]])
+            found_slots.append(slots[keep])
+            found_dist.append(dist[keep])
+            todo = todo[~done]
+            km[todo] *= 2.0
+
+        query, slots, dist = (np.concatenate(a) for a in (found_query, found_slots, found_dist))
+        order = np.lexsort((dist, query))
+        query, slots, dist = query[order], slots[order], dist[order]
+        rank = np.arange(len(query)) - np.searchsorted(query, query)
+        top = rank < k
+        ids, dists = _group(query[top], len(lats), self._ids[slots[top]], dist[top])
+        return list(zip(ids, dists))
+
+    def bbox_batch(self, boxes):
+        """bbox() for many (lat_min, lat_max, lon_min, lon_max) boxes at once: a list of id arrays"""
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        lat_min, lat_max, lon_min, lon_max = boxes.T
+        whole = lon_max - lon_min >= 360.0
+        lon_min = np.where(whole, -180.0, wrap_lon(lon_min))
+        lon_max = np.where(whole, 180.0, wrap_lon(lon_max))
+        crossing = lon_min > lon_max
+        query, slots = self._candidates_batch(lat_min, lat_max, lon_min,
+                                              np.where(crossing, lon_max + 360.0, lon_max))
+        lat, lon = self._lat[slots], self._lon[slots]
+        q_min, q_max = lon_min[query], lon_max[query]
+        in_lon = np.where(crossing[query], (lon >= q_min) | (lon <= q_max), (lon >= q_min) & (lon <= q_max))
+        hit = in_lon & (lat >= lat_min[query]) & (lat <= lat_max[query])
+        query, slots = query[hit], slots[hit]
+        order = np.argsort(query, kind="stable")
+        return _group(query[order], len(boxes), self._ids[slots[order]])[0]
+
+
+def from_frame(df, cell_deg=0.5):
+    """Index a snapshot DataFrame by SHIP_ID"""
+    df = df.dropna(subset=["LAT", "LON"])
+    return GridIndex(cell_deg).build(df["SHIP_ID"].astype(str).to_numpy(), df["LAT"], df["LON"])
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark the vessel spatial index")
+    parser.add_argument("--points", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--cell", type=float, default=0.5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    lat = np.degrees(np.arcsin(rng.uniform(-0.97, 0.99, args.points)))
+    lon = rng.uniform(-180, 180, args.points)
+    ids = np.arange(args.points).astype(str)
+
+    start = time.perf_counter()
+    index = GridIndex(args.cell).build(ids, lat, lon)
+    print(f"Built index over {len(index)} points in {time.perf_counter() - start:.2f}s")
+
+    q_lat = rng.uniform(-60, 70, args.queries)
+    q_lon = rng.uniform(-180, 180, args.queries)
+    q_lon[:10] = 179.9  # exercise the antimeridian
+
+    def timed(label, fn):
+        start = time.perf_counter()
+        fn()
+        per = (time.perf_counter() - start) / args.queries * 1000
+        print(f"{label}: {per:.3f} ms/query")
+
+    timed("bbox 2x2 deg", lambda: index.bbox_batch([(a - 1, a + 1, o - 1, o + 1) for a, o in zip(q_lat, q_lon)]))
+    timed("radius 50 km", lambda: index.radius_batch(q_lat, q_lon, 50.0))
+    timed("knn k=10", lambda: index.knn_batch(q_lat, q_lon, 10))
+
+    # Exactness against brute force, including a query right at the antimeridian
+    for qa, qo in zip(q_lat[:20], q_lon[:20]):
+        got, _ = index.knn(qa, qo, 10)
+        want = ids[np.argsort(haversine_km(qa, qo, lat, lon), kind="stable")[:10]]
+        assert set(got) == set(want)
+        got, _ = index.radius(qa, qo, 100.0)
+        assert set(got) == set(ids[haversine_km(qa, qo, lat, lon) <= 100.0])
+    print("knn and radius match brute force")
+
+    moved = rng.choice(args.points, 10_000, replace=False)
+    start = time.perf_counter()
+    index.upsert(ids[moved], lat[moved] + 0.01, lon[moved] + 0.01)
+    print(f"Upserted a 10k-vessel snapshot in {(time.perf_counter() - start) * 1000:.1f} ms")
+    timed("radius 50 km after update", lambda: index.radius_batch(q_lat, q_lon, 50.0))
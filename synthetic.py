@@ -0,0 +1,103 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+TEMPLATE = "data/data1.csv"
+
+# Keys every feed row carries (null when unknown); the rest are left out when missing
+ALWAYS_PRESENT = ["LAT", "LON", "SPEED", "COURSE", "HEADING", "ELAPSED", "SHIPNAME", "SHIPTYPE", "SHIP_ID"]
+# Stored as float because of NaNs but integer-valued in the feed
+WHOLE_NUMBER = ["SPEED", "COURSE", "HEADING", "LENGTH", "ROT", "WIDTH", "L_FORE", "W_LEFT",
+                "DWT", "GT_SHIPTYPE", "TYPE_IMG"]
+
+
+def load_template(path=TEMPLATE):
+    return pd.read_csv(path)
+
+
+def generate(n, template, seed=0, id_offset=0):
+    """n synthetic vessel rows with the template's columns, dtypes and NaN patterns.
+
+    Each row is a resampled template row, so static attributes, their
+    correlations and which fields are missing stay realistic together. The
+    dynamic fields are then perturbed: position jittered by ~2 km, speed
+    scaled by a few percent (stopped ships stay at 0), course and heading
+    rotated together. SHIP_IDs are unique, numbered from id_offset.
+    """
+    rng = np.random.default_rng(seed)
+    df = template.iloc[rng.integers(0, len(template), n)].reset_index(drop=True)
+
+    df["LAT"] = np.clip(df["LAT"] + rng.normal(0, 0.02, n), -90, 90).round(6)
+    df["LON"] = ((df["LON"] + rng.normal(0, 0.02, n) + 180) % 360 - 180).round(6)
+    df["SPEED"] = (df["SPEED"] * rng.lognormal(0, 0.1, n)).round()
+    turn = rng.normal(0, 5, n).round()
+    df["COURSE"] = (df["COURSE"] + turn) % 360
+    df["HEADING"] = (df["HEADING"] + turn) % 360
+    df["ELAPSED"] = template["ELAPSED"].to_numpy()[rng.integers(0, len(template), n)]
+    # Keep the feed's mix of numeric ids and opaque satellite-AIS tokens
+    ids = (np.arange(n) + 10_000_000 + id_offset).astype(str)
+    numeric = df["SHIP_ID"].astype(str).str.isdigit().to_numpy()
+    df["SHIP_ID"] = np.where(numeric, ids, np.char.add("SYN", ids))
+    return df
+
+
+def iter_generate(n, template, chunk_size=1_000_000, seed=0):
+    """generate() in chunks, so 10M+ rows never sit in memory at once"""
+    for i, start in enumerate(range(0, n, chunk_size)):
+        yield generate(min(chunk_size, n - start), template, seed + i, id_offset=start)
+
+
+def write_csv(path, n, template, chunk_size=1_000_000, seed=0):
+    """Write n rows in the same layout as data/data1.csv (whole numbers without .0)"""
+    for i, chunk in enumerate(iter_generate(n, template, chunk_size, seed)):
+        chunk = chunk.astype({c: "Int64" for c in WHOLE_NUMBER if c in chunk.columns})
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+
+
+def _json_rows(chunk):
+    columns = list(chunk.columns)
+    values = chunk.astype(object).where(chunk.notna(), None).to_numpy()
+    whole = {c for c in WHOLE_NUMBER + ["ELAPSED", "SHIPTYPE"] if c in columns}
+    for row in values:
+        out = {}
+        for key, value in zip(columns, row):
+            if value is None:
+                if key in ALWAYS_PRESENT:
+                    out[key] = None
+                continue
+            # The feed sends every value as a string
+            out[key] = str(int(value)) if key in whole else str(value)
+        yield out
+
+
+def write_json(path, n, template, chunk_size=1_000_000, seed=0):
+    """Write n rows as one station payload ({"type":1,"data":{"rows":[...]}})"""
+    with open(path, "w") as f:
+        f.write('{"type":1,"data":{"rows":[')
+        first = True
+        for chunk in iter_generate(n, template, chunk_size, seed):
+            for row in _json_rows(chunk):
+                if not first:
+                    f.write(",")
+                f.write(json.dumps(row, separators=(",", ":")))
+                first = False
+        f.write(f'],"areaShips":{n}}}}}')
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Generate synthetic AIS snapshots shaped like data/data1.csv")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("--output", default="synthetic.csv", help=".csv or .json (station payload)")
+    parser.add_argument("--template", default=TEMPLATE)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    template = load_template(args.template)
+    writer = write_json if args.output.endswith(".json") else write_csv
+    writer(args.output, args.rows, template, seed=args.seed)
+    print(f"Wrote {args.rows} rows to {args.output} in {time.perf_counter() - start:.1f}s")
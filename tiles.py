@@ -0,0 +1,68 @@
+import math
+
+import numpy as np
+
+# Web Mercator tiles numbered the way the z:/X:/Y: endpoint numbers them, which is
+# one zoom off the usual slippy-map scheme: z:0 and z:1 are both the whole world,
+# and z:2 X,Y in {0, 1} are its four quadrants (what script.py scrapes). Tile
+# (z, x, y) covers 1/side(z) of the world in each direction, Y counted from the north.
+MAX_LAT = 85.05112878
+
+
+def side(z):
+    """Tiles per row (and per column) at zoom z"""
+    return 2 ** max(z - 1, 0)
+
+
+def tile_key(z, x, y):
+    return f"{z}/{x}/{y}"
+
+
+def parse_tile_key(key):
+    z, x, y = (int(v) for v in key.split("/"))
+    return z, x, y
+
+
+def children(z, x, y):
+    """The tiles at z+1 that cover tile (z, x, y): four, or one going from z:0 to z:1"""
+    if z == 0:
+        return [(1, x, y)]
+    return [(z + 1, 2 * x + dx, 2 * y + dy) for dx in (0, 1) for dy in (0, 1)]
+
+
+def parent(z, x, y):
+    if z == 1:
+        return (0, x, y)
+    return (z - 1, x // 2, y // 2)
+
+
+def level_tiles(z):
+    """Every tile at zoom z"""
+    n = side(z)
+    return [(z, x, y) for x in range(n) for y in range(n)]
+
+
+def _lat_from_y(y, n):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+
+def tile_bounds(z, x, y):
+    """(lat_min, lat_max, lon_min, lon_max) of a tile"""
+    n = side(z)
+    lon_min = x / n * 360.0 - 180.0
+    lon_max = (x + 1) / n * 360.0 - 180.0
+    return _lat_from_y(y + 1, n), _lat_from_y(y, n), lon_min, lon_max
+
+
+def tile_xy(lat, lon, z):
+    """Vectorized tile indices (x, y) at zoom z for arrays of LAT/LON"""
+    n = side(z)
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -MAX_LAT, MAX_LAT)
+    lon = np.asarray(lon, dtype=np.float64)
+    # Wrap longitudes into [-180, 180) so 180.0 lands in the first column
+    lon = (lon + 180.0) % 360.0 - 180.0
+    x = np.floor((lon + 180.0) / 360.0 * n).astype(np.int64)
+    lat_rad = np.radians(lat)
+    y = np.floor((1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0 * n)
+    y = y.astype(np.int64)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
@@ -0,0 +1,249 @@
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+TRACK_DIR = "tracks"
+
+# One position report, 32 bytes. t is the report time in epoch seconds
+# (capture time minus ELAPSED minutes); ship is an integer surrogate for SHIP_ID.
+POSITION = np.dtype([
+    ("ship", np.int32),
+    ("t", np.int64),
+    ("LAT", np.float32),
+    ("LON", np.float32),
+    ("SPEED", np.float32),
+    ("COURSE", np.float32),
+    ("HEADING", np.float32),
+])
+DYNAMIC = ["LAT", "LON", "SPEED", "COURSE", "HEADING"]
+
+# The same report seen in two snapshots rarely gets the same t: ELAPSED is in
+# whole minutes, and the tiles often serve a cached report without advancing
+# its ELAPSED, which shifts t by the time between captures (up to an hour in
+# data/). A report at exactly the same position for the same ship within this
+# window is taken as a repeat; a genuinely new one there adds nothing to the track.
+REPEAT_SECONDS = 3600
+
+# Per-segment index: each vessel's rows are one contiguous, time-sorted run
+RUN = np.dtype([("ship", np.int32), ("start", np.int64), ("count", np.int64)])
+
+
+class TrackStore:
+    """Append-only store of per-vessel position tracks.
+
+    Every ingested snapshot becomes one immutable segment sorted by (ship, t),
+    so appending costs O(snapshot) and never touches older segments. The
+    in-memory index maps a ship to its (segment, start, count) runs.
+
+    Layout of the store directory:
+        ships.txt        one SHIP_ID per line, line number = surrogate id
+        segments.jsonl   one line per segment: file, source, t_min, t_max, rows
+        seg_NNNNNN.npy   POSITION records
+        seg_NNNNNN.idx.npy  RUN records
+    """
+
+    def __init__(self, path=TRACK_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.ship_ids = []
+        self.ship_index = {}
+        self.segments = []
+        self.sources = set()
+        self.runs = {}
+        self._data = {}
+
+        ships_file = os.path.join(path, "ships.txt")
+        if os.path.exists(ships_file):
+            with open(ships_file) as f:
+                self.ship_ids = f.read().splitlines()
+            self.ship_index = {s: i for i, s in enumerate(self.ship_ids)}
+
+        log = os.path.join(path, "segments.jsonl")
+        if os.path.exists(log):
+            with open(log) as f:
+                for line in f:
+                    self._register(json.loads(line))
+
+    def _register(self, segment):
+        self.segments.append(segment)
+        self.sources.add(segment["source"])
+        runs = np.load(os.path.join(self.path, segment["index"]))
+        seg = len(self.segments) - 1
+        for ship, start, count in runs.tolist():
+            self.runs.setdefault(ship, []).append((seg, start, count))
+
+    def _segment_data(self, seg):
+        data = self._data.get(seg)
+        if data is None:
+            data = np.load(os.path.join(self.path, self.segments[seg]["file"]), mmap_mode="r")
+            self._data[seg] = data
+        return data
+
+    def _surrogates(self, ship_ids):
+        """Map SHIP_IDs to surrogate ints, appending unseen ids to ships.txt"""
+        new = []
+        out = np.empty(len(ship_ids), dtype=np.int32)
+        for i, ship in enumerate(ship_ids):
+            idx = self.ship_index.get(ship)
+            if idx is None:
+                idx = self.ship_index[ship] = len(self.ship_ids)
+                self.ship_ids.append(ship)
+                new.append(ship)
+            out[i] = idx
+        if new:
+            with open(os.path.join(self.path, "ships.txt"), "a") as f:
+                f.write("".join(s + "\n" for s in new))
+        return out
+
+    def append(self, df, captured_at, source=None):
+        """Append one snapshot; returns the number of positions written"""
+        source = source or captured_at.isoformat()
+        if source in self.sources:
+            print(f"Skipping {source}: already ingested")
+            return 0
+        df = df.dropna(subset=["SHIP_ID", "LAT", "LON"])
+        if df.empty:
+            return 0
+
+        records = np.empty(len(df), dtype=POSITION)
+        records["ship"] = self._surrogates(df["SHIP_ID"].astype(str).tolist())
+        elapsed = pd.to_numeric(df["ELAPSED"], errors="coerce").fillna(0).to_numpy()
+        records["t"] = int(captured_at.timestamp()) - (elapsed * 60).astype(np.int64)
+        for col in DYNAMIC:
+            records[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float32)
+        records.sort(order=["ship", "t", "LAT", "LON"])
+        # Overlapping tiles repeat some vessels; keep one copy of each identical report
+        same = np.ones(len(records), dtype=bool)
+        for col in ("ship", "t", "LAT", "LON"):
+            same[1:] &= records[col][1:] == records[col][:-1]
+        same[0] = False
+        records = records[~same]
+        records = records[~self._repeats(records)]
+
+        ships, starts, counts = np.unique(records["ship"], return_index=True, return_counts=True)
+        runs = np.empty(len(ships), dtype=RUN)
+        runs["ship"], runs["start"], runs["count"] = ships, starts, counts
+
+        name = f"seg_{len(self.segments):06d}"
+        np.save(os.path.join(self.path, name + ".npy"), records)
+        np.save(os.path.join(self.path, name + ".idx.npy"), runs)
+        segment = {"file": name + ".npy", "index": name + ".idx.npy", "source": source,
+                   "t_min": int(records["t"].min()) if len(records) else int(captured_at.timestamp()),
+                   "t_max": int(records["t"].max()) if len(records) else int(captured_at.timestamp()),
+                   "rows": len(records)}
+        # The log line is written last, so a crash mid-append leaves no half segment visible
+        with open(os.path.join(self.path, "segments.jsonl"), "a") as f:
+            f.write(json.dumps(segment) + "\n")
+        self._register(segment)
+        return len(records)
+
+    def _repeats(self, records):
+        """Mask of records already stored by an earlier snapshot: same ship and position, t within REPEAT_SECONDS"""
+        if not len(records):
+            return np.zeros(0, dtype=bool)
+        t_min, t_max = records["t"].min() - REPEAT_SECONDS, records["t"].max() + REPEAT_SECONDS
+        old = [self._segment_data(seg) for seg, meta in enumerate(self.segments)
+               if meta["rows"] and meta["t_max"] >= t_min and meta["t_min"] <= t_max]
+        if not old:
+            return np.zeros(len(records), dtype=bool)
+        keys = ["ship", "LAT", "LON"]
+        old = np.concatenate(old)
+        old = pd.DataFrame({c: old[c] for c in keys + ["t"]}).assign(seen=True).sort_values("t")
+        new = pd.DataFrame({c: records[c] for c in keys + ["t"]}).assign(row=np.arange(len(records)))
+        matched = pd.merge_asof(new.sort_values("t"), old, on="t", by=keys,
+                                tolerance=REPEAT_SECONDS, direction="nearest")
+        repeats = np.zeros(len(records), dtype=bool)
+        repeats[matched["row"].to_numpy()] = matched["seen"].notna().to_numpy()
+        return repeats
+
+    def _frame(self, records):
+        df = pd.DataFrame({col: records[col] for col in DYNAMIC})
+        ships = np.asarray(self.ship_ids, dtype=object)
+        df.insert(0, "SHIP_ID", ships[records["ship"]] if len(records) else [])
+        df.insert(1, "TIME", pd.to_datetime(records["t"], unit="s"))
+        return df
+
+    def track(self, ship_id, since=None, until=None):
+        """Time-ordered positions of one vessel, optionally limited to a time window"""
+        idx = self.ship_index.get(str(ship_id))
+        parts = []
+        for seg, start, count in self.runs.get(idx, []):
+            meta = self.segments[seg]
+            if (since and meta["t_max"] < since.timestamp()) or (until and meta["t_min"] > until.timestamp()):
+                continue
+            parts.append(self._segment_data(seg)[start:start + count])
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=POSITION)
+        records = records[_window(records["t"], since, until)]
+        records = records[np.argsort(records["t"], kind="stable")]
+        return self._frame(records)
+
+    def scan(self, since=None, until=None):
+        """Every position reported inside [since, until], skipping segments outside it"""
+        parts = []
+        for seg, meta in enumerate(self.segments):
+            if (since and meta["t_max"] < since.timestamp()) or (until and meta["t_min"] > until.timestamp()):
+                continue
+            data = self._segment_data(seg)
+            parts.append(data[_window(data["t"], since, until)])
+        records = np.concatenate(parts) if parts else np.empty(0, dtype=POSITION)
+        return self._frame(records)
+
+    def summary(self):
+        rows = sum(s["rows"] for s in self.segments)
+        lengths = np.array([sum(r[2] for r in runs) for runs in self.runs.values()])
+        print(f"{len(self.segments)} segments, {rows} positions, {len(self.ship_ids)} vessels, "
+              f"{rows * POSITION.itemsize / 1e6:.1f} MB")
+        if len(lengths):
+            print(f"Positions per vessel: median {np.median(lengths):.0f}, max {lengths.max()}, "
+                  f"{(lengths > 1).sum()} vessels seen more than once")
+
+
+def _window(t, since, until):
+    mask = np.ones(len(t), dtype=bool)
+    if since is not None:
+        mask &= t >= int(since.timestamp())
+    if until is not None:
+        mask &= t <= int(until.timestamp())
+    return mask
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    import time
+
+    from snapshot_store import capture_time
+
+    parser = argparse.ArgumentParser(description="Per-vessel track store across snapshots")
+    parser.add_argument("--store", default=TRACK_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ing = sub.add_parser("ingest", help="append snapshot CSVs")
+    ing.add_argument("paths", nargs="*", default=sorted(glob.glob("data/*.csv")))
+
+    show = sub.add_parser("track", help="print one vessel's track")
+    show.add_argument("ship_id")
+
+    scan = sub.add_parser("scan", help="count positions in a time window")
+    scan.add_argument("--since", type=datetime.fromisoformat)
+    scan.add_argument("--until", type=datetime.fromisoformat)
+    args = parser.parse_args()
+
+    store = TrackStore(args.store)
+    if args.command == "ingest":
+        for path in args.paths:
+            if os.path.basename(path).startswith("cleaned"):
+                continue
+            start = time.perf_counter()
+            df = pd.read_csv(path, dtype={"SHIP_ID": str})
+            rows = store.append(df, capture_time(path), source=os.path.abspath(path))
+            print(f"Appended {rows} positions from {path} in {(time.perf_counter() - start) * 1000:.0f} ms")
+        store.summary()
+    elif args.command == "track":
+        print(store.track(args.ship_id).to_string(index=False))
+    else:
+        df = store.scan(args.since, args.until)
+        print(f"{len(df)} positions from {df['SHIP_ID'].nunique()} vessels")